@@ -0,0 +1,751 @@
+# async_engine.py
+"""
+Asyncio-Engine: Kununu- und Trustpilot-Scrapes vieler Unternehmen in einem Event-Loop.
+
+Statt eines OS-Threads pro laufendem Scrape (web_ui/scrape_jobs) warten alle Scrapes als
+Coroutinen auf ihre Antworten. Begrenzt wird über
+    - gleichzeitige Anfragen pro Host (asyncio.Semaphore, HOST_CONCURRENCY),
+    - asynchrone Token-Buckets pro Plattform (Trustpilot wie trustpilot_scraper, Kununu ohne Limit),
+    - gleichzeitige Profile (PROFILE_CONCURRENCY).
+
+Abrufe laufen über aiohttp, falls installiert, sonst über die geteilte requests-Session von
+http_client in einem Thread-Pool. In beiden Fällen gelten HTTP-Cache, Retry bei 429/5xx, der
+Proxy-Pool (proxy_pool) und die Statistiken aus http_client; Zugriffe auf den SQLite-Cache laufen
+dabei in einem eigenen Thread statt im Event-Loop. Parsen und Schreiben sind dieselben Funktionen wie in main_scraper und
+main_trustpilot_scraper (Delta-Sync, Checkpoints, Löscherkennung). Alle Datenbankzugriffe laufen
+nacheinander über einen einzigen Schreiber-Thread mit eigener Verbindung.
+
+Aufruf (z.B. per cron, statt scheduler.py oder parallel_runner.py):
+    python async_engine.py                            # alle gespeicherten Profile
+    python async_engine.py --plattform Trustpilot --limit 50 --profile 32
+    python async_engine.py --voll                     # vollständige Durchläufe erzwingen
+
+Die Job-Warteschlange der Web UI nutzt die Engine mit SCRAPER_ENGINE=asyncio (siehe scrape_jobs).
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError: # Optional: ohne aiohttp laufen die Abrufe über http_client in Threads
+    aiohttp = None
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+import kununu_scraper
+import metrics
+import scrape_checkpoints
+import trustpilot_scraper
+from db import DB_NAME, connect
+from scheduler import get_profiles_by_priority
+
+logger = logging.getLogger(__name__)
+
+# Gleichzeitige Anfragen pro Host (Standard und Ausnahmen)
+DEFAULT_HOST_CONCURRENCY = 4
+HOST_CONCURRENCY = {}
+# Gleichzeitig laufende Profile in run()
+PROFILE_CONCURRENCY = 16
+# Seiten eines Profils, die im Voraus angefragt werden (Kununu nur bei vollständigen Durchläufen)
+PAGE_PREFETCH = 2 * trustpilot_scraper.TRUSTPILOT_FETCH_WORKERS
+# Threads für Abrufe ohne aiohttp
+FALLBACK_FETCH_THREADS = 16
+
+class AsyncTokenBucket:
+    """
+    Token-Bucket wie trustpilot_scraper.TokenBucket, wartet aber mit asyncio.sleep.
+
+    Wartende Coroutinen bekommen ihre Tokens in der Reihenfolge, in der sie angefragt haben.
+    """
+    def __init__(self, max_requests, timeframe_seconds, capacity=trustpilot_scraper.RATE_LIMIT_BURST):
+        self.capacity = capacity
+        self.refill_rate = (max_requests - capacity) / timeframe_seconds # Tokens pro Sekunde
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wartet, bis ein Token frei ist. Gibt die Wartezeit in Sekunden zurück."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                time_to_wait = (1 - self._tokens) / self.refill_rate
+                await asyncio.sleep(time_to_wait)
+                waited += time_to_wait
+
+class AsyncFetcher:
+    """
+    Asynchroner HTTP-Client mit Begrenzung pro Host.
+
+    fetch() verhält sich wie http_client.fetch: Es gibt eine requests.Response zurück und löst
+    requests.exceptions.RequestException aus, damit die Fehlerbehandlung der Scraper gleich bleibt.
+    """
+    def __init__(self, host_concurrency=None, default_host_concurrency=DEFAULT_HOST_CONCURRENCY):
+        self.host_concurrency = dict(HOST_CONCURRENCY if host_concurrency is None else host_concurrency)
+        self.default_host_concurrency = default_host_concurrency
+        self._semaphores = {}
+        self._session = None
+        self._executor = None
+        self._cache_executor = None
+
+    async def start(self):
+        # Der HTTP-Cache ist SQLite: Lesen, Schreiben und Verdrängen laufen in einem eigenen Thread,
+        # damit sie den Event-Loop nicht blockieren
+        self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-cache")
+        if aiohttp is not None:
+            self._session = aiohttp.ClientSession(
+                headers={'User-Agent': http_client.USER_AGENT, 'Accept-Encoding': http_client._accept_encoding()},
+                connector=aiohttp.TCPConnector(limit=0, ttl_dns_cache=300)) # Begrenzung über die Semaphoren
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=FALLBACK_FETCH_THREADS, thread_name_prefix="async-fetch")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._cache_executor is not None:
+            self._cache_executor.shutdown(wait=True)
+            self._cache_executor = None
+
+    async def _cache_call(self, function, *args):
+        """Führt einen Cache-Zugriff von http_client im Cache-Thread aus (ohne Cache direkt)."""
+        if http_client.get_cache() is None:
+            return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._cache_executor, functools.partial(function, *args))
+
+    async def would_hit_network(self, url):
+        """Siehe http_client.would_hit_network."""
+        return await self._cache_call(http_client.would_hit_network, url)
+
+    def _semaphore(self, host):
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.host_concurrency.get(host, self.default_host_concurrency))
+        return semaphore
+
+    async def fetch(self, url, accept=None, timeout=15, bypass_cache=False):
+        """Siehe http_client.fetch."""
+        async with self._semaphore(urlsplit(url).netloc):
+            if self._session is None:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, functools.partial(http_client.fetch, url, accept=accept, timeout=timeout, bypass_cache=bypass_cache))
+            return await self._fetch_aiohttp(url, accept, timeout, bypass_cache)
+
+    async def _fetch_aiohttp(self, url, accept, timeout, bypass_cache):
+        headers = {'Accept': accept} if accept else {}
+        cache, cache_entry, cached_response = await self._cache_call(http_client.lookup_cache, url, headers, bypass_cache)
+        if cached_response is not None:
+            return cached_response
+
+        # Retry wie die urllib3-Konfiguration der requests-Session (Backoff 1s, 2s, 4s, Retry-After)
+        pool = http_client.get_proxy_pool()
+        start_time = time.perf_counter()
+        for attempt in range(http_client.RETRY_TOTAL + 1):
+            retries_left = attempt < http_client.RETRY_TOTAL
+            backoff = http_client.RETRY_BACKOFF_FACTOR * 2 ** attempt
+            proxy, wait = pool.acquire(url) if pool else (None, 0)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                async with self._session.get(url, headers=headers, proxy=proxy.url if proxy else None,
+                                             timeout=aiohttp.ClientTimeout(total=timeout)) as aio_response:
+                    content = await aio_response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if proxy:
+                    pool.report(proxy, None)
+                if retries_left:
+                    await asyncio.sleep(backoff)
+                    continue
+                http_client.fetch_stats.record(urlsplit(url).netloc, time.perf_counter() - start_time, 0, 0, failed=True)
+                if isinstance(e, asyncio.TimeoutError):
+                    raise requests.exceptions.Timeout(f"Timeout nach {timeout} s: {url}") from e
+                raise requests.exceptions.ConnectionError(f"{url}: {e}") from e
+            if proxy and pool.report(proxy, aio_response.status) and retries_left:
+                continue # Blockiert: ohne Backoff mit dem nächsten Proxy
+            if aio_response.status in http_client.RETRY_STATUS_CODES and retries_left:
+                retry_after = aio_response.headers.get('Retry-After', '')
+                await asyncio.sleep(int(retry_after) if retry_after.isdigit() else backoff)
+                continue
+            break
+
+        response = requests.Response()
+        response.status_code = aio_response.status
+        response.reason = aio_response.reason
+        response._content = content
+        response.url = url
+        response.headers = CaseInsensitiveDict(aio_response.headers)
+        response.encoding = aio_response.charset
+        return await self._cache_call(http_client.complete_response, url, response, time.perf_counter() - start_time, cache, cache_entry)
+
+class AsyncBuildIdCache:
+    """Wie trustpilot_scraper.BuildIdCache, ermittelt die Build-ID aber über den asynchronen Client."""
+    def __init__(self, engine, ttl_seconds=trustpilot_scraper.BUILD_ID_TTL_SECONDS):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self._entries = {} # api_base_url -> (build_id, discovered_at)
+        self._lock = asyncio.Lock()
+
+    async def get(self, api_base_url, slug):
+        async with self._lock:
+            entry = self._entries.get(api_base_url)
+            if entry and time.monotonic() - entry[1] < self.ttl_seconds:
+                return entry[0]
+            return await self._discover_locked(api_base_url, slug, entry)
+
+    async def refresh(self, api_base_url, slug, stale_build_id):
+        async with self._lock:
+            entry = self._entries.get(api_base_url)
+            if entry and entry[0] != stale_build_id and time.monotonic() - entry[1] < self.ttl_seconds:
+                return entry[0]
+            return await self._discover_locked(api_base_url, slug, entry, bypass_cache=True)
+
+    async def _discover_locked(self, api_base_url, slug, entry, bypass_cache=False):
+        profile_url = f"{api_base_url}/review/{slug}"
+        try:
+            if bypass_cache or await self.engine.fetcher.would_hit_network(profile_url):
+                await self.engine.apply_rate_limit('Trustpilot')
+            logger.debug("Ermittle Trustpilot Build-ID von: %s", profile_url)
+            response = await self.engine.fetcher.fetch(profile_url, accept='text/html', timeout=20, bypass_cache=bypass_cache)
+            build_id = trustpilot_scraper.extract_build_id(response.content, profile_url)
+        except requests.exceptions.RequestException as e:
+            logger.error("Fehler beim Abrufen der Trustpilot-Profilseite %s: %s", profile_url, e)
+            build_id = None
+        if build_id:
+            self._entries[api_base_url] = (build_id, time.monotonic())
+            return build_id
+        return entry[0] if entry else None
+
+# --- Funktionen für den Schreiber-Thread (bekommen dessen Verbindung) ---
+
+def _prepare_kununu_profile(conn, unternehmen_name, profil_uebersicht_url):
+    unternehmen_id = kununu_scraper.get_or_create_unternehmen(conn, unternehmen_name)
+    plattform_id = kununu_scraper.get_plattform_id(conn, "Kununu")
+    if not unternehmen_id or not plattform_id:
+        return None, plattform_id, None
+    profil_id = kununu_scraper.get_or_create_profil(conn, unternehmen_id, plattform_id, profil_uebersicht_url)
+    return profil_id, plattform_id, kununu_scraper.get_profile_identifiers(conn, profil_id) if profil_id else None
+
+def _prepare_trustpilot_profile(conn, unternehmen_name, db_profile_url, trust_score, total_reviews_count):
+    unternehmen_id = trustpilot_scraper.get_or_create_unternehmen(conn, unternehmen_name)
+    plattform_id = trustpilot_scraper.get_plattform_id(conn, "Trustpilot")
+    profil_id = trustpilot_scraper.get_or_create_profil(conn, unternehmen_id, plattform_id, db_profile_url)
+    if trust_score is not None and total_reviews_count is not None:
+        trustpilot_scraper.add_profil_verlauf_entry_trustpilot(conn, profil_id, trust_score, total_reviews_count)
+    return profil_id, plattform_id
+
+def _start_run(conn, profil_id, plattform_id, incremental, is_full_sweep_due):
+    """Modus wie in den Scrapern: ein abgebrochener vollständiger Durchlauf wird fortgesetzt."""
+    if incremental is None:
+        incremental = not is_full_sweep_due(conn, profil_id) and not scrape_checkpoints.load_resumable(conn, profil_id)
+    checkpoint = None if incremental else scrape_checkpoints.start_or_resume(conn, profil_id, plattform_id)
+    return incremental, checkpoint
+
+def _write_kununu_page(conn, profil_id, json_data, checkpoint, seite):
+    page_stats = {}
+    kununu_scraper.scrape_kununu_individual_reviews_from_json(json_data, profil_id, conn, stats=page_stats,
+                                                               checkpoint=checkpoint, seite=seite)
+    return page_stats
+
+def _finish_sweep(conn, profil_id, lauf_start, checkpoint, mark_deleted, record_full_sweep):
+    mark_deleted(conn, profil_id, lauf_start)
+    record_full_sweep(conn, profil_id)
+    if checkpoint:
+        scrape_checkpoints.finish(conn, checkpoint)
+
+def _page_review_count(page_counts):
+    return sum(page_counts.get(ergebnis, 0) for ergebnis in ('neu', 'geaendert', 'unveraendert'))
+
+def _is_unchanged_page(page_counts):
+    return page_counts.get('unveraendert') and not page_counts.get('neu') and not page_counts.get('geaendert')
+
+class AsyncScrapeEngine:
+    """
+    Scraped beliebig viele Profile nebenläufig in einem Event-Loop.
+
+        async with AsyncScrapeEngine() as engine:
+            await engine.scrape_kununu("Muster GmbH", "https://www.kununu.com/de/muster")
+            stats = await engine.run(profiles)
+
+    Args:
+        db_name (str): Datenbankdatei.
+        host_concurrency (dict, optional): Gleichzeitige Anfragen pro Host (Standard: HOST_CONCURRENCY).
+        default_host_concurrency (int): Gleichzeitige Anfragen für alle übrigen Hosts.
+        trustpilot_base_url (str): Basis-URL für Trustpilot (z.B. ein lokaler Stub-Server).
+        trustpilot_max_requests (int): Trustpilot-Anfragen pro TIMEFRAME_SECONDS.
+        kununu_max_requests (int, optional): Kununu-Anfragen pro TIMEFRAME_SECONDS (Standard: unbegrenzt).
+    """
+    def __init__(self, db_name=DB_NAME, host_concurrency=None, default_host_concurrency=DEFAULT_HOST_CONCURRENCY,
+                 trustpilot_base_url=trustpilot_scraper.TRUSTPILOT_BASE_URL,
+                 trustpilot_max_requests=trustpilot_scraper.MAX_REQUESTS_PER_TIMEFRAME, kununu_max_requests=None):
+        self.db_name = db_name
+        self.trustpilot_base_url = trustpilot_base_url
+        self.fetcher = AsyncFetcher(host_concurrency, default_host_concurrency)
+        self._rate_limit_settings = {'Trustpilot': trustpilot_max_requests, 'Kununu': kununu_max_requests}
+        self._rate_limiters = {}
+        self._build_ids = None
+        self._writer = None
+        self._conn = None
+
+    async def start(self):
+        """Öffnet Schreiber-Verbindung und HTTP-Client (muss im Event-Loop der Engine laufen)."""
+        for plattform, max_requests in self._rate_limit_settings.items():
+            if max_requests:
+                self._rate_limiters[plattform] = AsyncTokenBucket(max_requests, trustpilot_scraper.TIMEFRAME_SECONDS)
+        self._build_ids = AsyncBuildIdCache(self)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-engine-db")
+        self._conn = await self._db(connect, self.db_name) # Wird nur im Schreiber-Thread benutzt
+        await self.fetcher.start()
+
+    async def close(self):
+        await self.fetcher.close()
+        if self._conn is not None:
+            await self._db(self._conn.close)
+            self._conn = None
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _db(self, function, *args, **kwargs):
+        """Führt function im Schreiber-Thread aus; alle Datenbankzugriffe laufen nacheinander dort."""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, functools.partial(function, *args, **kwargs))
+
+    async def _report_progress(self, progress_callback, done, total):
+        if progress_callback:
+            # Der Callback der Job-Warteschlange schreibt in die Datenbank
+            await self._db(progress_callback, done, total)
+
+    async def apply_rate_limit(self, plattform):
+        rate_limiter = self._rate_limiters.get(plattform)
+        if rate_limiter is None:
+            return
+        waited = await rate_limiter.acquire()
+        metrics.RATE_LIMIT_WAIT_SECONDS.observe(waited, plattform=plattform.lower())
+        if waited > 1:
+            logger.info("%s Rate-Limit erreicht. %.2f Sekunden gewartet.", plattform, waited)
+
+    async def _fetch_in_order(self, page_nums, fetch_page, window):
+        """
+        Ruft Seiten mit bis zu `window` Anfragen im Voraus ab und liefert (seite, daten) in
+        Seitenreihenfolge, damit jede Seite in der richtigen Reihenfolge geschrieben wird.
+        """
+        page_nums = iter(page_nums)
+        pending = deque()
+        try:
+            while True:
+                # Die gerade erwartete Seite zählt mit: window=1 fragt nicht im Voraus an
+                for page_num in page_nums:
+                    pending.append((page_num, asyncio.ensure_future(fetch_page(page_num))))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                page_num, task = pending.popleft()
+                yield page_num, await task
+        finally:
+            # Greift auch, wenn der Verbraucher die Paginierung vorzeitig abbricht
+            for _, task in pending:
+                task.cancel()
+
+    # --- Kununu ---
+
+    async def _fetch_kununu_json(self, url_to_fetch):
+        """Wie kununu_scraper.fetch_json_data."""
+        try:
+            if await self.fetcher.would_hit_network(url_to_fetch):
+                await self.apply_rate_limit('Kununu')
+            logger.debug("Rufe JSON-API ab: %s", url_to_fetch)
+            response = await self.fetcher.fetch(url_to_fetch, accept='application/json', timeout=15)
+            with metrics.PARSE_SECONDS.time(plattform='kununu', seite='json'):
+                return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error("Fehler beim Abrufen der JSON-Daten von %s: %s", url_to_fetch, e)
+        except json.JSONDecodeError as e:
+            logger.error("Fehler beim Parsen der JSON-Antwort von %s: %s", url_to_fetch, e)
+        return None
+
+    async def _load_kununu_overview(self, profil_id, unternehmen_name, profil_uebersicht_url):
+        """Wie kununu_scraper.load_overview."""
+        html_uebersicht = None
+        try:
+            if await self.fetcher.would_hit_network(profil_uebersicht_url):
+                await self.apply_rate_limit('Kununu')
+            logger.debug("Rufe URL ab: %s", profil_uebersicht_url)
+            html_uebersicht = (await self.fetcher.fetch(profil_uebersicht_url, timeout=15)).content
+        except requests.exceptions.RequestException as e:
+            logger.error("Fehler beim Abrufen der URL %s: %s", profil_uebersicht_url, e)
+        return await self._db(kununu_scraper.process_overview_html, self._conn, profil_id, unternehmen_name,
+                              profil_uebersicht_url, html_uebersicht)
+
+    async def scrape_kununu(self, unternehmen_name, profil_uebersicht_url, incremental=None, progress_callback=None):
+        """
+        Asynchrone Entsprechung von kununu_scraper.main_scraper (gleiche Argumente und Modi).
+
+        Returns:
+            dict: {'seiten', 'bewertungen', 'fehler'}; fehler ist None oder eine Meldung.
+        """
+        ergebnis = {'seiten': 0, 'bewertungen': 0, 'fehler': None}
+        profil_id, plattform_id, identifiers = await self._db(_prepare_kununu_profile, self._conn, unternehmen_name, profil_uebersicht_url)
+        if not profil_id:
+            ergebnis['fehler'] = f"Profil für {profil_uebersicht_url} konnte nicht angelegt werden"
+            logger.error("Unternehmensprofil für URL '%s' konnte nicht initialisiert werden.", profil_uebersicht_url)
+            return ergebnis
+        logger.info("Verarbeite Profil ID: %s für %s (Übersicht: %s)", profil_id, unternehmen_name, profil_uebersicht_url)
+
+        gesamtdurchschnitt, anzahl_bewertungen = None, None
+        uebersicht_geladen = False
+        if kununu_scraper.is_overview_refresh_due(identifiers):
+            gesamtdurchschnitt, anzahl_bewertungen, neue_identifiers = await self._load_kununu_overview(profil_id, unternehmen_name, profil_uebersicht_url)
+            identifiers = neue_identifiers or identifiers
+            uebersicht_geladen = True
+            if gesamtdurchschnitt is None or anzahl_bewertungen is None:
+                logger.warning("Keine vollständigen Übersichtsdaten von %s gescraped. Nichts zum Profilverlauf hinzugefügt.", profil_uebersicht_url)
+        if not identifiers:
+            ergebnis['fehler'] = "Profil-UUID konnte nicht extrahiert werden"
+            logger.error("Profil-UUID konnte für %s nicht extrahiert werden. Überspringe das Scrapen einzelner Bewertungen via API.", unternehmen_name)
+            return ergebnis
+
+        incremental, checkpoint = await self._db(_start_run, self._conn, profil_id, plattform_id, incremental, kununu_scraper.is_full_sweep_due)
+        logger.info("Modus für Profil ID %s: %s", profil_id, 'inkrementell' if incremental else 'vollständiger Durchlauf')
+        lauf_start = checkpoint.lauf_start if checkpoint else datetime.now()
+
+        def page_url(page_num):
+            return kununu_scraper.build_reviews_api_url(identifiers['country_code'], identifiers['slug'], identifiers['profile_uuid'], page_num)
+
+        json_data = await self._fetch_kununu_json(page_url(1))
+        if not json_data and not uebersicht_geladen:
+            # Gespeicherte UUID/Slug evtl. veraltet (z.B. Profil umbenannt): Übersicht neu laden und erneut versuchen
+            logger.warning("Erste API-Seite mit gespeicherter Profil-UUID fehlgeschlagen. Lade Übersichtsseite neu.")
+            gesamtdurchschnitt, anzahl_bewertungen, neue_identifiers = await self._load_kununu_overview(profil_id, unternehmen_name, profil_uebersicht_url)
+            if neue_identifiers:
+                identifiers = neue_identifiers
+                json_data = await self._fetch_kununu_json(page_url(1))
+        if not json_data:
+            logger.warning("Keine JSON-Daten für Seite 1 von Profil ID %s erhalten. Breche Paginierung ab.", profil_id)
+            return ergebnis
+
+        total_pages = 1
+        if 'pagesCount' in json_data:
+            recommendation_rate = (json_data.get('recommendationRate') or {}).get('percentage')
+            if gesamtdurchschnitt is not None and anzahl_bewertungen is not None:
+                await self._db(kununu_scraper.add_profil_verlauf, self._conn, profil_id, gesamtdurchschnitt, anzahl_bewertungen, recommendation_rate)
+            total_pages = json_data['pagesCount']
+            logger.info("Profil ID %s: insgesamt %s Seiten mit Bewertungen.", profil_id, total_pages)
+            if checkpoint:
+                checkpoint.seiten_gesamt = total_pages
+
+        async def write_page(page_num, page_data):
+            """Schreibt eine Seite; True, wenn der Durchlauf hier endet (inkrementell fertig oder Schreibfehler)."""
+            page_stats = await self._db(_write_kununu_page, self._conn, profil_id, page_data, checkpoint, page_num)
+            if page_stats.get('fehlgeschlagen'):
+                # Wie in kununu_scraper.main_scraper: ohne Löscherkennung und Checkpoint-Fortschritt abbrechen
+                ergebnis['fehler'] = f"Seite {page_num} konnte nicht gespeichert werden"
+                logger.error("Seite %s von Profil ID %s konnte nicht gespeichert werden. Breche Paginierung ab.", page_num, profil_id)
+                return True
+            ergebnis['seiten'] += 1
+            ergebnis['bewertungen'] += _page_review_count(page_stats)
+            if incremental and _is_unchanged_page(page_stats):
+                logger.info("Seite %s enthält nur bekannte, unveränderte Bewertungen. Inkrementeller Durchlauf für Profil ID %s beendet.", page_num, profil_id)
+                return True
+            await self._report_progress(progress_callback, page_num, total_pages)
+            return False
+
+        if await write_page(1, json_data):
+            return ergebnis
+        # Seite 1 wird immer geholt (Seitenzahl, Empfehlungsrate), danach geht es ggf. am Checkpoint weiter
+        next_page = checkpoint.resume_page if checkpoint and checkpoint.fortgesetzt else 2
+        # Inkrementelle Läufe enden meist nach ein, zwei Seiten: dort nicht im Voraus anfragen
+        window = 1 if incremental else PAGE_PREFETCH
+        async with contextlib.aclosing(self._fetch_in_order(range(next_page, total_pages + 1),
+                                                            lambda page_num: self._fetch_kununu_json(page_url(page_num)), window)) as pages:
+            async for page_num, page_data in pages:
+                if not page_data:
+                    logger.warning("Keine JSON-Daten für Seite %s von Profil ID %s erhalten. Breche Paginierung ab.", page_num, profil_id)
+                    return ergebnis
+                if await write_page(page_num, page_data):
+                    return ergebnis
+
+        # Löschungen lassen sich nur nach einem vollständigen Durchlauf aller Seiten sicher erkennen
+        await self._db(_finish_sweep, self._conn, profil_id, lauf_start, checkpoint,
+                       kununu_scraper.mark_unseen_reviews_deleted, kununu_scraper.record_full_sweep)
+        return ergebnis
+
+    # --- Trustpilot ---
+
+    async def _fetch_trustpilot_page_json(self, json_url):
+        """Wie trustpilot_scraper.fetch_trustpilot_page_json (inkl. PAGE_NOT_FOUND bei 404)."""
+        try:
+            if await self.fetcher.would_hit_network(json_url): # Antworten aus dem Cache zählen nicht gegen das Limit
+                await self.apply_rate_limit('Trustpilot')
+            logger.debug("Rufe Trustpilot JSON API ab: %s", json_url)
+            response = await self.fetcher.fetch(json_url, accept='application/json', timeout=20)
+            with metrics.PARSE_SECONDS.time(plattform='trustpilot', seite='json'):
+                return response.json()
+        except requests.exceptions.HTTPError as e:
+            logger.error("Fehler beim Abrufen der Trustpilot JSON-Daten von %s: %s", json_url, e)
+            if e.response is not None and e.response.status_code == 404:
+                return trustpilot_scraper.PAGE_NOT_FOUND
+        except requests.exceptions.RequestException as e:
+            logger.error("Fehler beim Abrufen der Trustpilot JSON-Daten von %s: %s", json_url, e)
+        except json.JSONDecodeError as e:
+            logger.error("Fehler beim Parsen der Trustpilot JSON-Antwort von %s: %s", json_url, e)
+        return None
+
+    async def scrape_trustpilot(self, trustpilot_profile_base_url, manual_unternehmen_name=None, json_build_id=None,
+                                incremental=None, progress_callback=None):
+        """
+        Asynchrone Entsprechung von trustpilot_scraper.main_trustpilot_scraper (gleiche Argumente und
+        Modi, die Seiten werden mit bis zu PAGE_PREFETCH Anfragen im Voraus geholt).
+
+        Returns:
+            dict: {'seiten', 'bewertungen', 'fehler'}; fehler ist None oder eine Meldung.
+        """
+        ergebnis = {'seiten': 0, 'bewertungen': 0, 'fehler': None}
+        api_base_url = self.trustpilot_base_url
+        slug = (trustpilot_profile_base_url.rstrip('/') + '/').split('/review/')[1].split('/')[0]
+        if not slug:
+            ergebnis['fehler'] = "Kein Slug in der Trustpilot-URL"
+            logger.error("Konnte Slug nicht aus Trustpilot URL extrahieren: %s", trustpilot_profile_base_url)
+            return ergebnis
+
+        build_id = {'aktuell': json_build_id or await self._build_ids.get(api_base_url, slug) or trustpilot_scraper.TRUSTPILOT_JSON_BUILD_ID,
+                    'erneuert': False}
+        page_build_ids = {} # Seite -> Build-ID, mit der sie angefragt wurde
+
+        def page_json_url(page_num):
+            page_build_ids[page_num] = build_id['aktuell']
+            json_url = f"{api_base_url}/_next/data/{build_id['aktuell']}/review/{slug}.json"
+            return f"{json_url}?page={page_num}" if page_num > 1 else json_url
+
+        async def fetch_page(page_num):
+            page_data = await self._fetch_trustpilot_page_json(page_json_url(page_num))
+            if page_data is not trustpilot_scraper.PAGE_NOT_FOUND:
+                return page_data
+            # Wie retry_after_not_found im Scraper: Build-ID einmal pro Lauf neu ermitteln
+            if not build_id['erneuert']:
+                build_id['erneuert'] = True
+                stale_build_id = build_id['aktuell']
+                build_id['aktuell'] = await self._build_ids.refresh(api_base_url, slug, stale_build_id) or stale_build_id
+                if build_id['aktuell'] != stale_build_id:
+                    logger.info("Neue Trustpilot Build-ID %s (alt: %s).", build_id['aktuell'], stale_build_id)
+            if page_build_ids.get(page_num) == build_id['aktuell']:
+                return None
+            return await self._fetch_trustpilot_page_json(page_json_url(page_num))
+
+        initial_data = await fetch_page(1)
+        if not initial_data or "businessUnit" not in initial_data.get("pageProps", {}):
+            ergebnis['fehler'] = "Ungültige oder fehlende Daten auf Seite 1"
+            logger.error("Konnte initiale JSON-Daten für %s nicht laden oder ungültige Struktur.", slug)
+            return ergebnis
+        business_unit = initial_data["pageProps"]["businessUnit"]
+        total_pages = initial_data["pageProps"].get("filters", {}).get("pagination", {}).get("totalPages", 1)
+        final_unternehmen_name = manual_unternehmen_name or business_unit.get("displayName")
+        if not final_unternehmen_name:
+            ergebnis['fehler'] = "Kein Unternehmensname"
+            logger.error("Unternehmensname weder manuell angegeben noch in JSON-Daten für %s gefunden.", slug)
+            return ergebnis
+        logger.info("Unternehmen: %s, TrustScore: %s, Bewertungen: %s, Seiten: %s", final_unternehmen_name,
+                    business_unit.get("trustScore"), business_unit.get("numberOfReviews"), total_pages)
+
+        profil_id, plattform_id = await self._db(_prepare_trustpilot_profile, self._conn, final_unternehmen_name,
+                                                 f"https://de.trustpilot.com/review/{slug}",
+                                                 business_unit.get("trustScore"), business_unit.get("numberOfReviews"))
+        incremental, checkpoint = await self._db(_start_run, self._conn, profil_id, plattform_id, incremental, trustpilot_scraper.is_full_sweep_due)
+        logger.info("Modus für %s: %s", slug, 'Delta-Sync' if incremental else 'vollständiger Durchlauf')
+        resume_page = 2
+        if checkpoint:
+            checkpoint.seiten_gesamt = total_pages
+        if checkpoint and checkpoint.fortgesetzt:
+            resume_page = checkpoint.resume_page
+            logger.info("Setze abgebrochenen Durchlauf %s ab Seite %s/%s fort.", checkpoint.lauf_id, resume_page, total_pages)
+        lauf_start = checkpoint.lauf_start if checkpoint else datetime.now()
+
+        async def fetch_in_order():
+            yield 1, initial_data
+            async with contextlib.aclosing(self._fetch_in_order(range(resume_page, total_pages + 1), fetch_page, PAGE_PREFETCH)) as pages:
+                async for page in pages:
+                    yield page
+
+        failed_pages, consecutive_failures = 0, 0
+        sweep_complete = False
+        page_num = 0
+        async with contextlib.aclosing(fetch_in_order()) as pages:
+            async for page_num, page_data in pages:
+                await self._report_progress(progress_callback, page_num - 1, total_pages)
+                if not page_data or "reviews" not in page_data.get("pageProps", {}):
+                    logger.error("Konnte JSON-Daten für Seite %s von %s nicht laden oder ungültige Struktur.", page_num, slug)
+                    failed_pages += 1
+                    consecutive_failures += 1
+                    if consecutive_failures >= trustpilot_scraper.MAX_CONSECUTIVE_PAGE_FAILURES:
+                        logger.error("%s Seiten in Folge fehlgeschlagen. Breche den Lauf für %s ab (Fortsetzung beim nächsten Lauf).", consecutive_failures, slug)
+                        break
+                    continue
+                consecutive_failures = 0
+
+                # Der Checkpoint rückt nur weiter, solange keine Seite fehlgeschlagen ist
+                page_checkpoint = checkpoint if not failed_pages else None
+                reviews_on_page = page_data["pageProps"]["reviews"]
+                if not reviews_on_page:
+                    logger.info("Keine Bewertungen auf Seite %s für %s gefunden.", page_num, slug)
+                    if page_checkpoint:
+                        await self._db(page_checkpoint.save_page, self._conn, page_num, total_pages)
+                    continue
+                page_counts = await self._db(trustpilot_scraper.add_or_update_trustpilot_reviews_page, self._conn, profil_id,
+                                             reviews_on_page, checkpoint=page_checkpoint, seite=page_num)
+                if page_counts['fehlgeschlagen']:
+                    failed_pages += 1 # nicht gespeichert = nicht gesehen, siehe trustpilot_scraper.main_trustpilot_scraper
+                    continue
+                ergebnis['seiten'] += 1
+                ergebnis['bewertungen'] += _page_review_count(page_counts)
+                if incremental and _is_unchanged_page(page_counts):
+                    logger.info("Seite %s enthält nur bekannte, unveränderte Bewertungen. Delta-Sync für %s beendet.", page_num, slug)
+                    break
+            else:
+                sweep_complete = failed_pages == 0
+        await self._report_progress(progress_callback, page_num, total_pages)
+
+        if sweep_complete:
+            await self._db(_finish_sweep, self._conn, profil_id, lauf_start, checkpoint,
+                           trustpilot_scraper.mark_unseen_trustpilot_reviews_deleted, trustpilot_scraper.record_full_sweep)
+        elif failed_pages:
+            ergebnis['fehler'] = f"{failed_pages} Seiten fehlgeschlagen"
+            logger.warning("%s Seiten fehlgeschlagen, Löscherkennung für %s übersprungen.", failed_pages, final_unternehmen_name)
+        return ergebnis
+
+    # --- Mehrere Profile ---
+
+    async def scrape(self, profile, incremental=None, progress_callback=None):
+        """
+        Scraped ein Profil (dict mit plattform, url, unternehmen_name). Fehler werden wie in den
+        Scrapern geloggt und im Ergebnis zurückgegeben, statt den Event-Loop zu beenden.
+        """
+        if profile['plattform'] not in ('Kununu', 'Trustpilot'):
+            raise ValueError(f"Unbekannte Plattform: {profile['plattform']}")
+        try:
+            if profile['plattform'] == 'Kununu':
+                return await self.scrape_kununu(profile['unternehmen_name'], profile['url'].rstrip('/'),
+                                                incremental=incremental, progress_callback=progress_callback)
+            return await self.scrape_trustpilot(profile['url'], profile['unternehmen_name'],
+                                                incremental=incremental, progress_callback=progress_callback)
+        except Exception as e:
+            logger.exception("Fehler beim Scrapen von %s (%s): %s", profile['url'], profile['plattform'], e)
+            return {'seiten': 0, 'bewertungen': 0, 'fehler': str(e)}
+
+    async def run(self, profiles, incremental=None, profile_concurrency=PROFILE_CONCURRENCY):
+        """
+        Scraped alle Profile, höchstens profile_concurrency gleichzeitig (in der Reihenfolge der Liste).
+
+        Returns:
+            dict: {'profile', 'seiten', 'bewertungen', 'fehler', 'sekunden'} wie parallel_runner.run.
+        """
+        stats = {'profile': len(profiles), 'seiten': 0, 'bewertungen': 0, 'fehler': 0}
+        start_time = time.perf_counter()
+        semaphore = asyncio.Semaphore(profile_concurrency)
+
+        async def scrape_limited(profile):
+            async with semaphore:
+                ergebnis = await self.scrape(profile, incremental=incremental)
+            stats['seiten'] += ergebnis['seiten']
+            stats['bewertungen'] += ergebnis['bewertungen']
+            if ergebnis['fehler']:
+                stats['fehler'] += 1
+                logger.error("Profil %s (%s) fehlgeschlagen: %s", profile['url'], profile['unternehmen_name'], ergebnis['fehler'])
+
+        await asyncio.gather(*(scrape_limited(profile) for profile in profiles))
+        stats['sekunden'] = time.perf_counter() - start_time
+        return stats
+
+async def run(profiles, db_name=DB_NAME, incremental=None, profile_concurrency=PROFILE_CONCURRENCY, **engine_options):
+    """Startet eine Engine, scraped alle Profile (siehe AsyncScrapeEngine.run) und schließt sie wieder."""
+    async with AsyncScrapeEngine(db_name, **engine_options) as engine:
+        return await engine.run(profiles, incremental=incremental, profile_concurrency=profile_concurrency)
+
+# --- Gemeinsame Engine für die Job-Warteschlange der Web UI ---
+
+_background = None
+_background_lock = threading.Lock()
+
+def _get_background_engine():
+    """Startet beim ersten Aufruf einen Event-Loop in einem Daemon-Thread mit einer geteilten Engine."""
+    global _background
+    with _background_lock:
+        if _background is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-engine-loop", daemon=True).start()
+            engine = AsyncScrapeEngine()
+            asyncio.run_coroutine_threadsafe(engine.start(), loop).result()
+            _background = (loop, engine)
+        return _background
+
+def run_scraper_for_job(job, progress_callback):
+    """
+    Wie scrape_jobs.run_scraper_for_job, aber im gemeinsamen Event-Loop. Der Worker-Thread der
+    Warteschlange wartet nur noch auf das Ergebnis; Rate-Limits und Host-Begrenzung gelten für alle
+    Aufträge zusammen.
+
+    Raises:
+        RuntimeError: Wenn der Scrape fehlgeschlagen ist (engine.scrape meldet Fehler im Ergebnis),
+            damit die Warteschlange den Auftrag wie bei den Thread-Scrapern als fehlgeschlagen vermerkt.
+    """
+    loop, engine = _get_background_engine()
+    profile = {'plattform': job['plattform'], 'url': job['profil_url'], 'unternehmen_name': job['unternehmen_name']}
+    ergebnis = asyncio.run_coroutine_threadsafe(engine.scrape(profile, progress_callback=progress_callback), loop).result()
+    if ergebnis.get('fehler'):
+        raise RuntimeError(ergebnis['fehler'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescrape aller gespeicherten Profile in einem asyncio-Event-Loop.")
+    parser.add_argument('--plattform', choices=['Kununu', 'Trustpilot'], help="Nur Profile dieser Plattform")
+    parser.add_argument('--limit', type=int, help="Nur die N dringendsten Profile")
+    parser.add_argument('--profile', type=int, default=PROFILE_CONCURRENCY, help="Gleichzeitig gescrapte Profile")
+    parser.add_argument('--pro-host', type=int, default=DEFAULT_HOST_CONCURRENCY, help="Gleichzeitige Anfragen pro Host")
+    parser.add_argument('--voll', action='store_true', help="Vollständige Durchläufe statt inkrementell")
+    parser.add_argument('--db', default=DB_NAME, help="Datenbankdatei")
+    parser.add_argument('--log-level', help="DEBUG, INFO, WARNING, ... (Standard: SCRAPER_LOG_LEVEL bzw. INFO)")
+    args = parser.parse_args()
+    metrics.configure_logging(args.log_level)
+
+    conn = connect(args.db)
+    try:
+        profiles = get_profiles_by_priority(conn, args.plattform)
+    finally:
+        conn.close()
+    if args.limit:
+        profiles = profiles[:args.limit]
+
+    stats = asyncio.run(run(profiles, db_name=args.db, incremental=False if args.voll else None,
+                            profile_concurrency=args.profile, default_host_concurrency=args.pro_host))
+    logger.info("Engine (%s): %s Profile, %s Seiten, %s Bewertungen in %.1f s (%.0f Bewertungen/s), %s fehlgeschlagen.",
+                'aiohttp' if aiohttp else 'requests in Threads', stats['profile'], stats['seiten'], stats['bewertungen'],
+                stats['sekunden'], stats['bewertungen'] / max(stats['sekunden'], 1e-9), stats['fehler'])
+    logger.info("HTTP-Statistik:\n%s", http_client.format_fetch_stats())
+
+if __name__ == '__main__':
+    main()
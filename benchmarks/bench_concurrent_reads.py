@@ -0,0 +1,214 @@
+# benchmarks/bench_concurrent_reads.py
+"""
+Misst die Leselatenz der Web UI, während zwei Scraper (Kununu und Trustpilot) gleichzeitig schreiben.
+
+Verglichen werden zwei Varianten auf einer frischen temporären Datenbank:
+    alt  - sqlite3.connect() ohne PRAGMAs (Rollback-Journal, synchronous=FULL, 5 s Timeout)
+    db   - db.get_db_connection() (WAL, busy_timeout, synchronous=NORMAL, Verbindungspool)
+
+Die Schreiber nutzen die echten Upsert-Funktionen der Scraper mit synthetischen Bewertungen,
+der Leser führt reihum die Abfragen der Detailseite und von "Alle Bewertungen" aus.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_concurrent_reads.py
+    python benchmarks/bench_concurrent_reads.py --seconds 10 --page-size 50
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import kununu_scraper
+import trustpilot_scraper
+from database_setup import setup_database
+from ui_queries import (
+    UNTERNEHMEN_NAME_SQL, PROFIL_VERLAUF_SQL, UNTERNEHMENS_STATISTIK_SQL, UNTERNEHMENS_FAKTOREN_SQL,
+    NEUESTE_BEWERTUNGEN_SQL, build_alle_bewertungen_count_query, build_alle_bewertungen_page_query,
+)
+
+def legacy_connection_factory(db_path):
+    """Verbindung wie vor db.py: keine PRAGMAs, jede Verbindung neu geöffnet."""
+    def factory():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return factory
+
+def pooled_connection_factory(db_path):
+    return lambda: db.get_db_connection(db_path)
+
+def make_kununu_page(writer_index, page, page_size):
+    base_date = datetime(2024, 1, 1)
+    reviews = []
+    for i in range(page_size):
+        n = page * page_size + i
+        reviews.append({
+            'platform_review_id': f"k{writer_index}-{n}",
+            'sterne': 1 + n % 5,
+            'titel': f"Bewertung {n}",
+            'text': "Positive: Gutes Team\n\nNegative: Wenig Gehalt " * 4,
+            'datum': (base_date + timedelta(minutes=n)).isoformat(),
+            'review_type': 'employee',
+            'is_recommended': n % 3 != 0,
+            'reviewer_position': 'Angestellte/-r',
+            'reviewer_department': 'IT',
+            'reviewed_entity_name': 'Benchmark GmbH',
+            'reviewed_entity_uuid': None,
+            'is_former_employee': n % 4 == 0,
+            'platform_data_updated_at': None,
+            'reviewer_city': 'Berlin',
+            'reviewer_state': 'Berlin',
+            'apprenticeship_job_title': None,
+            'faktoren': [{'name': name, 'sterne': float(1 + (n + j) % 5)}
+                         for j, name in enumerate(('atmosphere', 'salary', 'workLife', 'teamSpirit'))],
+        })
+    return reviews
+
+def make_trustpilot_page(writer_index, page, page_size):
+    base_date = datetime(2024, 1, 1)
+    reviews = []
+    for i in range(page_size):
+        n = page * page_size + i
+        reviews.append({
+            'id': f"t{writer_index}-{n}",
+            'rating': 1 + n % 5,
+            'title': f"Review {n}",
+            'text': "Fast delivery, friendly support. " * 6,
+            'dates': {'publishedDate': (base_date + timedelta(minutes=n)).isoformat() + 'Z', 'updatedDate': None},
+            'consumer': {'displayName': f"Kunde {n}"},
+            'language': 'de',
+            'source': 'Organic',
+            'likes': n % 7,
+            'labels': {'verification': {'isVerified': n % 2 == 0}},
+        })
+    return reviews
+
+def create_profiles(connection_factory):
+    """Legt ein Unternehmen mit je einem Kununu- und Trustpilot-Profil an."""
+    conn = connection_factory()
+    try:
+        unternehmen_id = kununu_scraper.get_or_create_unternehmen(conn, 'Benchmark GmbH')
+        kununu_profil_id = kununu_scraper.get_or_create_profil(
+            conn, unternehmen_id, kununu_scraper.get_plattform_id(conn, 'Kununu'), 'https://www.kununu.com/de/benchmark')
+        trustpilot_profil_id = trustpilot_scraper.get_or_create_profil(
+            conn, unternehmen_id, trustpilot_scraper.get_plattform_id(conn, 'Trustpilot'), 'https://de.trustpilot.com/review/benchmark.de')
+    finally:
+        conn.close()
+    return unternehmen_id, kununu_profil_id, trustpilot_profil_id
+
+def writer(connection_factory, write_page, stop_event, stats):
+    page = 0
+    while not stop_event.is_set():
+        conn = connection_factory()
+        try:
+            counts = write_page(conn, page)
+        finally:
+            conn.close()
+        if counts['fehlgeschlagen']:
+            stats['fehler'] += 1 # Upsert hat abgebrochen (z.B. "database is locked")
+        else:
+            stats['pages'] += 1
+        page += 1
+
+def reader(connection_factory, unternehmen_id, stop_event, latencies, stats):
+    page_sql, _ = build_alle_bewertungen_page_query('neueste')
+    count_sql = build_alle_bewertungen_count_query()
+    queries = [
+        (UNTERNEHMEN_NAME_SQL, (unternehmen_id,)),
+        (UNTERNEHMENS_STATISTIK_SQL, (unternehmen_id,)),
+        (UNTERNEHMENS_FAKTOREN_SQL, (unternehmen_id,)),
+        (PROFIL_VERLAUF_SQL, (unternehmen_id,)),
+        (NEUESTE_BEWERTUNGEN_SQL, (unternehmen_id,)),
+        (count_sql, (unternehmen_id,)),
+        (page_sql, (unternehmen_id, 25)),
+    ]
+    while not stop_event.is_set():
+        # Eine "Seitenansicht": Verbindung holen, alle Abfragen der Detail- und Listenseite ausführen
+        start = time.perf_counter()
+        conn = connection_factory()
+        try:
+            for sql, params in queries:
+                conn.execute(sql, params).fetchall()
+            latencies.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            stats['fehler'] += 1
+        finally:
+            conn.close()
+        time.sleep(0.005)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def run_variant(name, seconds, page_size, readers):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup_database(db_path)
+        if name == 'alt':
+            conn = sqlite3.connect(db_path)
+            conn.execute("PRAGMA journal_mode=DELETE") # setup_database schaltet die Datei auf WAL
+            conn.close()
+            connection_factory = legacy_connection_factory(db_path)
+        else:
+            connection_factory = pooled_connection_factory(db_path)
+
+        unternehmen_id, kununu_profil_id, trustpilot_profil_id = create_profiles(connection_factory)
+        stop_event = threading.Event()
+        writer_stats = [{'pages': 0, 'fehler': 0}, {'pages': 0, 'fehler': 0}]
+        reader_stats = {'fehler': 0}
+        latencies = []
+        threads = [
+            threading.Thread(target=writer, args=(
+                connection_factory,
+                lambda conn, page: kununu_scraper.upsert_kununu_reviews_bulk(conn, kununu_profil_id, make_kununu_page(0, page, page_size)),
+                stop_event, writer_stats[0])),
+            threading.Thread(target=writer, args=(
+                connection_factory,
+                lambda conn, page: trustpilot_scraper.add_or_update_trustpilot_reviews_page(conn, trustpilot_profil_id, make_trustpilot_page(1, page, page_size)),
+                stop_event, writer_stats[1])),
+        ]
+        threads += [threading.Thread(target=reader, args=(connection_factory, unternehmen_id, stop_event, latencies, reader_stats))
+                    for _ in range(readers)]
+
+        # Die Scraper geben pro Seite eine Statuszeile aus; für die Messung unterdrücken
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+        db.close_all_connections()
+
+    geschriebene_seiten = sum(stats['pages'] for stats in writer_stats)
+    schreibfehler = sum(stats['fehler'] for stats in writer_stats)
+    print(f"{name:<4} Seitenansichten: {len(latencies):>6}  "
+          f"p50: {statistics.median(latencies) * 1000:7.2f} ms  "
+          f"p95: {percentile(latencies, 0.95) * 1000:7.2f} ms  "
+          f"max: {max(latencies) * 1000:7.2f} ms  "
+          f"Lesefehler: {reader_stats['fehler']}  "
+          f"Geschriebene Seiten: {geschriebene_seiten} ({geschriebene_seiten * page_size / seconds:.0f} Bewertungen/s), "
+          f"Schreibfehler: {schreibfehler}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Leselatenz der Web UI bei gleichzeitig schreibenden Scrapern.")
+    parser.add_argument('--seconds', type=float, default=5.0, help="Messdauer pro Variante")
+    parser.add_argument('--page-size', type=int, default=20, help="Bewertungen pro geschriebener Seite")
+    parser.add_argument('--readers', type=int, default=2, help="Anzahl gleichzeitiger Leser (Web-Requests)")
+    args = parser.parse_args()
+    for name in ('alt', 'db'):
+        run_variant(name, args.seconds, args.page_size, args.readers)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/bench_overview_parsing.py
+"""
+Misst Parse-Zeit und Spitzen-Speicher beim Auswerten von Kununu-Übersichtsseiten.
+
+Verglichen werden:
+    alt  - vollständiger BeautifulSoup-Baum mit 'html.parser', Selektoren auf dem ganzen Dokument,
+           Apollo-State über soup.find() und UUID-Fallback per Regex über str(soup)
+    neu  - kununu_scraper.parse_overview_html() (SoupStrainer, nur die Bewertungs-<span>, lxml falls
+           installiert) plus extract_profile_uuid() direkt auf den Rohbytes
+
+Als Eingabe dienen gespeicherte Übersichtsseiten: als Argument übergebene Dateien, sonst
+benchmarks/fixtures/kununu_overview*.html, sonst Kununu-Übersichtsseiten aus dem HTTP-Cache
+(http_cache.db). Ist nichts davon vorhanden, wird eine synthetische Seite in realistischer Größe erzeugt.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_overview_parsing.py
+    python benchmarks/bench_overview_parsing.py gespeicherte_seite.html --runs 20
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import kununu_scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+HTTP_CACHE_DB = 'http_cache.db'
+
+def load_cached_pages(db_path):
+    """Liest Kununu-Übersichtsseiten (keine API-, keine Kommentarseiten) aus dem HTTP-Cache."""
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT url, content FROM responses WHERE url LIKE '%kununu.com/%' AND url NOT LIKE '%/middlewares/%' "
+            "AND url NOT LIKE '%/kommentare%' AND status_code = 200 AND content IS NOT NULL"
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+    return [(url, bytes(content)) for url, content in rows if b'apollo-state' in bytes(content)]
+
+def synthetic_overview_page(filler_blocks=1500):
+    """Erzeugt eine Übersichtsseite mit den gleichen Markierungen wie kununu.com (ca. 400 KiB)."""
+    profile_uuid = str(uuid.uuid4())
+    apollo_state = {
+        'ROOT_QUERY': {
+            'profile({"slug":"benchmark-gmbh"})': {'uuid': profile_uuid, 'slug': 'benchmark-gmbh', 'name': 'Benchmark GmbH'},
+        },
+    }
+    for i in range(filler_blocks // 3):
+        apollo_state[f'Review:{uuid.uuid4()}'] = {'uuid': str(uuid.uuid4()), 'title': f"Bewertung {i}", 'score': 3.8}
+    filler = ''.join(
+        f'<div class="index__card__{i % 7}"><a href="/de/firma-{i}">Firma {i}</a>'
+        f'<p class="p-small-regular">Positive: Gutes Team &amp; flexible Arbeitszeiten {i}</p>'
+        f'<ul><li>Gehalt</li><li>Work-Life-Balance</li><li>Kollegenzusammenhalt</li></ul></div>'
+        for i in range(filler_blocks)
+    )
+    html = (
+        '<!DOCTYPE html><html lang="de"><head><meta charset="utf-8"><title>Benchmark GmbH</title>'
+        '<script>window.dataLayer = [];</script></head><body><main>'
+        '<section><span class="h2 index__value__abc12">3,8</span>'
+        '<span class="helper-regular p-tiny-regular-tablet text-dark-53">13.163 Bewertungen</span></section>'
+        f'{filler}</main>'
+        f'<script type="application/json" data-testid="apollo-state">{json.dumps(apollo_state)}</script>'
+        '</body></html>'
+    )
+    return html.encode('utf-8')
+
+def collect_pages(paths):
+    if paths:
+        return [(path, open(path, 'rb').read()) for path in paths]
+    fixtures = sorted(glob.glob(os.path.join(FIXTURES_DIR, 'kununu_overview*.html')))
+    if fixtures:
+        return [(path, open(path, 'rb').read()) for path in fixtures]
+    pages = load_cached_pages(HTTP_CACHE_DB)
+    if pages:
+        return pages
+    return [('synthetisch', synthetic_overview_page())]
+
+def parse_alt(html):
+    """Der Weg vor dem Umbau: ganzer Baum, UUID aus dem Script-Tag oder per Regex über str(soup)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    werte = kununu_scraper.scrape_kununu_overview_data(soup, 'benchmark')
+    profile_uuid = None
+    apollo_state_script = soup.find('script', attrs={'data-testid': 'apollo-state'})
+    if apollo_state_script:
+        for value in json.loads(apollo_state_script.string).get('ROOT_QUERY', {}).values():
+            if isinstance(value, dict) and 'uuid' in value and 'slug' in value:
+                profile_uuid = value['uuid']
+                break
+    if not profile_uuid:
+        match = re.search(r'"uuid":"([a-f0-9\-]{36})"', str(soup))
+        profile_uuid = match.group(1) if match else None
+    return werte, profile_uuid
+
+def parse_neu(html):
+    werte = kununu_scraper.scrape_kununu_overview_data(kununu_scraper.parse_overview_html(html), 'benchmark')
+    return werte, kununu_scraper.extract_profile_uuid(html)
+
+def measure(parse, html, runs):
+    # Die Parser geben DEBUG-Zeilen aus; für die Messung unterdrücken
+    with contextlib.redirect_stdout(io.StringIO()):
+        ergebnis = parse(html)
+        zeiten = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            parse(html)
+            zeiten.append(time.perf_counter() - start)
+        tracemalloc.start()
+        parse(html)
+        _, spitze = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return ergebnis, statistics.median(zeiten), spitze
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse-Zeit und Speicher für Kununu-Übersichtsseiten (alt vs. neu).")
+    parser.add_argument('pages', nargs='*', help="Gespeicherte Übersichtsseiten (HTML-Dateien)")
+    parser.add_argument('--runs', type=int, default=10, help="Messläufe pro Seite und Variante")
+    args = parser.parse_args()
+
+    print(f"HTML-Parser für den neuen Weg: {kununu_scraper.OVERVIEW_HTML_PARSER}")
+    for name, html in collect_pages(args.pages):
+        print(f"\n{name} ({len(html) / 1024:.0f} KiB)")
+        ergebnisse = {}
+        for variante, parse in (('alt', parse_alt), ('neu', parse_neu)):
+            ergebnis, median, spitze = measure(parse, html, args.runs)
+            ergebnisse[variante] = ergebnis
+            print(f"  {variante:<4} Median: {median * 1000:8.2f} ms  Spitzen-Speicher: {spitze / 1024 / 1024:7.2f} MiB  "
+                  f"Ergebnis: {ergebnis}")
+        if ergebnisse['alt'] != ergebnisse['neu']:
+            print("  WARNUNG: Alt und neu liefern unterschiedliche Ergebnisse!")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_parallel_runner.py
+"""
+Durchsatz des Mehrprozess-Runners (parallel_runner.py) in Abhängigkeit von der Anzahl Worker.
+
+Der lokale Stub-Server (stub_server.py, eigener Prozess) liefert die aufgezeichneten Kununu- und
+Trustpilot-Seiten aus benchmarks/fixtures bzw. trustpilot_example.json aus, mit eindeutigen
+Bewertungs-IDs pro Profil und Seite.
+
+Pro Worker-Anzahl wird eine frische temporäre Datenbank vollständig gescraped (--voll-Modus).
+Ausgegeben werden Bewertungen/s, Seiten/s und der Faktor gegenüber einem Worker. Auf einer
+Maschine mit nur einem Kern ist kein Gewinn zu erwarten.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_parallel_runner.py
+    python benchmarks/bench_parallel_runner.py --workers 1 2 4 8 --profiles 8 --bewertungen 1000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db
+import kununu_scraper
+import parallel_runner
+import trustpilot_scraper
+from database_setup import setup_database
+from stub_server import running_stub
+
+def create_profiles(db_path, profiles, stub_url):
+    conn = db.connect(db_path)
+    try:
+        kununu_plattform_id = kununu_scraper.get_plattform_id(conn, 'Kununu')
+        trustpilot_plattform_id = trustpilot_scraper.get_plattform_id(conn, 'Trustpilot')
+        jobs = []
+        for i in range(profiles):
+            unternehmen_id = kununu_scraper.get_or_create_unternehmen(conn, f"Benchmark {i} GmbH")
+            url = f"{stub_url}/de/bench-k-{i}"
+            jobs.append({'profil_id': kununu_scraper.get_or_create_profil(conn, unternehmen_id, kununu_plattform_id, url),
+                         'plattform': 'Kununu', 'url': url, 'unternehmen_name': f"Benchmark {i} GmbH"})
+            url = f"https://de.trustpilot.com/review/bench-tp-{i}.de"
+            jobs.append({'profil_id': trustpilot_scraper.get_or_create_profil(conn, unternehmen_id, trustpilot_plattform_id, url),
+                         'plattform': 'Trustpilot', 'url': url, 'unternehmen_name': f"Benchmark {i} GmbH"})
+    finally:
+        conn.close()
+    return jobs
+
+@contextlib.contextmanager
+def silenced_stdout():
+    """Unterdrückt die Ausgaben des Runners, auch die der Worker-Prozesse (erben Dateideskriptor 1)."""
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.dup2(saved_fd, 1)
+        os.close(saved_fd)
+        os.close(devnull)
+
+def run_variant(workers, profiles, stub_url):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        with silenced_stdout():
+            setup_database(db_path)
+            jobs = create_profiles(db_path, profiles, stub_url)
+            stats = parallel_runner.run(jobs, workers=workers, db_name=db_path, incremental=False,
+                                        trustpilot_base_url=stub_url, kununu_base_url=stub_url,
+                                        trustpilot_max_requests=10 ** 9)
+        db.close_all_connections()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Durchsatz von parallel_runner.py je Anzahl Worker-Prozesse.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Zu messende Worker-Anzahlen")
+    parser.add_argument('--profiles', type=int, default=4, help="Unternehmen (je ein Kununu- und ein Trustpilot-Profil)")
+    parser.add_argument('--bewertungen', type=int, default=200, help="Bewertungen pro Profil")
+    args = parser.parse_args()
+
+    os.environ['SCRAPER_CACHE'] = '0' # HTTP-Cache in allen Prozessen aus, sonst misst der zweite Lauf den Cache
+    with running_stub(args.bewertungen) as (stub_url, kununu_seiten, trustpilot_seiten):
+        print(f"CPU-Kerne: {os.cpu_count()}, {args.profiles * 2} Profile à {args.bewertungen} Bewertungen "
+              f"(Kununu {kununu_seiten}, Trustpilot {trustpilot_seiten} Seiten)")
+        basis = None
+        for workers in args.workers:
+            stats = run_variant(workers, args.profiles, stub_url)
+            durchsatz = stats['bewertungen'] / stats['sekunden']
+            basis = basis or durchsatz
+            print(f"Worker: {workers:>2}  {stats['sekunden']:6.2f} s  {durchsatz:8.0f} Bewertungen/s  "
+                  f"{stats['seiten'] / stats['sekunden']:6.1f} Seiten/s  Faktor: {durchsatz / basis:4.2f}  "
+                  f"Fehler: {stats['fehler']}")
+
+if __name__ == '__main__':
+    main()
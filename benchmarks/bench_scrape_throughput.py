@@ -0,0 +1,190 @@
+# benchmarks/bench_scrape_throughput.py
+"""
+End-to-End-Durchsatz von main_scraper (Kununu) und main_trustpilot_scraper gegen aufgezeichnete Seiten.
+
+Der Stub-Server (stub_server.py) liefert die Fixtures aus benchmarks/fixtures bzw. trustpilot_example.json
+aus, synthetisch skaliert auf --bewertungen Bewertungen pro Profil. Jede Plattform läuft in einem
+eigenen Prozess mit frischer Datenbank in einem temporären Verzeichnis, zweimal hintereinander:
+
+    erstlauf     - leere Datenbank, alle Bewertungen sind neu
+    wiederholung - zweiter vollständiger Durchlauf, alle Bewertungen sind unverändert
+
+Gemessen werden Seiten/s, Bewertungen/s, Anzahl der Datenbank-Commits (über den Trace-Callback aller
+Verbindungen aus db.py) und der Spitzen-RSS des Scraper-Prozesses. Der HTTP-Cache ist abgeschaltet,
+das Trustpilot-Rate-Limit aufgehoben.
+Die Scraper loggen mit --log-level (Standard WARNING, d.h. wie ein stiller Produktionslauf).
+Mit --engine asyncio laufen dieselben Scrapes über async_engine statt über die Thread-Scraper.
+Mit --proxies N laufen alle Anfragen über N lokale Forward-Proxys (stub_server.running_proxies) und
+den Proxy-Pool, dessen Budget pro Proxy dabei ebenfalls aufgehoben ist.
+
+Mit --json werden die Ergebnisse gespeichert, --vergleich zeigt die Abweichung zu einem früheren Lauf:
+    python benchmarks/bench_scrape_throughput.py --json vorher.json
+    python benchmarks/bench_scrape_throughput.py --vergleich vorher.json
+    python benchmarks/bench_scrape_throughput.py --bewertungen 100000 --plattform Trustpilot
+    python benchmarks/bench_scrape_throughput.py --engine asyncio --vergleich vorher.json
+    python benchmarks/bench_scrape_throughput.py --proxies 3 --vergleich vorher.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import running_proxies, running_stub
+
+PLATTFORMEN = ('Kununu', 'Trustpilot')
+DURCHLAEUFE = ('erstlauf', 'wiederholung')
+ENGINES = ('threads', 'asyncio')
+KUNUNU_SLUG = 'muster-gmbh'
+TRUSTPILOT_SLUG = 'www.mindfactory.de'
+
+def _count_commits(counter):
+    """Zählt COMMITs auf allen Verbindungen, die db.py ab jetzt konfiguriert."""
+    import db
+    configure_connection = db.configure_connection
+
+    def counting_configure_connection(conn):
+        conn.set_trace_callback(lambda statement: statement.startswith('COMMIT') and counter.__setitem__(0, counter[0] + 1))
+        return configure_connection(conn)
+
+    db.configure_connection = counting_configure_connection
+
+async def _run_async_engine(plattform, base_url, progress_callback):
+    import async_engine
+    async with async_engine.AsyncScrapeEngine(trustpilot_base_url=base_url, trustpilot_max_requests=10 ** 9) as engine:
+        if plattform == 'Kununu':
+            await engine.scrape_kununu("Muster GmbH", f"{base_url}/de/{KUNUNU_SLUG}", incremental=False,
+                                       progress_callback=progress_callback)
+        else:
+            await engine.scrape_trustpilot(f"https://de.trustpilot.com/review/{TRUSTPILOT_SLUG}", incremental=False,
+                                           progress_callback=progress_callback)
+
+def _run_scraper(plattform, base_url, engine, progress_callback):
+    if engine == 'asyncio':
+        asyncio.run(_run_async_engine(plattform, base_url, progress_callback))
+    elif plattform == 'Kununu':
+        import kununu_scraper
+        kununu_scraper.main_scraper("Muster GmbH", f"{base_url}/de/{KUNUNU_SLUG}",
+                                    f"{base_url}/de/{KUNUNU_SLUG}/kommentare", incremental=False,
+                                    progress_callback=progress_callback)
+    else:
+        import trustpilot_scraper
+        trustpilot_scraper.main_trustpilot_scraper(f"https://de.trustpilot.com/review/{TRUSTPILOT_SLUG}",
+                                                   api_base_url=base_url, incremental=False,
+                                                   progress_callback=progress_callback)
+
+def measure_platform(plattform, base_url, engine, log_level, proxy_urls, result_pipe):
+    """Einstiegspunkt des Messprozesses: beide Durchläufe einer Plattform in einer frischen Datenbank."""
+    import http_client
+    import kununu_scraper
+    import metrics
+    import proxy_pool
+    import trustpilot_scraper
+    from database_setup import setup_database
+    from db import get_db_connection
+
+    metrics.configure_logging(log_level)
+    kununu_scraper.KUNUNU_BASE_URL = base_url
+    # Ohne Rate-Limit, sonst misst der Benchmark nur den Token-Bucket
+    trustpilot_scraper.trustpilot_rate_limiter = trustpilot_scraper.TokenBucket(10 ** 9, 1, capacity=10 ** 6)
+    http_client.configure_proxy_pool(proxy_pool.ProxyPool(proxy_urls, max_requests=10 ** 9, timeframe_seconds=1)
+                                     if proxy_urls else None)
+
+    commits = [0]
+    ergebnisse = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir) # Datenbank.db liegt relativ zum Arbeitsverzeichnis
+        sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+        setup_database()
+        _count_commits(commits)
+
+        for durchlauf in DURCHLAEUFE:
+            seiten = [0]
+            def progress_callback(done, total):
+                seiten[0] = max(seiten[0], done)
+
+            commits[0] = 0
+            lauf_start = time.strftime('%Y-%m-%d %H:%M:%S')
+            time.sleep(1) # last_seen_scraping_datum hat Sekundenauflösung
+            start = time.perf_counter()
+            _run_scraper(plattform, base_url, engine, progress_callback)
+            sekunden = time.perf_counter() - start
+            gezaehlte_commits = commits[0]
+
+            conn = get_db_connection()
+            try:
+                bewertungen = conn.execute(
+                    "SELECT COUNT(*) FROM bewertungen WHERE last_seen_scraping_datum >= ?", (lauf_start,)).fetchone()[0]
+            finally:
+                conn.close()
+            ergebnisse[durchlauf] = {
+                'seiten': seiten[0],
+                'bewertungen': bewertungen,
+                'sekunden': sekunden,
+                'commits': gezaehlte_commits,
+                'spitzen_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # Linux: KiB
+            }
+        os.chdir('/')
+    result_pipe.send(ergebnisse)
+
+def run_platform(plattform, base_url, engine, log_level, proxy_urls):
+    context = multiprocessing.get_context('spawn')
+    parent_pipe, child_pipe = context.Pipe()
+    process = context.Process(target=measure_platform, args=(plattform, base_url, engine, log_level, proxy_urls, child_pipe))
+    process.start()
+    ergebnisse = parent_pipe.recv()
+    process.join()
+    return ergebnisse
+
+def _abweichung(neu, alt):
+    if not alt:
+        return ""
+    return f" ({(neu - alt) / alt * 100:+.0f} %)"
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-End-Durchsatz der Scraper gegen aufgezeichnete Seiten.")
+    parser.add_argument('--bewertungen', type=int, default=20000, help="Bewertungen pro Profil (synthetisch skaliert)")
+    parser.add_argument('--plattform', choices=PLATTFORMEN, action='append', help="Nur diese Plattform(en) messen")
+    parser.add_argument('--engine', choices=ENGINES, default='threads', help="Thread-Scraper oder async_engine")
+    parser.add_argument('--proxies', type=int, default=0, help="Anzahl lokaler Forward-Proxys (0 = direkt)")
+    parser.add_argument('--log-level', default='WARNING', help="Log-Level der Scraper während der Messung")
+    parser.add_argument('--json', help="Ergebnisse als JSON in diese Datei schreiben")
+    parser.add_argument('--vergleich', help="Ergebnisse eines früheren Laufs (--json) zum Vergleich")
+    args = parser.parse_args()
+
+    os.environ['SCRAPER_CACHE'] = '0' # Wird von den Messprozessen geerbt
+    vergleich = {}
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as f:
+            vergleich = json.load(f)
+
+    ergebnisse = {}
+    with running_stub(args.bewertungen) as (base_url, kununu_seiten, trustpilot_seiten), \
+            (running_proxies(args.proxies) if args.proxies else contextlib.nullcontext([])) as proxy_urls:
+        print(f"{args.bewertungen} Bewertungen pro Profil: Kununu {kununu_seiten} Seiten, Trustpilot {trustpilot_seiten} Seiten")
+        for plattform in args.plattform or PLATTFORMEN:
+            ergebnisse[plattform] = run_platform(plattform, base_url, args.engine, args.log_level, proxy_urls)
+            for durchlauf, werte in ergebnisse[plattform].items():
+                alt = vergleich.get(plattform, {}).get(durchlauf, {})
+                seiten_pro_s = werte['seiten'] / werte['sekunden']
+                bewertungen_pro_s = werte['bewertungen'] / werte['sekunden']
+                print(f"{plattform:<10} {durchlauf:<12} {werte['sekunden']:7.2f} s  "
+                      f"{seiten_pro_s:7.1f} Seiten/s{_abweichung(seiten_pro_s, alt and alt['seiten'] / alt['sekunden'])}  "
+                      f"{bewertungen_pro_s:7.0f} Bewertungen/s{_abweichung(bewertungen_pro_s, alt and alt['bewertungen'] / alt['sekunden'])}  "
+                      f"{werte['commits']:6d} Commits{_abweichung(werte['commits'], alt.get('commits'))}  "
+                      f"RSS {werte['spitzen_rss_mib']:6.1f} MiB{_abweichung(werte['spitzen_rss_mib'], alt.get('spitzen_rss_mib'))}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'bewertungen_pro_profil': args.bewertungen, **ergebnisse}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+# benchmarks/stub_server.py
+"""
+Lokaler HTTP-Stub für Benchmarks: liefert aufgezeichnete Kununu- und Trustpilot-Antworten aus.
+
+Routen (wie auf den echten Seiten, die Basis-URL wird über KUNUNU_BASE_URL bzw. api_base_url umgebogen):
+    /de/<slug>                                         Kununu-Übersichtsseite (fixtures/kununu_profile_page.html)
+    /middlewares/profiles/de/<slug>/<uuid>/reviews?... Kununu-Bewertungs-API (fixtures/kununu_reviews_page.json)
+    /review/<slug>                                     Trustpilot-Profilseite mit Build-ID (fixtures/trustpilot_profile_page.html)
+    /_next/data/<build-id>/review/<slug>.json[?page=N] Trustpilot-Seite (trustpilot_example.json im Projektverzeichnis)
+
+Jede aufgezeichnete Seite wird synthetisch auf reviews_per_profile Bewertungen pro Profil skaliert:
+Seitenzahl (pagesCount bzw. totalPages) wird angepasst und jede Bewertung bekommt eine pro Profil
+und Seite eindeutige ID. Die Seiten entstehen beim Abruf per Bytes-Ersetzung aus einer Vorlage,
+sodass auch 100.000+ Bewertungen keinen Speicher im Server kosten.
+
+Der Server läuft in einem eigenen Prozess, damit er die Messung im Scraper-Prozess nicht verfälscht:
+
+    with running_stub(reviews_per_profile=100_000) as (base_url, kununu_seiten, trustpilot_seiten):
+        ...
+
+Für den Proxy-Pool (proxy_pool) startet running_proxies() einfache Forward-Proxys, die absolute
+http://-URLs an den Zielserver weiterreichen (kein CONNECT/HTTPS). Mit block_every antwortet jeder
+Proxy auf jede n-te Anfrage mit 403, um Rotation und Quarantäne auszulösen:
+
+    with running_proxies(3, block_every=50) as proxy_urls:
+        http_client.configure_proxy_pool(proxy_pool.ProxyPool(proxy_urls))
+"""
+import contextlib
+import http.client
+import json
+import math
+import multiprocessing
+import os
+import re
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'fixtures')
+TRUSTPILOT_PAGE_FIXTURE = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'trustpilot_example.json')
+
+# Platzhalter in den Vorlagen; die Seitenzahl muss eine Zahl bleiben, damit die Vorlage gültiges JSON ist
+REVIEW_ID_PLACEHOLDER = '@@review@@'
+PAGE_COUNT_PLACEHOLDER = 987654321
+
+KUNUNU_PROFILE_ROUTE = re.compile(r'^/de/(?P<slug>[^/?]+)$')
+KUNUNU_REVIEWS_ROUTE = re.compile(r'^/middlewares/profiles/de/(?P<slug>[^/]+)/[^/]+/reviews\?(?:.*&)?page=(?P<page>\d+)')
+TRUSTPILOT_PROFILE_ROUTE = re.compile(r'^/review/(?P<slug>[^/?]+)$')
+TRUSTPILOT_PAGE_ROUTE = re.compile(r'^/_next/data/[^/]+/review/(?P<slug>[^/?]+)\.json(?:\?page=(?P<page>\d+))?$')
+
+def _page_template(page, reviews, id_key, set_page_count):
+    """Serialisiert eine aufgezeichnete Seite mit Platzhaltern für Bewertungs-IDs und Seitenzahl."""
+    for i, review in enumerate(reviews):
+        review[id_key] = f"{REVIEW_ID_PLACEHOLDER}{i:012x}"
+    set_page_count(page, PAGE_COUNT_PLACEHOLDER)
+    return json.dumps(page, ensure_ascii=False).encode('utf-8'), len(reviews)
+
+class FixtureSite:
+    """Erzeugt die Antworten des Stubs aus den Fixtures."""
+
+    def __init__(self, reviews_per_profile, fixtures_dir=FIXTURES_DIR, trustpilot_page_fixture=TRUSTPILOT_PAGE_FIXTURE):
+        with open(os.path.join(fixtures_dir, 'kununu_profile_page.html'), 'rb') as f:
+            self.kununu_profile_page = f.read()
+        with open(os.path.join(fixtures_dir, 'trustpilot_profile_page.html'), 'rb') as f:
+            self.trustpilot_profile_page = f.read()
+
+        with open(os.path.join(fixtures_dir, 'kununu_reviews_page.json'), encoding='utf-8') as f:
+            kununu_page = json.load(f)
+        self.kununu_template, kununu_per_page = _page_template(
+            kununu_page, kununu_page['reviews'], 'uuid', lambda page, n: page.__setitem__('pagesCount', n))
+        self.kununu_pages = max(1, math.ceil(reviews_per_profile / kununu_per_page))
+
+        with open(trustpilot_page_fixture, encoding='utf-8') as f:
+            trustpilot_page = json.load(f)
+        self.trustpilot_template, trustpilot_per_page = _page_template(
+            trustpilot_page, trustpilot_page['pageProps']['reviews'], 'id',
+            lambda page, n: page['pageProps']['filters']['pagination'].__setitem__('totalPages', n))
+        self.trustpilot_pages = max(1, math.ceil(reviews_per_profile / trustpilot_per_page))
+
+    @staticmethod
+    def _render(template, total_pages, id_prefix):
+        return (template.replace(str(PAGE_COUNT_PLACEHOLDER).encode(), str(total_pages).encode())
+                        .replace(REVIEW_ID_PLACEHOLDER.encode(), id_prefix.encode()))
+
+    def kununu_reviews_page(self, slug, page):
+        if not 1 <= page <= self.kununu_pages:
+            return None
+        # UUID-Format beibehalten: <Profil-Hash>-<Seite>-4000-8000-<Index>
+        return self._render(self.kununu_template, self.kununu_pages, f"{_slug_hash(slug)}-{page:04x}-4000-8000-")
+
+    def trustpilot_page(self, slug, page):
+        if not 1 <= page <= self.trustpilot_pages:
+            return None
+        return self._render(self.trustpilot_template, self.trustpilot_pages, f"{_slug_hash(slug)}{page:06x}")
+
+    def response(self, path):
+        """Gibt (content_type, body) für einen Pfad zurück, oder None für 404."""
+        if KUNUNU_PROFILE_ROUTE.match(path):
+            return 'text/html; charset=utf-8', self.kununu_profile_page
+        if TRUSTPILOT_PROFILE_ROUTE.match(path):
+            return 'text/html; charset=utf-8', self.trustpilot_profile_page
+        match = KUNUNU_REVIEWS_ROUTE.match(path)
+        if match:
+            body = self.kununu_reviews_page(match['slug'], int(match['page']))
+            return ('application/json', body) if body else None
+        match = TRUSTPILOT_PAGE_ROUTE.match(path)
+        if match:
+            body = self.trustpilot_page(match['slug'], int(match['page'] or 1))
+            return ('application/json', body) if body else None
+        return None
+
+def _slug_hash(slug):
+    """8 Hex-Zeichen pro Profil, damit Bewertungs-IDs auch über Profile hinweg eindeutig sind."""
+    return f"{sum((i + 1) * ord(c) for i, c in enumerate(slug)) & 0xffffffff:08x}"
+
+def serve(reviews_per_profile, port_pipe, fixtures_dir=FIXTURES_DIR):
+    """Einstiegspunkt des Server-Prozesses: meldet den Port über port_pipe und bedient Anfragen."""
+    site = FixtureSite(reviews_per_profile, fixtures_dir)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # Keep-Alive, wie bei den echten Seiten über die gepoolte Session
+        disable_nagle_algorithm = True # Header und Body sind getrennte Writes; sonst ~40 ms Delayed-ACK pro Antwort
+
+        def do_GET(self):
+            result = site.response(self.path)
+            if result is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            content_type, body = result
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    port_pipe.send((server.server_port, site.kununu_pages, site.trustpilot_pages))
+    server.serve_forever()
+
+@contextlib.contextmanager
+def running_stub(reviews_per_profile, fixtures_dir=FIXTURES_DIR):
+    """
+    Startet den Stub in einem eigenen Prozess.
+
+    Yields:
+        tuple: (base_url, kununu_seiten, trustpilot_seiten) - Seiten pro Profil.
+    """
+    context = multiprocessing.get_context('spawn')
+    parent_pipe, child_pipe = context.Pipe()
+    process = context.Process(target=serve, args=(reviews_per_profile, child_pipe, fixtures_dir), daemon=True)
+    process.start()
+    try:
+        port, kununu_pages, trustpilot_pages = parent_pipe.recv()
+        yield f"http://127.0.0.1:{port}", kununu_pages, trustpilot_pages
+    finally:
+        process.terminate()
+        process.join()
+
+def serve_proxies(count, block_every, port_pipe):
+    """Einstiegspunkt des Proxy-Prozesses: count Forward-Proxys, die Ports gehen über port_pipe zurück."""
+    upstream = threading.local() # Eine Keep-Alive-Verbindung pro Handler-Thread und Zielhost
+
+    class ProxyHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _send_empty(self, status):
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_GET(self):
+            target = urlsplit(self.path)
+            if target.scheme != 'http':
+                self._send_empty(400)
+                return
+            with self.server.lock:
+                self.server.anfragen += 1
+                blockiert = block_every and self.server.anfragen % block_every == 0
+            if blockiert:
+                self._send_empty(403)
+                return
+            connections = upstream.__dict__.setdefault('connections', {})
+            connection = connections.get(target.netloc)
+            if connection is None:
+                connection = connections[target.netloc] = http.client.HTTPConnection(target.netloc, timeout=30)
+            path = target.path + (f"?{target.query}" if target.query else '')
+            headers = {name: value for name, value in self.headers.items() if name.lower() not in ('proxy-connection', 'connection')}
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connections.pop(target.netloc, None)
+                self._send_empty(502)
+                return
+            self.send_response(response.status)
+            for name, value in response.getheaders():
+                if name.lower() not in ('connection', 'keep-alive', 'transfer-encoding', 'content-length'):
+                    self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    servers = []
+    for _ in range(count):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+        server.daemon_threads = True
+        server.lock = threading.Lock()
+        server.anfragen = 0
+        servers.append(server)
+    port_pipe.send([server.server_port for server in servers])
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    servers[0].serve_forever()
+
+@contextlib.contextmanager
+def running_proxies(count, block_every=None):
+    """
+    Startet count Forward-Proxys in einem eigenen Prozess.
+
+    Yields:
+        list: Die Proxy-URLs (http://127.0.0.1:<port>).
+    """
+    context = multiprocessing.get_context('spawn')
+    parent_pipe, child_pipe = context.Pipe()
+    process = context.Process(target=serve_proxies, args=(count, block_every, child_pipe), daemon=True)
+    process.start()
+    try:
+        yield [f"http://127.0.0.1:{port}" for port in parent_pipe.recv()]
+    finally:
+        process.terminate()
+        process.join()
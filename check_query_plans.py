@@ -0,0 +1,93 @@
+# check_query_plans.py
+"""
+Prüft die Ausführungspläne (EXPLAIN QUERY PLAN) aller Abfragen der Web UI.
+
+Eine Abfrage gilt als fehlerhaft, wenn sie eine Tabelle komplett durchläuft (SCAN) und das
+Ergebnis zusätzlich über einen temporären B-Baum sortiert (USE TEMP B-TREE). Das passiert,
+wenn ein passender Index aus database_setup.py fehlt oder nicht mehr greift.
+
+Für die Abfragen in SORTIERUNG_PER_INDEX (Keyset-Paginierung von "Alle Bewertungen" und die neuesten
+Bewertungen der Detailseite) ist jede temporäre Sortierung ein Fehler, auch ohne Full Scan: Sonst
+sortiert SQLite auf jeder Seite alle Bewertungen des Unternehmens, statt ab dem Cursor im Index zu lesen.
+
+Aufruf von der Kommandozeile:
+    python check_query_plans.py               # gegen eine frisch angelegte, leere Datenbank
+    python check_query_plans.py Datenbank.db  # gegen eine bestehende Datenbank (inkl. ANALYZE-Statistiken)
+    python check_query_plans.py -v            # alle Pläne ausgeben
+
+Rückgabewert 1, wenn mindestens eine Abfrage durchfällt.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from database_setup import setup_database
+from db import connect
+from ui_queries import iter_ui_queries
+
+# Namenspräfixe aus iter_ui_queries(), deren Sortierung vollständig aus einem Index kommen muss
+SORTIERUNG_PER_INDEX = ('neueste_bewertungen', 'alle_bewertungen[')
+
+def get_query_plan(conn, sql, params):
+    """Gibt die Detailzeilen von EXPLAIN QUERY PLAN als Liste von Strings zurück."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+def is_full_scan_with_temp_sort(plan):
+    # "SCAN bewertungen_fts VIRTUAL TABLE INDEX ..." ist eine Suche im FTS5-Index, kein Full Scan;
+    # die anschließende Sortierung nach Relevanz (bm25) lässt sich nicht über einen Index abbilden.
+    has_full_scan = any(detail.startswith('SCAN ') and 'VIRTUAL TABLE INDEX' not in detail for detail in plan)
+    return has_full_scan and has_temp_sort(plan)
+
+def has_temp_sort(plan):
+    return any('USE TEMP B-TREE' in detail for detail in plan)
+
+def check_query_plans(conn, verbose=False):
+    """
+    Prüft alle Abfragen aus ui_queries.iter_ui_queries().
+
+    Returns:
+        list: Namen und Pläne der durchgefallenen Abfragen als (name, plan)-Tupel.
+    """
+    failures = []
+    for name, sql, params in iter_ui_queries():
+        plan = get_query_plan(conn, sql, params)
+        failed = is_full_scan_with_temp_sort(plan) or (name.startswith(SORTIERUNG_PER_INDEX) and has_temp_sort(plan))
+        if failed:
+            failures.append((name, plan))
+        if verbose or failed:
+            print(f"{'FEHLER' if failed else 'OK':<6} {name}")
+            for detail in plan:
+                print(f"         {detail}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Prüft die Abfragepläne der Web UI.")
+    parser.add_argument('db_path', nargs='?', help="Bestehende Datenbank (Standard: leere temporäre Datenbank)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Alle Pläne ausgeben")
+    args = parser.parse_args()
+
+    if args.db_path:
+        db_path = args.db_path
+        setup_database(db_path) # Stellt sicher, dass alle Indizes (Migrationen) vorhanden sind
+        temp_dir = None
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(temp_dir.name, 'query_plans.db')
+        setup_database(db_path)
+
+    conn = connect(db_path)
+    try:
+        failures = check_query_plans(conn, verbose=args.verbose)
+    finally:
+        conn.close()
+        if temp_dir:
+            temp_dir.cleanup()
+
+    if failures:
+        print(f"{len(failures)} Abfrage(n) mit unzulässiger temporärer Sortierung.")
+        sys.exit(1)
+    print("Alle Abfragepläne OK.")
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,286 @@
 # database_setup.py
-import sqlite3
+from db import connect
 
-def setup_database():
+def _add_column_if_missing(cursor, table, column, column_definition):
+    """
+    Ergänzt eine Spalte in bestehenden Datenbanken (CREATE TABLE IF NOT EXISTS ändert vorhandene Tabellen nicht).
+    Gibt True zurück, wenn die Spalte neu angelegt wurde.
+    """
+    existing_columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+    if column not in existing_columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_definition}")
+        return True
+    return False
+
+# --- Unternehmensstatistik (materialisierte Kennzahlen pro Unternehmen) ---
+# Wird über Trigger im Schreibpfad der Scraper (bewertungen, bewertung_faktoren, profil_verlauf)
+# inkrementell gepflegt; rebuild_unternehmens_statistik() berechnet sie komplett neu.
+
+def _sterne_bucket_sql(row):
+    """Ordnet Sterne (z.B. Kununu-Durchschnitt 3.6) einer Histogramm-Stufe 1-5 zu, NULL bleibt NULL."""
+    return f"(CASE WHEN {row}.sterne IS NULL THEN NULL ELSE MIN(MAX(CAST(ROUND({row}.sterne) AS INTEGER), 1), 5) END)"
+
+def _unternehmen_id_sql(row):
+    return f"(SELECT unternehmen_id FROM unternehmens_profile WHERE id = {row}.profil_id)"
+
+def _statistik_delta_sql(row, sign):
+    """UPDATE, das eine Bewertung (NEW/OLD) zur Statistik addiert (+) bzw. von ihr abzieht (-)."""
+    histogram = ",\n".join(
+        f"            sterne_{stufe} = sterne_{stufe} {sign} ({_sterne_bucket_sql(row)} IS {stufe})" for stufe in range(1, 6))
+    return f"""
+        UPDATE unternehmens_statistik SET
+            anzahl_bewertungen = anzahl_bewertungen {sign} 1,
+            anzahl_empfohlen = anzahl_empfohlen {sign} ({row}.is_recommended IS 1),
+            anzahl_mit_empfehlung = anzahl_mit_empfehlung {sign} ({row}.is_recommended IS NOT NULL),
+{histogram},
+            aktualisiert_am = CURRENT_TIMESTAMP
+        WHERE unternehmen_id = {_unternehmen_id_sql(row)} AND {row}.is_deleted = 0;
+    """
+
+def _faktor_delta_sql(bewertung_id, faktor_source, sign_sql, where_sql="1"):
+    """Upsert der Faktor-Summen für die Faktoren aus faktor_source (Alias f) einer Bewertung."""
+    return f"""
+        INSERT INTO unternehmens_faktor_statistik (unternehmen_id, faktor_name, summe, anzahl)
+        SELECT up.unternehmen_id, f.faktor_name, {sign_sql} * IFNULL(f.faktor_sterne, 0), {sign_sql} * (f.faktor_sterne IS NOT NULL)
+        FROM {faktor_source}
+        JOIN bewertungen b ON b.id = {bewertung_id}
+        JOIN unternehmens_profile up ON up.id = b.profil_id
+        WHERE {where_sql}
+        ON CONFLICT (unternehmen_id, faktor_name) DO UPDATE SET
+            summe = summe + excluded.summe,
+            anzahl = anzahl + excluded.anzahl;
+    """
+
+def _ensure_statistik_row_sql(row):
+    return f"INSERT OR IGNORE INTO unternehmens_statistik (unternehmen_id) SELECT {_unternehmen_id_sql(row)} WHERE {_unternehmen_id_sql(row)} IS NOT NULL;"
+
+def _plattform_stand_sql(plattform_name, prefix, with_empfehlungsrate):
+    empfehlungsrate = f"\n            {prefix}_empfehlungsrate = NEW.recommendation_rate," if with_empfehlungsrate else ""
+    return f"""
+        UPDATE unternehmens_statistik SET
+            {prefix}_schnitt = NEW.gesamtdurchschnitt,
+            {prefix}_anzahl_bewertungen = NEW.anzahl_bewertungen_gesamt,{empfehlungsrate}
+            {prefix}_stand = NEW.scraping_datum,
+            aktualisiert_am = CURRENT_TIMESTAMP
+        WHERE unternehmen_id = {_unternehmen_id_sql('NEW')}
+          AND (SELECT p.name FROM unternehmens_profile up JOIN plattformen p ON up.plattform_id = p.id WHERE up.id = NEW.profil_id) = '{plattform_name}';
+    """
+
+STATISTIK_UPDATE_WHEN_SQL = "OLD.sterne IS NOT NEW.sterne OR OLD.is_recommended IS NOT NEW.is_recommended OR OLD.is_deleted IS NOT NEW.is_deleted"
+
+def create_unternehmens_statistik_triggers(cursor):
+    """Legt die Trigger an, die unternehmens_statistik und unternehmens_faktor_statistik aktuell halten."""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_statistik_bewertung_insert AFTER INSERT ON bewertungen
+        WHEN NEW.is_deleted = 0
+        BEGIN
+            {_ensure_statistik_row_sql('NEW')}
+            {_statistik_delta_sql('NEW', '+')}
+        END
+    """)
+    # Nur bei tatsächlich geänderten Werten: Das "unverändert"-Update der Scraper (last_seen_scraping_datum,
+    # is_deleted = 0) schreibt dieselben Werte für jede bekannte Bewertung jeder Seite
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_statistik_bewertung_update AFTER UPDATE OF sterne, is_recommended, is_deleted ON bewertungen
+        WHEN {STATISTIK_UPDATE_WHEN_SQL}
+        BEGIN
+            {_ensure_statistik_row_sql('NEW')}
+            {_statistik_delta_sql('OLD', '-')}
+            {_statistik_delta_sql('NEW', '+')}
+            {_faktor_delta_sql('NEW.id', 'bewertung_faktoren f', "(CASE WHEN NEW.is_deleted = 0 THEN 1 ELSE -1 END)",
+                               "f.bewertung_id = NEW.id AND OLD.is_deleted IS NOT NEW.is_deleted AND 0 IN (OLD.is_deleted, NEW.is_deleted)")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_statistik_bewertung_delete AFTER DELETE ON bewertungen
+        WHEN OLD.is_deleted = 0
+        BEGIN
+            {_statistik_delta_sql('OLD', '-')}
+            INSERT INTO unternehmens_faktor_statistik (unternehmen_id, faktor_name, summe, anzahl)
+            SELECT {_unternehmen_id_sql('OLD')}, f.faktor_name, -IFNULL(f.faktor_sterne, 0), -(f.faktor_sterne IS NOT NULL)
+            FROM bewertung_faktoren f WHERE f.bewertung_id = OLD.id
+            ON CONFLICT (unternehmen_id, faktor_name) DO UPDATE SET
+                summe = summe + excluded.summe,
+                anzahl = anzahl + excluded.anzahl;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_statistik_faktor_insert AFTER INSERT ON bewertung_faktoren
+        BEGIN
+            {_faktor_delta_sql('NEW.bewertung_id', '(SELECT NEW.faktor_name AS faktor_name, NEW.faktor_sterne AS faktor_sterne) f', '1', 'b.is_deleted = 0')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_statistik_faktor_delete AFTER DELETE ON bewertung_faktoren
+        BEGIN
+            {_faktor_delta_sql('OLD.bewertung_id', '(SELECT OLD.faktor_name AS faktor_name, OLD.faktor_sterne AS faktor_sterne) f', '-1', 'b.is_deleted = 0')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_statistik_faktor_update AFTER UPDATE OF faktor_name, faktor_sterne ON bewertung_faktoren
+        BEGIN
+            {_faktor_delta_sql('OLD.bewertung_id', '(SELECT OLD.faktor_name AS faktor_name, OLD.faktor_sterne AS faktor_sterne) f', '-1', 'b.is_deleted = 0')}
+            {_faktor_delta_sql('NEW.bewertung_id', '(SELECT NEW.faktor_name AS faktor_name, NEW.faktor_sterne AS faktor_sterne) f', '1', 'b.is_deleted = 0')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_statistik_profil_verlauf_insert AFTER INSERT ON profil_verlauf
+        BEGIN
+            {_ensure_statistik_row_sql('NEW')}
+            {_plattform_stand_sql('Kununu', 'kununu', True)}
+            {_plattform_stand_sql('Trustpilot', 'trustpilot', False)}
+        END
+    """)
+
+def rebuild_unternehmens_statistik(conn):
+    """Berechnet unternehmens_statistik und unternehmens_faktor_statistik komplett neu (z.B. nach der Migration)."""
+    histogram = ", ".join(f"SUM({_sterne_bucket_sql('b')} IS {stufe})" for stufe in range(1, 6))
+    with conn:
+        conn.execute("DELETE FROM unternehmens_statistik")
+        conn.execute("DELETE FROM unternehmens_faktor_statistik")
+        conn.execute(f"""
+            INSERT INTO unternehmens_statistik (
+                unternehmen_id, anzahl_bewertungen, anzahl_empfohlen, anzahl_mit_empfehlung,
+                sterne_1, sterne_2, sterne_3, sterne_4, sterne_5, aktualisiert_am)
+            SELECT up.unternehmen_id, COUNT(b.id), SUM(b.is_recommended IS 1), SUM(b.is_recommended IS NOT NULL),
+                   {histogram}, CURRENT_TIMESTAMP
+            FROM unternehmens_profile up
+            LEFT JOIN bewertungen b ON b.profil_id = up.id AND b.is_deleted = 0
+            WHERE up.unternehmen_id IS NOT NULL
+            GROUP BY up.unternehmen_id
+        """)
+        # Neuester Profilverlauf-Eintrag pro Unternehmen und Plattform
+        for plattform_name, prefix, with_empfehlungsrate in (('Kununu', 'kununu', True), ('Trustpilot', 'trustpilot', False)):
+            empfehlungsrate = f"{prefix}_empfehlungsrate = latest.recommendation_rate," if with_empfehlungsrate else ""
+            conn.execute(f"""
+                UPDATE unternehmens_statistik SET
+                    {prefix}_schnitt = latest.gesamtdurchschnitt,
+                    {prefix}_anzahl_bewertungen = latest.anzahl_bewertungen_gesamt,
+                    {empfehlungsrate}
+                    {prefix}_stand = latest.scraping_datum
+                FROM (
+                    SELECT up.unternehmen_id, pv.gesamtdurchschnitt, pv.anzahl_bewertungen_gesamt,
+                           pv.recommendation_rate, pv.scraping_datum,
+                           ROW_NUMBER() OVER (PARTITION BY up.unternehmen_id ORDER BY pv.scraping_datum DESC, pv.id DESC) AS rang
+                    FROM profil_verlauf pv
+                    JOIN unternehmens_profile up ON pv.profil_id = up.id
+                    JOIN plattformen p ON up.plattform_id = p.id
+                    WHERE p.name = ?
+                ) AS latest
+                WHERE latest.rang = 1 AND unternehmens_statistik.unternehmen_id = latest.unternehmen_id
+            """, (plattform_name,))
+        conn.execute("""
+            INSERT INTO unternehmens_faktor_statistik (unternehmen_id, faktor_name, summe, anzahl)
+            SELECT up.unternehmen_id, f.faktor_name, SUM(IFNULL(f.faktor_sterne, 0)), COUNT(f.faktor_sterne)
+            FROM bewertung_faktoren f
+            JOIN bewertungen b ON f.bewertung_id = b.id AND b.is_deleted = 0
+            JOIN unternehmens_profile up ON b.profil_id = up.id
+            GROUP BY up.unternehmen_id, f.faktor_name
+        """)
+
+def create_bewertungen_fts(cursor):
+    """
+    Volltextindex über Titel und Text der Bewertungen (FTS5, external content: der Text liegt nur
+    in bewertungen, der Index verweist per rowid = bewertungen.id darauf). Die Trigger halten den
+    Index bei jedem Schreibzugriff der Scraper synchron; gelöschte Bewertungen bleiben im Index und
+    werden bei der Suche über b.is_deleted ausgefiltert.
+    """
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS bewertungen_fts USING fts5 (
+            titel, text,
+            content = 'bewertungen', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bewertungen_fts_insert AFTER INSERT ON bewertungen
+        BEGIN
+            INSERT INTO bewertungen_fts (rowid, titel, text) VALUES (NEW.id, NEW.titel, NEW.text);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bewertungen_fts_delete AFTER DELETE ON bewertungen
+        BEGIN
+            INSERT INTO bewertungen_fts (bewertungen_fts, rowid, titel, text) VALUES ('delete', OLD.id, OLD.titel, OLD.text);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bewertungen_fts_update AFTER UPDATE OF titel, text ON bewertungen
+        BEGIN
+            INSERT INTO bewertungen_fts (bewertungen_fts, rowid, titel, text) VALUES ('delete', OLD.id, OLD.titel, OLD.text);
+            INSERT INTO bewertungen_fts (rowid, titel, text) VALUES (NEW.id, NEW.titel, NEW.text);
+        END
+    """)
+
+# Spalten, deren Änderung eine Bewertung für inkrementelle Exporte als geändert markiert.
+# last_seen_scraping_datum fehlt bewusst: Es wird bei jedem Scrape gesetzt, auch ohne Änderung.
+BEWERTUNGEN_INHALT_SPALTEN = (
+    'sterne', 'titel', 'text', 'datum', 'platform_data_updated_at', 'is_deleted',
+    'is_former_employee', 'review_type', 'is_recommended', 'reviewer_position', 'reviewer_department',
+    'reviewed_entity_name', 'reviewed_entity_uuid', 'reviewer_city', 'reviewer_state', 'apprenticeship_job_title',
+    'consumer_display_name', 'date_of_experience', 'review_language', 'review_source', 'review_likes',
+    'is_verified_by_platform',
+)
+# Denormalisierte bewertungen.unternehmen_id für neue Bewertungen (Scraper setzen sie nicht selbst)
+BEWERTUNGEN_UNTERNEHMEN_ID_SQL = f"IFNULL(NEW.unternehmen_id, {_unternehmen_id_sql('NEW')})"
+
+def create_aenderung_triggers(cursor):
+    """
+    Pflegt bei neuen und inhaltlich geänderten (auch gelöschten) Bewertungen:
+    - geaendert_am: Zeitpunkt der Änderung (UTC), für die Export-API mit since=<Zeitpunkt>
+    - aenderung_nr: fortlaufende Änderungsnummer. Sie wird innerhalb der Schreibsperre vergeben und
+      steigt daher in Commit-Reihenfolge; export_parquet.py und die Export-API (since=<Nummer>)
+      verlieren mit "aenderung_nr > Watermark" auch bei gleichzeitig schreibenden Scrapern keine
+      Änderung (Zeitstempel können das nicht).
+    """
+    naechste_nr = "(SELECT IFNULL(MAX(aenderung_nr), 0) + 1 FROM bewertungen)"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_bewertungen_aenderung_insert AFTER INSERT ON bewertungen
+        BEGIN
+            UPDATE bewertungen
+            SET aenderung_nr = {naechste_nr},
+                geaendert_am = IFNULL(NEW.geaendert_am, CURRENT_TIMESTAMP), -- migrierte Spalte hat kein DEFAULT
+                unternehmen_id = {BEWERTUNGEN_UNTERNEHMEN_ID_SQL} -- im selben UPDATE, siehe create_unternehmen_id_triggers
+            WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_bewertungen_aenderung_update
+        AFTER UPDATE OF {", ".join(BEWERTUNGEN_INHALT_SPALTEN)} ON bewertungen
+        WHEN {" OR ".join(f"OLD.{spalte} IS NOT NEW.{spalte}" for spalte in BEWERTUNGEN_INHALT_SPALTEN)}
+        BEGIN
+            UPDATE bewertungen SET aenderung_nr = {naechste_nr}, geaendert_am = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+    """)
+
+def create_unternehmen_id_triggers(cursor):
+    """
+    Hält bewertungen.unternehmen_id synchron zu unternehmens_profile.unternehmen_id. Die Spalte ist
+    denormalisiert, damit die Seite "Alle Bewertungen" direkt über einen Index je Unternehmen und
+    Sortierung blättern kann (ohne Join-Filter und temporäre Sortierung). Neue Bewertungen erhalten
+    sie in trg_bewertungen_aenderung_insert, das ohnehin ein UPDATE auf die neue Zeile ausführt.
+    """
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bewertungen_unternehmen_profil_update
+        AFTER UPDATE OF profil_id ON bewertungen
+        WHEN OLD.profil_id IS NOT NEW.profil_id
+        BEGIN
+            UPDATE bewertungen SET unternehmen_id = (SELECT unternehmen_id FROM unternehmens_profile WHERE id = NEW.profil_id)
+            WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_unternehmens_profile_unternehmen_update
+        AFTER UPDATE OF unternehmen_id ON unternehmens_profile
+        WHEN OLD.unternehmen_id IS NOT NEW.unternehmen_id
+        BEGIN
+            UPDATE bewertungen SET unternehmen_id = NEW.unternehmen_id WHERE profil_id = NEW.id;
+        END
+    """)
+
+def setup_database(db_name='Datenbank.db'):
     """Erstellt die korrekte Datenbankstruktur inkl. Verlaufstabelle."""
-    conn = sqlite3.connect('Datenbank.db')
+    conn = connect(db_name) # Schaltet die Datei dauerhaft in den WAL-Modus
     cursor = conn.cursor()
 
     # 1. Tabelle für Unternehmen (unverändert)
@@ -29,6 +306,11 @@ def setup_database():
             unternehmen_id INTEGER,
             plattform_id INTEGER,
             url TEXT NOT NULL UNIQUE,
+            letzter_vollscan DATETIME, -- Zeitpunkt des letzten vollständigen Durchlaufs aller Bewertungsseiten
+            plattform_profil_uuid TEXT, -- Profil-Kennung der Plattform (Kununu: UUID aus der Übersichtsseite)
+            plattform_slug TEXT,
+            plattform_land TEXT,
+            uebersicht_stand DATETIME, -- Zeitpunkt des letzten Abrufs der Übersichtsseite
             FOREIGN KEY (unternehmen_id) REFERENCES unternehmen (id),
             FOREIGN KEY (plattform_id) REFERENCES plattformen (id),
             UNIQUE(unternehmen_id, plattform_id)
@@ -50,6 +332,9 @@ def setup_database():
             platform_data_updated_at TEXT, -- Kununus 'updatedAt' oder Trustpilots 'dates.updatedDate'
             last_seen_scraping_datum DATETIME, 
             is_deleted BOOLEAN DEFAULT 0, 
+            geaendert_am DATETIME DEFAULT CURRENT_TIMESTAMP, -- Letzte inhaltliche Änderung (UTC), für Exporte mit since=
+            aenderung_nr INTEGER, -- Fortlaufende Änderungsnummer (Trigger), Watermark für export_parquet.py
+            unternehmen_id INTEGER, -- Aus unternehmens_profile übernommen (Trigger), für die Indizes der Seite "Alle Bewertungen"
 
             -- Kununu-spezifische Felder (können für Trustpilot NULL sein)
             is_former_employee BOOLEAN, 
@@ -100,11 +385,184 @@ def setup_database():
         )
     ''')
 
+    # 7. Tabelle für Scraping-Aufträge aus der Web UI (Job-Warteschlange)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plattform TEXT NOT NULL, -- 'Kununu' oder 'Trustpilot'
+            profil_url TEXT NOT NULL,
+            unternehmen_name TEXT,
+            status TEXT NOT NULL DEFAULT 'wartend', -- wartend, laeuft, fertig, fehlgeschlagen
+            prioritaet REAL DEFAULT 0, -- höher = früher (Scheduler)
+            seiten_fertig INTEGER DEFAULT 0,
+            seiten_gesamt INTEGER,
+            erstellt_am DATETIME DEFAULT CURRENT_TIMESTAMP,
+            gestartet_am DATETIME,
+            beendet_am DATETIME,
+            fehlermeldung TEXT,
+            besitzer TEXT, -- Host:PID des Prozesses, der den Auftrag ausführt
+            lebenszeichen_am DATETIME -- Wird während des Laufs regelmäßig erneuert (scrape_jobs.HEARTBEAT_SECONDS)
+        )
+    ''')
+    # Höchstens ein wartender oder laufender Auftrag pro Profil
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_scrape_jobs_aktiv_pro_profil
+        ON scrape_jobs (profil_url) WHERE status IN ('wartend', 'laeuft')
+    ''')
+
+    # 8. Materialisierte Kennzahlen pro Unternehmen für die Detailseite
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS unternehmens_statistik (
+            unternehmen_id INTEGER PRIMARY KEY,
+            anzahl_bewertungen INTEGER NOT NULL DEFAULT 0, -- nicht gelöschte Bewertungen aller Plattformen
+            anzahl_empfohlen INTEGER NOT NULL DEFAULT 0,
+            anzahl_mit_empfehlung INTEGER NOT NULL DEFAULT 0, -- Bewertungen mit Angabe zur Empfehlung (Kununu)
+            sterne_1 INTEGER NOT NULL DEFAULT 0, -- Histogramm, Sterne auf ganze Stufen gerundet
+            sterne_2 INTEGER NOT NULL DEFAULT 0,
+            sterne_3 INTEGER NOT NULL DEFAULT 0,
+            sterne_4 INTEGER NOT NULL DEFAULT 0,
+            sterne_5 INTEGER NOT NULL DEFAULT 0,
+            kununu_schnitt REAL, -- neuester Eintrag aus profil_verlauf
+            kununu_anzahl_bewertungen INTEGER,
+            kununu_empfehlungsrate REAL,
+            kununu_stand DATETIME,
+            trustpilot_schnitt REAL,
+            trustpilot_anzahl_bewertungen INTEGER,
+            trustpilot_stand DATETIME,
+            aktualisiert_am DATETIME,
+            FOREIGN KEY (unternehmen_id) REFERENCES unternehmen (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS unternehmens_faktor_statistik (
+            unternehmen_id INTEGER NOT NULL,
+            faktor_name TEXT NOT NULL,
+            summe REAL NOT NULL DEFAULT 0, -- Durchschnitt = summe / anzahl
+            anzahl INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (unternehmen_id, faktor_name),
+            FOREIGN KEY (unternehmen_id) REFERENCES unternehmen (id)
+        )
+    ''')
+    # Watermarks der inkrementellen Parquet-Exporte (export_parquet.py), pro Zielverzeichnis und Tabelle
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS export_watermarks (
+            ziel TEXT NOT NULL,
+            tabelle TEXT NOT NULL,
+            wert INTEGER, -- bewertungen: höchste aenderung_nr, profil_verlauf: höchste id
+            exportiert_am DATETIME,
+            PRIMARY KEY (ziel, tabelle)
+        )
+    ''')
+    # Fortschritt laufender vollständiger Durchläufe (scrape_checkpoints.py). Wird in derselben Transaktion
+    # wie die Bewertungen einer Seite geschrieben; ein abgebrochener Durchlauf setzt danach dort fort.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+            profil_id INTEGER PRIMARY KEY,
+            plattform_id INTEGER,
+            lauf_id TEXT NOT NULL,
+            lauf_start DATETIME NOT NULL, -- Bewertungen mit älterem last_seen_scraping_datum gelten am Ende als gelöscht
+            letzte_seite INTEGER NOT NULL DEFAULT 0, -- letzte vollständig geschriebene Seite
+            seiten_gesamt INTEGER,
+            aktualisiert_am DATETIME,
+            FOREIGN KEY (profil_id) REFERENCES unternehmens_profile (id),
+            FOREIGN KEY (plattform_id) REFERENCES plattformen (id)
+        )
+    ''')
+    statistik_trigger_vorhanden = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_statistik_bewertung_insert'").fetchone()
+    # Ältere Version des Update-Triggers ohne WHEN-Bedingung ersetzen
+    update_trigger = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_statistik_bewertung_update'").fetchone()
+    if update_trigger and STATISTIK_UPDATE_WHEN_SQL not in update_trigger[0]:
+        cursor.execute("DROP TRIGGER trg_statistik_bewertung_update")
+    create_unternehmens_statistik_triggers(cursor)
+
+    fts_vorhanden = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bewertungen_fts'").fetchone()
+    create_bewertungen_fts(cursor)
+    if not fts_vorhanden:
+        # Bestehende Bewertungen einmalig indizieren
+        cursor.execute("INSERT INTO bewertungen_fts (bewertungen_fts) VALUES ('rebuild')")
+
+    # Migrationen für bestehende Datenbanken
+    _add_column_if_missing(cursor, 'unternehmens_profile', 'letzter_vollscan', 'DATETIME')
+    _add_column_if_missing(cursor, 'unternehmens_profile', 'plattform_profil_uuid', 'TEXT')
+    _add_column_if_missing(cursor, 'unternehmens_profile', 'plattform_slug', 'TEXT')
+    _add_column_if_missing(cursor, 'unternehmens_profile', 'plattform_land', 'TEXT')
+    _add_column_if_missing(cursor, 'unternehmens_profile', 'uebersicht_stand', 'DATETIME')
+    _add_column_if_missing(cursor, 'scrape_jobs', 'prioritaet', 'REAL DEFAULT 0')
+    _add_column_if_missing(cursor, 'scrape_jobs', 'besitzer', 'TEXT')
+    _add_column_if_missing(cursor, 'scrape_jobs', 'lebenszeichen_am', 'DATETIME')
+    if _add_column_if_missing(cursor, 'bewertungen', 'geaendert_am', 'DATETIME'):
+        cursor.execute("UPDATE bewertungen SET geaendert_am = CURRENT_TIMESTAMP")
+    if _add_column_if_missing(cursor, 'bewertungen', 'aenderung_nr', 'INTEGER'):
+        cursor.execute("UPDATE bewertungen SET aenderung_nr = id")
+    if _add_column_if_missing(cursor, 'bewertungen', 'unternehmen_id', 'INTEGER'):
+        cursor.execute(f"UPDATE bewertungen SET unternehmen_id = {_unternehmen_id_sql('bewertungen')}")
+    # Ersetzt durch trg_bewertungen_aenderung_* (pflegen geaendert_am mit)
+    cursor.execute("DROP TRIGGER IF EXISTS trg_bewertungen_geaendert_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_bewertungen_geaendert_update")
+    # Ältere Version des Insert-Triggers ohne unternehmen_id ersetzen
+    aenderung_insert_trigger = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_bewertungen_aenderung_insert'").fetchone()
+    if aenderung_insert_trigger and BEWERTUNGEN_UNTERNEHMEN_ID_SQL not in aenderung_insert_trigger[0]:
+        cursor.execute("DROP TRIGGER trg_bewertungen_aenderung_insert")
+    create_aenderung_triggers(cursor)
+    create_unternehmen_id_triggers(cursor)
+
+    # Indizes für die Abfragen der Web UI (siehe ui_queries.py, geprüft mit check_query_plans.py).
+    # Partiell auf nicht gelöschte Bewertungen; is_deleted ist trotzdem Teil des Index, damit
+    # COUNT-Abfragen allein aus dem Index beantwortet werden können (covering).
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_aktiv_datum
+        ON bewertungen (profil_id, is_deleted, datum) WHERE is_deleted = 0
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_aktiv_sterne
+        ON bewertungen (profil_id, is_deleted, sterne, datum) WHERE is_deleted = 0
+    ''')
+    # Seite "Alle Bewertungen": ein Index je Sortierung (ui_queries.ALLE_BEWERTUNGEN_SORT_KEYS), damit SQLite
+    # ab dem Cursor direkt im Index weiterliest statt alle Bewertungen des Unternehmens zu sortieren.
+    # Die Ausdrücke müssen exakt den Sortierschlüsseln entsprechen; check_query_plans.py prüft das.
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_unternehmen_neueste
+        ON bewertungen (unternehmen_id, IFNULL(datum, '') DESC, id DESC) WHERE is_deleted = 0
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_unternehmen_sterne_asc
+        ON bewertungen (unternehmen_id, IFNULL(sterne, 0) ASC, IFNULL(datum, '') DESC, id DESC) WHERE is_deleted = 0
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_unternehmen_sterne_desc
+        ON bewertungen (unternehmen_id, IFNULL(sterne, 0) DESC, IFNULL(datum, '') DESC, id DESC) WHERE is_deleted = 0
+    ''')
+    # Nächste aenderung_nr (MAX) in den Triggern und inkrementeller Parquet-Export
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_aenderung_nr
+        ON bewertungen (aenderung_nr)
+    ''')
+    # Inkrementeller Export (/api/unternehmen/<id>/bewertungen?since=...), per Änderungsnummer bzw. Zeitpunkt
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_profil_aenderung_nr
+        ON bewertungen (profil_id, aenderung_nr)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bewertungen_profil_geaendert
+        ON bewertungen (profil_id, geaendert_am)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_profil_verlauf_profil_datum
+        ON profil_verlauf (profil_id, scraping_datum)
+    ''')
+
     # Optional: Standard-Plattformen hinzufügen
     cursor.execute("INSERT OR IGNORE INTO plattformen (name) VALUES ('Kununu')")
     cursor.execute("INSERT OR IGNORE INTO plattformen (name) VALUES ('Glassdoor')")
 
     conn.commit()
+    if not statistik_trigger_vorhanden:
+        # Bestehende Daten einmalig übernehmen, danach pflegen die Trigger die Statistik
+        rebuild_unternehmens_statistik(conn)
     conn.close()
     print("Datenbank wurde erstellt.")
 
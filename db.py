@@ -0,0 +1,107 @@
+# db.py
+"""
+Gemeinsame SQLite-Verbindungen für Scraper, Job-Warteschlange und Web UI.
+
+Alle Verbindungen laufen im WAL-Modus: Lesende Zugriffe der Web UI werden von schreibenden
+Scrapern nicht blockiert, und gleichzeitige Schreiber warten per busy_timeout aufeinander statt
+mit "database is locked" abzubrechen.
+
+get_db_connection() gibt eine Verbindung aus einem Pool zurück; conn.close() legt sie zurück in
+den Pool, statt sie zu schließen. Eine Verbindung wird immer nur von einem Thread gleichzeitig
+benutzt, kann danach aber von einem anderen Thread wiederverwendet werden (der Flask-
+Entwicklungsserver startet pro Request einen neuen Thread).
+"""
+import queue
+import sqlite3
+import threading
+
+# Name der Datenbankdatei
+DB_NAME = 'Datenbank.db'
+
+BUSY_TIMEOUT_MS = 10000           # Wartezeit auf Sperren anderer Schreiber
+CACHE_SIZE_KIB = 64 * 1024        # Page-Cache pro Verbindung (64 MiB)
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+POOL_MAX_IDLE = 8                 # Maximale Anzahl unbenutzter Verbindungen pro Datenbank
+
+def configure_connection(conn):
+    """Setzt die PRAGMAs für Nebenläufigkeit und Performance auf einer Verbindung."""
+    conn.execute("PRAGMA journal_mode=WAL") # Persistent in der Datei, hier nur zur Sicherheit
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL") # Im WAL-Modus sicher gegen Korruption, nur der letzte Commit kann bei Stromausfall fehlen
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.row_factory = sqlite3.Row # Ermöglicht Zugriff auf Spalten per Namen
+    return conn
+
+def connect(db_name=DB_NAME):
+    """Öffnet eine eigene (nicht gepoolte) Verbindung mit den Standard-PRAGMAs."""
+    return configure_connection(sqlite3.connect(db_name, timeout=BUSY_TIMEOUT_MS / 1000))
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection, deren close() die Verbindung an den Pool zurückgibt."""
+
+    def close(self):
+        _pool_for(self._db_name).release(self)
+
+    def close_for_real(self):
+        super().close()
+
+class ConnectionPool:
+    """Pool unbenutzter Verbindungen zu einer Datenbankdatei (LIFO, damit warme Caches zuerst genutzt werden)."""
+
+    def __init__(self, db_name, max_idle=POOL_MAX_IDLE):
+        self.db_name = db_name
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT_MS / 1000,
+                                   factory=PooledConnection, check_same_thread=False)
+            conn._db_name = self.db_name
+            configure_connection(conn)
+        conn._in_pool = False
+        return conn
+
+    def release(self, conn):
+        if conn._in_pool:
+            return # Doppeltes close()
+        try:
+            if conn.in_transaction:
+                conn.rollback() # Nicht committete Änderungen nicht an den nächsten Nutzer weitergeben
+            conn.row_factory = sqlite3.Row
+            conn._in_pool = True
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn._in_pool = True
+            conn.close_for_real()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close_for_real()
+            except queue.Empty:
+                return
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _pool_for(db_name):
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = _pools[db_name] = ConnectionPool(db_name)
+        return pool
+
+def get_db_connection(db_name=DB_NAME):
+    """Gibt eine konfigurierte Verbindung aus dem Pool zurück. conn.close() gibt sie zurück."""
+    return _pool_for(db_name).acquire()
+
+def close_all_connections():
+    """Schließt alle unbenutzten Verbindungen in allen Pools (z.B. vor dem Löschen der Datei)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
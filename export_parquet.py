@@ -0,0 +1,306 @@
+# export_parquet.py
+"""
+Exportiert bewertungen, bewertung_faktoren und profil_verlauf als partitioniertes Parquet für
+Analysen (pandas, DuckDB, Spark, ...). Layout im Zielverzeichnis (Hive-Partitionierung):
+
+    <ziel>/bewertungen/plattform=Kununu/jahr=2024/part-<lauf>.parquet
+    <ziel>/bewertung_faktoren/plattform=Kununu/jahr=2024/part-<lauf>.parquet
+    <ziel>/profil_verlauf/plattform=Trustpilot/jahr=2025/part-<lauf>.parquet
+
+- Pro Plattform werden nur die Spalten geschrieben, die diese Plattform befüllt, statt der breiten,
+  halb leeren Kununu/Trustpilot-Mischzeile aus SQLite.
+- Gelesen wird blockweise aus dem Datenbank-Cursor. Sobald die gepufferten Zeilen das Speicherbudget
+  erreichen, werden sie als Row Groups geschrieben; der Speicherbedarf hängt also nicht von der
+  Größe der Datenbank ab.
+- Inkrementell (Standard): Angehängt werden nur Zeilen, die seit dem letzten Export in dasselbe
+  Zielverzeichnis neu sind (Watermark in export_watermarks). Für bewertungen heißt das: neu oder
+  inhaltlich geändert (aenderung_nr), einschließlich gelöschter (is_deleted). Eine Bewertung kann daher
+  in mehreren Versionen vorkommen, die aktuelle ist die mit der höchsten aenderung_nr. Die Faktoren
+  werden mit jeder Version ihrer Bewertung geschrieben (Schlüssel bewertung_id + aenderung_nr).
+- Dateien eines Laufs werden erst nach erfolgreichem Abschluss sichtbar (umbenannt), danach wird die
+  Watermark gespeichert. Bricht der Lauf dazwischen ab, wird beim nächsten Mal erneut exportiert
+  (mindestens einmal, nie gar nicht).
+
+Aufruf von der Kommandozeile:
+    python export_parquet.py                    # inkrementell nach ./parquet_export
+    python export_parquet.py --ziel /data/rep0  # anderes Zielverzeichnis (eigene Watermarks)
+    python export_parquet.py --voll             # Zielverzeichnis komplett neu aufbauen
+    python export_parquet.py --speicher-mb 64   # kleineres Speicherbudget
+
+Benötigt pyarrow (pip install pyarrow).
+"""
+import argparse
+import os
+import shutil
+import sys
+import uuid
+from collections import Counter
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Optional: nur für diesen Export benötigt
+    pa = pq = None
+
+from database_setup import setup_database
+from db import DB_NAME, connect
+from kununu_scraper import KUNUNU_REVIEW_COLUMNS
+from trustpilot_scraper import TRUSTPILOT_REVIEW_COLUMNS
+
+EXPORT_ZIEL = 'parquet_export'
+SPEICHER_BUDGET_MB = 128  # Grobe Obergrenze für gepufferte Zeilen bis zum nächsten Schreiben
+FETCH_SIZE = 1000         # Zeilen pro fetchmany()
+PARQUET_COMPRESSION = 'zstd'
+DATASETS = ('bewertungen', 'bewertung_faktoren', 'profil_verlauf')
+
+# Spalten von bewertungen, die jede Plattform hat; dazu kommen die Spalten des jeweiligen Scrapers
+BEWERTUNGEN_BASIS_SPALTEN = (
+    'id', 'profil_id', 'unternehmen_id', 'platform_review_id', 'scraping_datum',
+    'last_seen_scraping_datum', 'geaendert_am', 'aenderung_nr', 'is_deleted',
+)
+PLATTFORM_SPALTEN = {
+    'Kununu': KUNUNU_REVIEW_COLUMNS,
+    'Trustpilot': TRUSTPILOT_REVIEW_COLUMNS,
+}
+STANDARD_PLATTFORM_SPALTEN = ('sterne', 'titel', 'text', 'datum', 'platform_data_updated_at')
+FAKTOREN_SPALTEN = ('bewertung_id', 'aenderung_nr', 'faktor_name', 'faktor_sterne')
+PROFIL_VERLAUF_SPALTEN = (
+    'id', 'profil_id', 'unternehmen_id', 'scraping_datum', 'gesamtdurchschnitt',
+    'anzahl_bewertungen_gesamt', 'recommendation_rate',
+)
+
+INT_SPALTEN = {'id', 'profil_id', 'unternehmen_id', 'bewertung_id', 'aenderung_nr', 'anzahl_bewertungen_gesamt', 'review_likes'}
+FLOAT_SPALTEN = {'sterne', 'faktor_sterne', 'gesamtdurchschnitt', 'recommendation_rate'}
+BOOL_SPALTEN = {'is_deleted', 'is_former_employee', 'is_recommended', 'is_verified_by_platform'}
+
+BEWERTUNGEN_EXPORT_SQL = """
+    SELECT b.*, up.unternehmen_id, p.name AS plattform
+    FROM bewertungen b
+    JOIN unternehmens_profile up ON b.profil_id = up.id
+    JOIN plattformen p ON up.plattform_id = p.id
+    WHERE b.aenderung_nr > ?
+    ORDER BY b.aenderung_nr
+"""
+PROFIL_VERLAUF_EXPORT_SQL = """
+    SELECT pv.*, up.unternehmen_id, p.name AS plattform
+    FROM profil_verlauf pv
+    JOIN unternehmens_profile up ON pv.profil_id = up.id
+    JOIN plattformen p ON up.plattform_id = p.id
+    WHERE pv.id > ?
+    ORDER BY pv.id
+"""
+
+def _arrow_type(spalte):
+    if spalte in INT_SPALTEN:
+        return pa.int64()
+    if spalte in FLOAT_SPALTEN:
+        return pa.float64()
+    if spalte in BOOL_SPALTEN:
+        return pa.bool_()
+    return pa.string()
+
+def _bewertungen_spalten(plattform):
+    plattform_spalten = PLATTFORM_SPALTEN.get(plattform, STANDARD_PLATTFORM_SPALTEN)
+    return BEWERTUNGEN_BASIS_SPALTEN + tuple(s for s in plattform_spalten if s not in BEWERTUNGEN_BASIS_SPALTEN)
+
+def _jahr(datum):
+    """Partitionswert aus einem ISO-Datum ('2024-05-01T...' -> '2024')."""
+    jahr = str(datum or '')[:4]
+    return jahr if jahr.isdigit() else 'unbekannt'
+
+def _normalisieren(row, spalten):
+    """Wandelt eine sqlite3.Row in ein dict mit den Python-Typen des Arrow-Schemas um."""
+    item = {}
+    for spalte in spalten:
+        wert = row[spalte]
+        if wert is not None:
+            if spalte in BOOL_SPALTEN:
+                wert = bool(wert)
+            elif spalte in FLOAT_SPALTEN:
+                wert = float(wert)
+            elif spalte in INT_SPALTEN:
+                wert = int(wert)
+            elif not isinstance(wert, str):
+                wert = str(wert)
+        item[spalte] = wert
+    return item
+
+def _geschaetzte_groesse(item):
+    # Grobe Schätzung inkl. Overhead der Python-Objekte (dict, str, int)
+    return 64 + sum(len(wert) + 50 if isinstance(wert, str) else 32 for wert in item.values())
+
+class PartitionedParquetWriter:
+    """
+    Puffert Zeilen pro (Dataset, Plattform, Jahr) und schreibt sie als Row Groups, sobald das
+    Speicherbudget erreicht ist. Pro Partition und Lauf entsteht eine Datei; sie liegt bis commit()
+    unter einem versteckten Namen (.part-...), den Parquet-Reader ignorieren.
+    """
+
+    def __init__(self, ziel, speicher_budget_bytes):
+        self.ziel = ziel
+        self.lauf_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.speicher_budget_bytes = speicher_budget_bytes
+        self.zeilen = Counter()
+        self.row_groups = 0
+        self._puffer = {}
+        self._puffer_bytes = 0
+        self._schemas = {}
+        self._writer = {}
+
+    def add(self, dataset, plattform, jahr, spalten, item):
+        key = (dataset, plattform, jahr)
+        if key not in self._schemas:
+            self._schemas[key] = pa.schema([(spalte, _arrow_type(spalte)) for spalte in spalten])
+        self._puffer.setdefault(key, []).append(item)
+        self._puffer_bytes += _geschaetzte_groesse(item)
+        self.zeilen[dataset] += 1
+        if self._puffer_bytes >= self.speicher_budget_bytes:
+            self.flush()
+
+    def flush(self):
+        for key, rows in self._puffer.items():
+            table = pa.Table.from_pylist(rows, schema=self._schemas[key])
+            self._writer_for(key).write_table(table)
+            self.row_groups += 1
+        self._puffer = {}
+        self._puffer_bytes = 0
+
+    def _writer_for(self, key):
+        if key not in self._writer:
+            dataset, plattform, jahr = key
+            verzeichnis = os.path.join(self.ziel, dataset, f"plattform={plattform}", f"jahr={jahr}")
+            os.makedirs(verzeichnis, exist_ok=True)
+            temp_path = os.path.join(verzeichnis, f".part-{self.lauf_id}.parquet")
+            final_path = os.path.join(verzeichnis, f"part-{self.lauf_id}.parquet")
+            writer = pq.ParquetWriter(temp_path, self._schemas[key], compression=PARQUET_COMPRESSION)
+            self._writer[key] = (writer, temp_path, final_path)
+        return self._writer[key][0]
+
+    def commit(self):
+        """Schreibt den Rest, schließt alle Dateien und macht sie sichtbar."""
+        self.flush()
+        for writer, temp_path, final_path in self._writer.values():
+            writer.close()
+            os.replace(temp_path, final_path)
+        self._writer = {}
+
+    def abort(self):
+        for writer, temp_path, _ in self._writer.values():
+            writer.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._writer = {}
+        self._puffer = {}
+
+def get_watermark(conn, ziel, tabelle):
+    row = conn.execute("SELECT wert FROM export_watermarks WHERE ziel = ? AND tabelle = ?", (ziel, tabelle)).fetchone()
+    return row['wert'] if row else 0
+
+def set_watermark(conn, ziel, tabelle, wert):
+    conn.execute("""
+        INSERT INTO export_watermarks (ziel, tabelle, wert, exportiert_am) VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (ziel, tabelle) DO UPDATE SET wert = excluded.wert, exportiert_am = excluded.exportiert_am
+    """, (ziel, tabelle, wert))
+
+def _export_bewertungen(conn, writer, letzte_nr):
+    """
+    Schreibt bewertungen ab aenderung_nr > letzte_nr samt ihrer Faktoren.
+    Gibt die höchste exportierte aenderung_nr zurück (neue Watermark).
+    """
+    cursor = conn.execute(BEWERTUNGEN_EXPORT_SQL, (letzte_nr,))
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        partitionen = {}
+        for row in rows:
+            spalten = _bewertungen_spalten(row['plattform'])
+            item = _normalisieren(row, spalten)
+            jahr = _jahr(row['datum'])
+            writer.add('bewertungen', row['plattform'], jahr, spalten, item)
+            partitionen[row['id']] = (row['plattform'], jahr, item['aenderung_nr'])
+            letzte_nr = max(letzte_nr, item['aenderung_nr'])
+
+        # Faktoren dieses Blocks mit einer Abfrage nachladen, gleiche Partition wie die Bewertung
+        placeholders = ", ".join("?" * len(partitionen))
+        for faktor in conn.execute(f"""
+            SELECT bewertung_id, faktor_name, faktor_sterne FROM bewertung_faktoren
+            WHERE bewertung_id IN ({placeholders})
+        """, list(partitionen)):
+            plattform, jahr, aenderung_nr = partitionen[faktor['bewertung_id']]
+            item = _normalisieren(faktor, ('bewertung_id', 'faktor_name', 'faktor_sterne'))
+            item['aenderung_nr'] = aenderung_nr
+            writer.add('bewertung_faktoren', plattform, jahr, FAKTOREN_SPALTEN, item)
+    return letzte_nr
+
+def _export_profil_verlauf(conn, writer, letzte_id):
+    """Schreibt profil_verlauf ab id > letzte_id (nur Einfügungen). Gibt die höchste exportierte id zurück."""
+    cursor = conn.execute(PROFIL_VERLAUF_EXPORT_SQL, (letzte_id,))
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            writer.add('profil_verlauf', row['plattform'], _jahr(row['scraping_datum']),
+                       PROFIL_VERLAUF_SPALTEN, _normalisieren(row, PROFIL_VERLAUF_SPALTEN))
+            letzte_id = max(letzte_id, row['id'])
+    return letzte_id
+
+def export_parquet(conn, ziel=EXPORT_ZIEL, voll=False, speicher_budget_mb=SPEICHER_BUDGET_MB):
+    """
+    Exportiert die Tabellen inkrementell (oder mit voll=True komplett neu) nach `ziel`.
+
+    Returns:
+        dict: Anzahl exportierter Zeilen pro Dataset und Anzahl geschriebener Row Groups.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow ist nicht installiert (pip install pyarrow).")
+    ziel = os.path.abspath(ziel)
+    if voll:
+        for dataset in DATASETS:
+            shutil.rmtree(os.path.join(ziel, dataset), ignore_errors=True)
+        with conn:
+            conn.execute("DELETE FROM export_watermarks WHERE ziel = ?", (ziel,))
+
+    writer = PartitionedParquetWriter(ziel, speicher_budget_mb * 1024 * 1024)
+    try:
+        # Eine Lesetransaktion: alle Tabellen aus demselben Datenbank-Stand
+        conn.execute("BEGIN")
+        bewertungen_watermark = _export_bewertungen(conn, writer, get_watermark(conn, ziel, 'bewertungen'))
+        profil_verlauf_watermark = _export_profil_verlauf(conn, writer, get_watermark(conn, ziel, 'profil_verlauf'))
+        conn.rollback() # Lesetransaktion beenden
+        writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+
+    with conn:
+        set_watermark(conn, ziel, 'bewertungen', bewertungen_watermark)
+        set_watermark(conn, ziel, 'profil_verlauf', profil_verlauf_watermark)
+    return {**{dataset: writer.zeilen[dataset] for dataset in DATASETS}, 'row_groups': writer.row_groups}
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportiert Bewertungen und Profilverlauf als partitioniertes Parquet.")
+    parser.add_argument('--ziel', default=EXPORT_ZIEL, help=f"Zielverzeichnis (Standard: {EXPORT_ZIEL})")
+    parser.add_argument('--voll', action='store_true', help="Zielverzeichnis leeren und alles neu exportieren")
+    parser.add_argument('--speicher-mb', type=int, default=SPEICHER_BUDGET_MB,
+                        help=f"Speicherbudget für gepufferte Zeilen in MiB (Standard: {SPEICHER_BUDGET_MB})")
+    parser.add_argument('--db', default=DB_NAME, help=f"SQLite-Datenbank (Standard: {DB_NAME})")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("Fehler: pyarrow ist nicht installiert. Installiere es mit: pip install pyarrow")
+        sys.exit(1)
+    setup_database(args.db) # Stellt sicher, dass export_watermarks und aenderung_nr vorhanden sind
+    conn = connect(args.db)
+    try:
+        stats = export_parquet(conn, args.ziel, voll=args.voll, speicher_budget_mb=args.speicher_mb)
+    finally:
+        conn.close()
+    print(f"Parquet-Export nach {os.path.abspath(args.ziel)}: {stats['bewertungen']} Bewertungen, "
+          f"{stats['bewertung_faktoren']} Faktoren, {stats['profil_verlauf']} Profilverlauf-Einträge "
+          f"({stats['row_groups']} Row Groups).")
+
+if __name__ == '__main__':
+    main()
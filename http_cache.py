@@ -0,0 +1,147 @@
+# http_cache.py
+"""
+Lokaler HTTP-Antwort-Cache (SQLite) für wiederholte Scrapes.
+
+Antworten werden pro URL gespeichert. Innerhalb der TTL werden sie direkt ausgeliefert, danach
+per If-None-Match/If-Modified-Since revalidiert. Überschreitet der Cache seine Maximalgröße,
+werden die am längsten nicht genutzten Einträge entfernt. Im Replay-Modus wird ausschließlich
+aus dem Cache gelesen (z.B. um das Parsen nach Schemaänderungen offline zu wiederholen).
+
+Aufruf von der Kommandozeile:
+    python http_cache.py stats
+    python http_cache.py clear
+"""
+import sqlite3
+import sys
+import threading
+import time
+
+CACHE_DB_NAME = 'http_cache.db'
+CACHE_TTL_SECONDS = 5 * 60
+CACHE_MAX_BYTES = 500 * 1024 * 1024 # 500 MiB
+# Die Gesamtgröße wird im Speicher mitgeführt; nach so vielen store()-Aufrufen wird sie neu aus der
+# Datenbank gelesen, damit Einträge anderer Prozesse (parallel_runner) nicht dauerhaft fehlen.
+CACHE_SIZE_RESYNC_STORES = 1000
+
+class ResponseCache:
+    """Thread-sicherer, SQLite-basierter Cache für HTTP-Antworten, Schlüssel ist die URL."""
+
+    def __init__(self, db_path=CACHE_DB_NAME, ttl_seconds=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None # Gesamtgröße aller Einträge, siehe _total_bytes_locked
+        self._stores_since_resync = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    status_code INTEGER NOT NULL,
+                    content BLOB NOT NULL,
+                    content_type TEXT,
+                    encoding TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL, -- Zeitpunkt des letzten Downloads bzw. der letzten Revalidierung
+                    last_access REAL NOT NULL, -- für die LRU-Verdrängung
+                    size INTEGER NOT NULL
+                )
+            ''')
+            # size liegt hinter dem BLOB; die Indizes decken sie ab, damit Größenabfragen und die
+            # LRU-Verdrängung keine Überlaufseiten der Antworten lesen müssen.
+            self._conn.execute("DROP INDEX IF EXISTS idx_responses_last_access")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses (last_access, size, url)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_url_size ON responses (url, size)")
+
+    def get(self, url):
+        """Gibt den Cache-Eintrag als dict zurück (inkl. 'is_fresh'), oder None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM responses WHERE url = ?", (url,)).fetchone()
+            if not row:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+        entry = dict(row)
+        entry['is_fresh'] = now - entry['fetched_at'] < self.ttl_seconds
+        return entry
+
+    def is_fresh(self, url):
+        """Prüft ohne Zugriffsvermerk, ob eine URL innerhalb der TTL im Cache liegt."""
+        with self._lock:
+            row = self._conn.execute("SELECT fetched_at FROM responses WHERE url = ?", (url,)).fetchone()
+        return bool(row) and time.time() - row['fetched_at'] < self.ttl_seconds
+
+    def store(self, url, status_code, content, content_type=None, encoding=None, etag=None, last_modified=None):
+        """Speichert (oder ersetzt) eine Antwort und verdrängt bei Bedarf alte Einträge."""
+        now = time.time()
+        with self._lock:
+            total_bytes = self._total_bytes_locked()
+            old_row = self._conn.execute("SELECT size FROM responses INDEXED BY idx_responses_url_size WHERE url = ?", (url,)).fetchone()
+            with self._conn:
+                self._conn.execute('''
+                    INSERT OR REPLACE INTO responses
+                        (url, status_code, content, content_type, encoding, etag, last_modified, fetched_at, last_access, size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (url, status_code, content, content_type, encoding, etag, last_modified, now, now, len(content)))
+            self._total_bytes = total_bytes + len(content) - (old_row['size'] if old_row else 0)
+            self._stores_since_resync += 1
+            self._evict_locked()
+
+    def mark_revalidated(self, url):
+        """Setzt die TTL nach einer 304-Antwort zurück."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+
+    def _total_bytes_locked(self):
+        if self._total_bytes is None or self._stores_since_resync >= CACHE_SIZE_RESYNC_STORES:
+            self._total_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses INDEXED BY idx_responses_url_size").fetchone()[0]
+            self._stores_since_resync = 0
+        return self._total_bytes
+
+    def _evict_locked(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        bytes_to_free = self._total_bytes - self.max_bytes
+        freed = 0
+        urls_to_delete = []
+        for row in self._conn.execute("SELECT url, size FROM responses INDEXED BY idx_responses_lru ORDER BY last_access ASC"):
+            urls_to_delete.append((row['url'],))
+            freed += row['size']
+            if freed >= bytes_to_free:
+                break
+        with self._conn:
+            self._conn.executemany("DELETE FROM responses WHERE url = ?", urls_to_delete)
+        self._total_bytes -= freed
+
+    def stats(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS size FROM responses INDEXED BY idx_responses_url_size").fetchone()
+        return {'entries': row['entries'], 'bytes': row['size']}
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    cache = ResponseCache()
+    if command == 'clear':
+        cache.clear()
+        print(f"Cache {CACHE_DB_NAME} geleert.")
+    else:
+        stats = cache.stats()
+        print(f"Cache {CACHE_DB_NAME}: {stats['entries']} Einträge, {stats['bytes'] / 1024 / 1024:.1f} MiB")
+    cache.close()
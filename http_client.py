@@ -0,0 +1,337 @@
+# http_client.py
+"""
+Gemeinsame HTTP-Schicht für kununu_scraper und trustpilot_scraper.
+
+Alle Anfragen laufen über eine gepoolte requests.Session (Keep-Alive, komprimierte Antworten,
+Retry mit Backoff bei 429/5xx). Latenz und übertragene Bytes werden pro Host mitgezählt.
+Antworten werden optional im lokalen Cache (http_cache) abgelegt und bedingt revalidiert.
+Sind Proxys konfiguriert (SCRAPER_PROXIES, siehe proxy_pool), laufen die Anfragen über den Proxy-Pool;
+403/429 werden dann nicht wiederholt, sondern wechseln sofort den Proxy.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+import http_cache
+import metrics
+import proxy_pool
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Verbindungs-Pool
+POOL_CONNECTIONS = 4   # Anzahl gepoolter Hosts
+POOL_MAXSIZE = 10      # Offene Verbindungen pro Host (>= Anzahl paralleler Worker)
+
+# Retry mit exponentiellem Backoff (1s, 2s, 4s, ...); Retry-After bei 429/503 wird beachtet
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 1.0
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def _accept_encoding():
+    """Brotli nur anbieten, wenn urllib3 es auch dekodieren kann."""
+    try:
+        import brotli  # noqa: F401
+        return 'gzip, deflate, br'
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return 'gzip, deflate, br'
+        except ImportError:
+            return 'gzip, deflate'
+
+class ProxyRetry(Retry):
+    """
+    Retry für Anfragen über den Proxy-Pool: 403/429 (proxy_pool.BLOCK_STATUS_CODES) werden nie wiederholt,
+    auch nicht wegen eines Retry-After-Headers. fetch() meldet den Block sofort dem Pool und wechselt den
+    Proxy, statt den blockierten Proxy erneut anzufragen.
+    """
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code in proxy_pool.BLOCK_STATUS_CODES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+_sessions = {} # proxied (bool) -> requests.Session
+_session_config = (POOL_CONNECTIONS, POOL_MAXSIZE, RETRY_TOTAL)
+_session_lock = threading.Lock()
+
+def _create_session(pool_connections, pool_maxsize, retry_total, proxied=False):
+    session = requests.Session()
+    retry = (ProxyRetry if proxied else Retry)(
+        total=retry_total,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False, # Nach dem letzten Versuch die Antwort zurückgeben, raise_for_status() entscheidet
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': _accept_encoding(),
+        'Connection': 'keep-alive',
+    })
+    return session
+
+def get_session(proxied=False):
+    """
+    Gibt die prozessweit geteilte Session zurück (wird beim ersten Aufruf angelegt).
+    Anfragen über den Proxy-Pool (proxied=True) nutzen eine eigene Session mit ProxyRetry.
+    """
+    session = _sessions.get(proxied)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(proxied)
+            if session is None:
+                session = _sessions[proxied] = _create_session(*_session_config, proxied)
+    return session
+
+def configure_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, retry_total=RETRY_TOTAL):
+    """Ersetzt die geteilten Sessions, z.B. um die Pool-Größe pro Host an die Anzahl der Worker anzupassen."""
+    global _session_config
+    with _session_lock:
+        old_sessions = list(_sessions.values())
+        _sessions.clear()
+        _session_config = (pool_connections, pool_maxsize, retry_total)
+    for old_session in old_sessions:
+        old_session.close()
+
+# --- Statistiken ---
+class FetchStats:
+    """Thread-sichere Zähler für Anfragen, Latenz und Bytes pro Host."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._hosts = {}
+
+    def _host_stats_locked(self, host):
+        return self._hosts.setdefault(host, {
+            'requests': 0, 'failed': 0, 'not_modified': 0, 'cache_hits': 0,
+            'latency_total': 0.0, 'latency_max': 0.0, 'bytes_wire': 0, 'bytes_decoded': 0,
+        })
+
+    def record_cache_hit(self, host):
+        with self._lock:
+            self._host_stats_locked(host)['cache_hits'] += 1
+        metrics.FETCH_TOTAL.inc(host=host, ergebnis='cache')
+
+    def record(self, host, latency_seconds, bytes_wire, bytes_decoded, failed=False, not_modified=False):
+        with self._lock:
+            stats = self._host_stats_locked(host)
+            stats['requests'] += 1
+            stats['failed'] += 1 if failed else 0
+            stats['not_modified'] += 1 if not_modified else 0
+            stats['latency_total'] += latency_seconds
+            stats['latency_max'] = max(stats['latency_max'], latency_seconds)
+            stats['bytes_wire'] += bytes_wire
+            stats['bytes_decoded'] += bytes_decoded
+        metrics.FETCH_SECONDS.observe(latency_seconds, host=host)
+        metrics.FETCH_TOTAL.inc(host=host, ergebnis='fehler' if failed else 'nicht_geaendert' if not_modified else 'ok')
+
+    def snapshot(self):
+        """Gibt eine Kopie der Zähler inkl. durchschnittlicher Latenz pro Host zurück."""
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                stats = dict(stats)
+                stats['latency_avg'] = stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0
+                result[host] = stats
+            return result
+
+fetch_stats = FetchStats()
+
+def get_fetch_stats():
+    return fetch_stats.snapshot()
+
+def format_fetch_stats():
+    """Kurze, lesbare Zusammenfassung der Statistiken für die Konsolenausgabe."""
+    lines = []
+    for host, stats in sorted(get_fetch_stats().items()):
+        lines.append(
+            f"{host}: {stats['requests']} Anfragen ({stats['failed']} fehlgeschlagen, {stats['not_modified']} x 304), "
+            f"{stats['cache_hits']} aus dem Cache, "
+            f"Latenz Ø {stats['latency_avg'] * 1000:.0f} ms / max {stats['latency_max'] * 1000:.0f} ms, "
+            f"{stats['bytes_wire'] / 1024:.0f} KiB übertragen ({stats['bytes_decoded'] / 1024:.0f} KiB entpackt)"
+        )
+    return "\n".join(lines) if lines else "Keine HTTP-Anfragen."
+
+# --- Antwort-Cache ---
+# SCRAPER_CACHE=0 schaltet den Cache ab, SCRAPER_CACHE_REPLAY=1 liest nur aus dem Cache (offline).
+HTTP_CACHE_ENABLED = os.environ.get('SCRAPER_CACHE', '1') != '0'
+HTTP_CACHE_REPLAY = os.environ.get('SCRAPER_CACHE_REPLAY') == '1'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Gibt den geteilten Antwort-Cache zurück, oder None wenn er abgeschaltet ist."""
+    global _cache
+    if not HTTP_CACHE_ENABLED and not HTTP_CACHE_REPLAY:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = http_cache.ResponseCache()
+    return _cache
+
+def configure_cache(enabled=True, replay=False, db_path=http_cache.CACHE_DB_NAME,
+                    ttl_seconds=http_cache.CACHE_TTL_SECONDS, max_bytes=http_cache.CACHE_MAX_BYTES):
+    """Schaltet den Cache um bzw. öffnet ihn mit anderen Einstellungen neu."""
+    global _cache, HTTP_CACHE_ENABLED, HTTP_CACHE_REPLAY
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        HTTP_CACHE_ENABLED = enabled
+        HTTP_CACHE_REPLAY = replay
+        _cache = http_cache.ResponseCache(db_path, ttl_seconds, max_bytes) if enabled or replay else None
+
+def would_hit_network(url):
+    """False, wenn die URL aus dem Cache bedient wird (Replay-Modus oder frischer Eintrag)."""
+    cache = get_cache()
+    if cache is None:
+        return True
+    return not (HTTP_CACHE_REPLAY or cache.is_fresh(url))
+
+def _response_from_cache(url, entry):
+    response = requests.Response()
+    response.status_code = entry['status_code']
+    response._content = entry['content']
+    response.url = url
+    response.encoding = entry['encoding']
+    response.headers = CaseInsensitiveDict({'Content-Type': entry['content_type'] or ''})
+    response.from_cache = True
+    return response
+
+# --- Proxy-Pool ---
+# Versuche pro Abruf, wenn ein Proxy blockiert wird oder nicht erreichbar ist (jeweils mit dem nächsten Proxy)
+PROXY_ATTEMPTS = 3
+
+_proxy_pool = None
+_proxy_pool_loaded = False
+_proxy_pool_lock = threading.Lock()
+
+def get_proxy_pool():
+    """Gibt den geteilten Proxy-Pool zurück, oder None wenn keine Proxys konfiguriert sind."""
+    global _proxy_pool, _proxy_pool_loaded
+    if not _proxy_pool_loaded:
+        with _proxy_pool_lock:
+            if not _proxy_pool_loaded:
+                proxy_urls = proxy_pool.load_proxy_urls()
+                _proxy_pool = proxy_pool.ProxyPool(proxy_urls, user_agent=USER_AGENT) if proxy_urls else None
+                _proxy_pool_loaded = True
+    return _proxy_pool
+
+def configure_proxy_pool(pool):
+    """Ersetzt den Proxy-Pool (None = ohne Proxys), z.B. mit einem pro Worker geteilten Budget."""
+    global _proxy_pool, _proxy_pool_loaded
+    with _proxy_pool_lock:
+        old_pool = _proxy_pool
+        _proxy_pool = pool
+        _proxy_pool_loaded = True
+    if old_pool is not None and old_pool is not pool:
+        old_pool.close()
+
+# --- Abruf ---
+def fetch(url, accept=None, timeout=15, bypass_cache=False):
+    """
+    Ruft eine URL über die geteilte Session ab.
+
+    Args:
+        url (str): Die abzurufende URL.
+        accept (str, optional): Wert für den Accept-Header (z.B. 'application/json').
+        timeout (float): Timeout in Sekunden.
+        bypass_cache (bool): Cache nicht lesen, sondern immer neu laden (die Antwort wird trotzdem
+            gespeichert). Im Replay-Modus ohne Wirkung.
+
+    Returns:
+        requests.Response: Die Antwort (Status 2xx).
+
+    Raises:
+        requests.exceptions.RequestException: Bei Netzwerkfehlern oder HTTP-Fehlerstatus
+            (im Replay-Modus auch, wenn die URL nicht im Cache liegt; proxy_pool.ProxyPoolExhausted,
+            wenn alle Proxys in Quarantäne sind).
+    """
+    host = urlsplit(url).netloc
+    headers = {'Accept': accept} if accept else {}
+    cache, cache_entry, cached_response = lookup_cache(url, headers, bypass_cache)
+    if cached_response is not None:
+        return cached_response
+
+    pool = get_proxy_pool()
+    attempts = PROXY_ATTEMPTS if pool else 1
+    for attempt in range(attempts):
+        proxy, wait = pool.acquire(url) if pool else (None, 0)
+        if wait:
+            time.sleep(wait)
+        start_time = time.perf_counter()
+        try:
+            response = get_session(proxied=proxy is not None).get(url, headers=headers or None, timeout=timeout,
+                                         proxies=proxy.requests_proxies if proxy else None)
+        except requests.exceptions.RequestException:
+            fetch_stats.record(host, time.perf_counter() - start_time, 0, 0, failed=True)
+            if proxy and pool.report(proxy, None) and attempt < attempts - 1:
+                continue
+            raise
+        if proxy and pool.report(proxy, response.status_code) and attempt < attempts - 1:
+            # Blockiert: mit dem nächsten Proxy erneut versuchen
+            fetch_stats.record(host, time.perf_counter() - start_time, 0, 0, failed=True)
+            response.close()
+            continue
+        return complete_response(url, response, time.perf_counter() - start_time, cache, cache_entry)
+
+def lookup_cache(url, headers, bypass_cache=False):
+    """
+    Cache-Teil von fetch(), auch für den asynchronen Client (async_engine).
+
+    Ergänzt headers bei abgelaufenen Einträgen um If-None-Match/If-Modified-Since.
+
+    Returns:
+        tuple: (cache, cache_entry, cached_response); cached_response ist gesetzt, wenn die URL
+        direkt aus dem Cache bedient wird.
+
+    Raises:
+        requests.exceptions.ConnectionError: Im Replay-Modus, wenn die URL nicht im Cache liegt.
+    """
+    cache = get_cache()
+    cache_entry = cache.get(url) if cache and (HTTP_CACHE_REPLAY or not bypass_cache) else None
+    if cache_entry and (HTTP_CACHE_REPLAY or cache_entry['is_fresh']):
+        fetch_stats.record_cache_hit(urlsplit(url).netloc)
+        return cache, cache_entry, _response_from_cache(url, cache_entry)
+    if HTTP_CACHE_REPLAY:
+        raise requests.exceptions.ConnectionError(f"Replay-Modus: {url} liegt nicht im Cache.")
+    if cache_entry:
+        # Abgelaufener Eintrag: bedingt anfragen, bei 304 wird der Cache-Inhalt weiterverwendet
+        if cache_entry['etag']:
+            headers['If-None-Match'] = cache_entry['etag']
+        if cache_entry['last_modified']:
+            headers['If-Modified-Since'] = cache_entry['last_modified']
+    return cache, cache_entry, None
+
+def complete_response(url, response, latency, cache, cache_entry):
+    """Zählt eine Netzwerk-Antwort, löst bei Fehlerstatus aus und legt sie im Cache ab (siehe fetch)."""
+    host = urlsplit(url).netloc
+    if response.status_code == 304 and cache_entry:
+        fetch_stats.record(host, latency, 0, 0, not_modified=True)
+        cache.mark_revalidated(url)
+        return _response_from_cache(url, cache_entry)
+
+    bytes_decoded = len(response.content)
+    content_length = response.headers.get('Content-Length')
+    bytes_wire = int(content_length) if content_length and content_length.isdigit() else bytes_decoded
+    fetch_stats.record(host, latency, bytes_wire, bytes_decoded, failed=not response.ok)
+    response.raise_for_status()
+    if cache:
+        cache.store(url, response.status_code, response.content,
+                    content_type=response.headers.get('Content-Type'), encoding=response.encoding,
+                    etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+    return response
@@ -1,19 +1,41 @@
 # kununu_scraper.py
+import logging
 import sqlite3
+import time
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
+from bs4 import BeautifulSoup, SoupStrainer
+from datetime import datetime, timedelta
 import re # Für das Parsen von Zahlen
 import json # Für das Verarbeiten von JSON-Daten
-
-# Name der Datenbankdatei
-DB_NAME = 'Datenbank.db'
-
-def get_db_connection():
-    """Stellt eine Verbindung zur SQLite-Datenbank her."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row # Ermöglicht Zugriff auf Spalten per Namen
-    return conn
+import http_client # Gemeinsame, gepoolte HTTP-Session
+import metrics # Zähler/Histogramme für /metrics
+import scrape_checkpoints # Fortsetzbare vollständige Durchläufe
+from db import DB_NAME, get_db_connection # Gemeinsame SQLite-Verbindungen (WAL, Pool)
+
+logger = logging.getLogger(__name__)
+
+# Im inkrementellen Modus wird spätestens nach diesem Intervall wieder ein vollständiger
+# Durchlauf aller Seiten gemacht (erkennt Löschungen und Änderungen tief in der Historie).
+KUNUNU_FULL_SWEEP_INTERVAL_DAYS = 7
+# Profil-UUID, Slug und Ländercode werden pro Profil gespeichert; die Übersichtsseite (Gesamtdurchschnitt,
+# Anzahl Bewertungen) wird nur noch in diesem Intervall abgerufen, dazwischen geht es direkt an die JSON-API.
+KUNUNU_OVERVIEW_REFRESH_INTERVAL_HOURS = 24
+
+KUNUNU_BASE_URL = "https://www.kununu.com"
+
+# lxml ist optional: Der C-Parser ist deutlich schneller als das reine Python-'html.parser'
+try:
+    import lxml # noqa: F401
+    OVERVIEW_HTML_PARSER = 'lxml'
+except ImportError:
+    OVERVIEW_HTML_PARSER = 'html.parser'
+
+# Von der Übersichtsseite werden nur die <span>-Elemente mit Gesamtdurchschnitt und Anzahl Bewertungen
+# in einen Baum geparst, der Rest des Dokuments wird beim Parsen verworfen.
+OVERVIEW_SPAN_STRAINER = SoupStrainer('span', class_=re.compile(r'index__value__|text-dark-53'))
+# Apollo-State und UUID werden per Regex direkt aus den Rohbytes gelesen (Script-Inhalt ist nicht HTML-escaped)
+APOLLO_STATE_PATTERN = re.compile(rb'<script[^>]*data-testid="apollo-state"[^>]*>(.*?)</script>', re.DOTALL)
+PROFILE_UUID_FALLBACK_PATTERN = re.compile(rb'"uuid":"([a-f0-9\-]{36})"')
 
 # --- Datenbank-Hilfsfunktionen ---
 
@@ -100,7 +122,7 @@ def get_or_create_profil(conn, unternehmen_id, plattform_id, profil_url):
         except sqlite3.IntegrityError:
             # Einfügen fehlgeschlagen (wahrscheinlich UNIQUE constraint).
             # Hole existierendes Profil für Unternehmen/Plattform-Kombination.
-            print(f"Hinweis: Profil für Unternehmen ID {unternehmen_id} und Plattform ID {plattform_id} existiert bereits, ggf. mit anderer URL. Verwende existierendes Profil.")
+            logger.info("Profil für Unternehmen ID %s und Plattform ID %s existiert bereits, ggf. mit anderer URL. Verwende existierendes Profil.", unternehmen_id, plattform_id)
             cursor.execute("""
                 SELECT id FROM unternehmens_profile
                 WHERE unternehmen_id = ? AND plattform_id = ?
@@ -130,137 +152,252 @@ def add_profil_verlauf(conn, profil_id, gesamtdurchschnitt, anzahl_bewertungen,
             VALUES (?, ?, ?, ?, ?)
         """, (profil_id, gesamtdurchschnitt, anzahl_bewertungen, current_time, recommendation_rate))
         conn.commit()
-        print(f"Neuer Verlaufseintrag für Profil ID {profil_id} hinzugefügt: Score={gesamtdurchschnitt}, Bewertungen={anzahl_bewertungen}, Empf.Rate={recommendation_rate}% ({current_time}).")
+        logger.info("Neuer Verlaufseintrag für Profil ID %s hinzugefügt: Score=%s, Bewertungen=%s, Empf.Rate=%s%% (%s).", profil_id, gesamtdurchschnitt, anzahl_bewertungen, recommendation_rate, current_time)
     except Exception as e:
-        print(f"Fehler beim Hinzufügen des Profilverlaufs für Profil ID {profil_id}: {e}")
+        logger.error("Fehler beim Hinzufügen des Profilverlaufs für Profil ID %s: %s", profil_id, e)
         conn.rollback()
 
 
-def add_bewertung(conn, profil_id, sterne, titel, text, datum_str, platform_review_id,
-                  review_type=None, is_recommended=None, reviewer_position=None,
-                  reviewer_department=None, reviewed_entity_name=None, reviewed_entity_uuid=None, is_former_employee=None, updated_at_kununu=None,
-                  reviewer_city=None, reviewer_state=None, apprenticeship_job_title=None):
+# Maximale Anzahl an IDs pro IN (...)-Abfrage (SQLite-Limit für Platzhalter liegt je nach Version bei 999).
+SQLITE_IN_CHUNK_SIZE = 500
+
+KUNUNU_REVIEW_COLUMNS = (
+    'sterne', 'titel', 'text', 'datum', 'review_type', 'is_recommended',
+    'reviewer_position', 'reviewer_department', 'reviewed_entity_name', 'reviewed_entity_uuid',
+    'is_former_employee', 'platform_data_updated_at', 'reviewer_city', 'reviewer_state',
+    'apprenticeship_job_title'
+)
+
+def get_existing_reviews_data_bulk(conn, profil_id, platform_review_ids):
     """
-    Fügt eine Bewertung zur Datenbank hinzu. Verhindert Duplikate via bewertung_hash.
+    Holt die Daten mehrerer existierender Bewertungen mit einer Abfrage pro Block.
 
     Args:
         conn: SQLite-Datenbankverbindung.
         profil_id (int): ID des Unternehmensprofils.
-        sterne (float): Sternebewertung (Gesamt).
-        titel (str): Titel der Bewertung.
-        text (str): Vollständiger Text der Bewertung.
-        datum_str (str): Datum der Bewertung (ISO-Format von Kununu).
-        platform_review_id (str): Eindeutige ID/Hash für die Bewertung.
-        review_type (str, optional): Typ der Bewertung.
-        is_recommended (bool, optional): Ob empfohlen.
-        reviewer_position (str, optional): Position des Bewerters.
-        reviewer_department (str, optional): Abteilung des Bewerters.
-        reviewed_entity_name (str, optional): Name der bewerteten Unternehmenseinheit.
-        reviewed_entity_uuid (str, optional): UUID der bewerteten Unternehmenseinheit.
-        updated_at_kununu (str, optional): Kununus 'updatedAt' Zeitstempel.
-        is_former_employee (bool, optional): Ob der Bewerter ein ehemaliger Mitarbeiter ist.
-        reviewer_city (str, optional): Stadt des Bewerters.
-        reviewer_state (str, optional): Bundesland des Bewerters.
-        apprenticeship_job_title (str, optional): Ausbildungsberuf.
+        platform_review_ids (iterable): Kununu UUIDs der Bewertungen.
+
     Returns:
-        int or None: ID der neu eingefügten Bewertung, sonst None.
+        dict: platform_review_id -> {"db_id", "platform_data_updated_at_db", "is_deleted_db"}.
     """
+    ids = list(platform_review_ids)
+    existing = {}
     cursor = conn.cursor()
-    bewertung_id = None
+    for start in range(0, len(ids), SQLITE_IN_CHUNK_SIZE):
+        chunk = ids[start:start + SQLITE_IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(f"""
+            SELECT id, platform_review_id, platform_data_updated_at, is_deleted
+            FROM bewertungen
+            WHERE profil_id = ? AND platform_review_id IN ({placeholders})
+        """, (profil_id, *chunk))
+        for row in cursor.fetchall():
+            existing[row["platform_review_id"]] = {"db_id": row["id"], "platform_data_updated_at_db": row["platform_data_updated_at"], "is_deleted_db": row["is_deleted"]}
+    return existing
+
+def upsert_kununu_reviews_bulk(conn, profil_id, parsed_reviews, checkpoint=None, seite=None):
+    """
+    Schreibt eine Seite (oder mehr) geparster Kununu-Bewertungen in einer einzigen Transaktion.
+    Neue Bewertungen werden eingefügt, geänderte (neueres updatedAt oder zuvor gelöscht) aktualisiert
+    inkl. ihrer Faktoren, bei unveränderten wird nur 'last_seen' gesetzt.
+
+    Args:
+        conn: SQLite-Datenbankverbindung.
+        profil_id (int): ID des Unternehmensprofils.
+        parsed_reviews (list): Ergebnisse von parse_kununu_review().
+        checkpoint (ScrapeCheckpoint, optional): Wird in derselben Transaktion auf `seite` gesetzt.
+        seite (int, optional): Nummer der geschriebenen Seite (für den Checkpoint).
+
+    Returns:
+        dict: Anzahl {"neu", "geaendert", "unveraendert"} Bewertungen und "fehlgeschlagen" (True, wenn die
+            Transaktion zurückgerollt wurde; die Seite gilt dann als nicht gesehen, siehe main_scraper).
+    """
+    counts = {"neu": 0, "geaendert": 0, "unveraendert": 0, "fehlgeschlagen": False}
+    write_start = time.perf_counter()
+    # Doppelte UUIDs innerhalb eines Batches zusammenfassen (der letzte Eintrag gewinnt)
+    reviews_by_uuid = {review['platform_review_id']: review for review in parsed_reviews}
+    if not reviews_by_uuid:
+        if checkpoint:
+            checkpoint.save_page(conn, seite)
+        return counts
+
+    current_time = datetime.now()
+    new_reviews, changed_reviews, unchanged_db_ids = [], [], []
     try:
-        cursor.execute("""
-            INSERT INTO bewertungen ( 
-                profil_id, sterne, titel, text, datum, platform_review_id, is_former_employee, platform_data_updated_at, last_seen_scraping_datum,
-                review_type, is_recommended, reviewer_position, reviewer_department,
-                reviewed_entity_name, reviewed_entity_uuid, reviewer_city, reviewer_state,
-                apprenticeship_job_title
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (profil_id, sterne, titel, text, datum_str, platform_review_id, is_former_employee, updated_at_kununu, datetime.now(),
-              review_type, is_recommended, reviewer_position, reviewer_department, 
-              reviewed_entity_name, reviewed_entity_uuid, reviewer_city, reviewer_state, apprenticeship_job_title))
-        conn.commit()
-        bewertung_id = cursor.lastrowid
-        print(f"Bewertung '{titel[:30]}...' für Profil ID {profil_id} hinzugefügt.")
-    except sqlite3.IntegrityError as e:
-        if "UNIQUE constraint failed" in str(e):
-            print(f"Hinweis: Bewertung '{titel[:30]}...' (ID: {platform_review_id}) für Profil ID {profil_id} existiert bereits. Übersprungen.")
-            # Um die ID der existierenden Bewertung zu holen (optional, falls Faktoren aktualisiert werden sollen):
-            # cursor.execute("SELECT id FROM bewertungen WHERE profil_id = ? AND platform_review_id = ?", (profil_id, platform_review_id))
-            # row = cursor.fetchone()
-            # if row: bewertung_id = row['id']
-        else:
-            print(f"Fehler (IntegrityError) beim Hinzufügen der Bewertung für Profil ID {profil_id}: {e} - Titel: {titel}")
+        existing = get_existing_reviews_data_bulk(conn, profil_id, reviews_by_uuid.keys())
+        for uuid, review in reviews_by_uuid.items():
+            existing_review = existing.get(uuid)
+            if not existing_review:
+                new_reviews.append(review)
+            elif review['platform_data_updated_at'] and (existing_review['platform_data_updated_at_db'] is None or review['platform_data_updated_at'] > existing_review['platform_data_updated_at_db'] or existing_review['is_deleted_db']):
+                changed_reviews.append((existing_review['db_id'], review))
+            else:
+                unchanged_db_ids.append(existing_review['db_id'])
+
+        with conn:
+            cursor = conn.cursor()
+            if new_reviews:
+                cursor.executemany(f"""
+                    INSERT INTO bewertungen (
+                        profil_id, platform_review_id, last_seen_scraping_datum, {", ".join(KUNUNU_REVIEW_COLUMNS)}
+                    )
+                    VALUES (?, ?, ?, {", ".join("?" * len(KUNUNU_REVIEW_COLUMNS))})
+                """, [(profil_id, review['platform_review_id'], current_time, *(review[col] for col in KUNUNU_REVIEW_COLUMNS))
+                      for review in new_reviews])
+                # executemany liefert keine lastrowid je Zeile, daher die neuen IDs gesammelt nachladen
+                new_ids = get_existing_reviews_data_bulk(conn, profil_id, (review['platform_review_id'] for review in new_reviews))
+            else:
+                new_ids = {}
+
+            if changed_reviews:
+                cursor.executemany(f"""
+                    UPDATE bewertungen
+                    SET {", ".join(f"{col} = ?" for col in KUNUNU_REVIEW_COLUMNS)},
+                        last_seen_scraping_datum = ?, is_deleted = 0
+                    WHERE id = ?
+                """, [(*(review[col] for col in KUNUNU_REVIEW_COLUMNS), current_time, db_id)
+                      for db_id, review in changed_reviews])
+                # Faktoren der alten Bewertungen löschen, bevor die neuen eingefügt werden
+                cursor.executemany("DELETE FROM bewertung_faktoren WHERE bewertung_id = ?",
+                                   [(db_id,) for db_id, _ in changed_reviews])
+
+            if unchanged_db_ids:
+                cursor.executemany("UPDATE bewertungen SET last_seen_scraping_datum = ?, is_deleted = 0 WHERE id = ?",
+                                   [(current_time, db_id) for db_id in unchanged_db_ids])
+
+            faktor_rows = [(db_id, faktor["name"], faktor["sterne"]) for db_id, review in changed_reviews for faktor in review['faktoren']]
+            for review in new_reviews:
+                new_review = new_ids.get(review['platform_review_id'])
+                if new_review:
+                    faktor_rows.extend((new_review['db_id'], faktor["name"], faktor["sterne"]) for faktor in review['faktoren'])
+            if faktor_rows:
+                # OR IGNORE: doppelte Faktoren einer Bewertung werden wie bisher übersprungen
+                cursor.executemany("""
+                    INSERT OR IGNORE INTO bewertung_faktoren (bewertung_id, faktor_name, faktor_sterne)
+                    VALUES (?, ?, ?)
+                """, faktor_rows)
+            if checkpoint:
+                checkpoint.record_page(cursor, seite)
+
+        counts["neu"] = len(new_reviews)
+        counts["geaendert"] = len(changed_reviews)
+        counts["unveraendert"] = len(unchanged_db_ids)
+        logger.debug("Profil ID %s: %s neu, %s aktualisiert, %s unverändert (eine Transaktion).", profil_id, counts['neu'], counts['geaendert'], counts['unveraendert'])
     except Exception as e:
-        print(f"Allgemeiner Fehler beim Hinzufügen der Bewertung für Profil ID {profil_id}: {e} - Titel: {titel}")
+        logger.error("Fehler beim gesammelten Speichern der Bewertungen für Profil ID %s: %s", profil_id, e)
         conn.rollback()
-    return bewertung_id
+        counts["fehlgeschlagen"] = True
+    metrics.DB_WRITE_SECONDS.observe(time.perf_counter() - write_start, plattform='kununu')
+    metrics.record_page_counts('kununu', counts)
+    return counts
 
-def update_bewertung(conn, bewertung_db_id, sterne, titel, text, datum_str,
-                     review_type, is_recommended, reviewer_position, reviewer_department,
-                     reviewed_entity_name, reviewed_entity_uuid, is_former_employee, platform_data_updated_at,
-                     reviewer_city, reviewer_state, apprenticeship_job_title):
-    """Aktualisiert eine bestehende Bewertung in der Datenbank."""
-    cursor = conn.cursor()
+def mark_unseen_reviews_deleted(conn, profil_id, lauf_start):
+    """
+    Markiert alle Bewertungen eines Profils als gelöscht, die bei einem vollständigen Durchlauf
+    nicht gesehen wurden, d.h. deren last_seen_scraping_datum vor dem Start des Durchlaufs liegt.
+    Funktioniert damit auch für Durchläufe, die über mehrere Läufe fortgesetzt wurden.
+
+    Args:
+        conn: SQLite-Datenbankverbindung.
+        profil_id (int): ID des Unternehmensprofils.
+        lauf_start (datetime): Start des (ggf. fortgesetzten) Durchlaufs.
+
+    Returns:
+        int: Anzahl der neu als gelöscht markierten Bewertungen.
+    """
     try:
-        cursor.execute("""
-            UPDATE bewertungen
-            SET sterne = ?, titel = ?, text = ?, datum = ?, review_type = ?,
-                is_recommended = ?, reviewer_position = ?, reviewer_department = ?,
-                reviewed_entity_name = ?, reviewed_entity_uuid = ?, is_former_employee = ?,
-                platform_data_updated_at = ?, last_seen_scraping_datum = ?, is_deleted = 0,
-                reviewer_city = ?, reviewer_state = ?, apprenticeship_job_title = ?
-            WHERE id = ?
-        """, (sterne, titel, text, datum_str, review_type,
-              is_recommended, reviewer_position, reviewer_department,
-              reviewed_entity_name, reviewed_entity_uuid, is_former_employee,
-              platform_data_updated_at, datetime.now(),
-              reviewer_city, reviewer_state, apprenticeship_job_title,
-              bewertung_db_id))
-        conn.commit()
-        print(f"Bewertung ID {bewertung_db_id} ('{titel[:30]}...') aktualisiert.")
-        return True
+        gesehen = conn.execute(
+            "SELECT 1 FROM bewertungen WHERE profil_id = ? AND last_seen_scraping_datum >= ? LIMIT 1",
+            (profil_id, lauf_start)).fetchone()
+        if not gesehen:
+            logger.info("Keine Bewertungen gesehen, Löscherkennung für Profil ID %s wird übersprungen.", profil_id)
+            return 0
+        with conn:
+            cursor = conn.execute("""
+                UPDATE bewertungen SET is_deleted = 1
+                WHERE profil_id = ? AND is_deleted = 0
+                  AND (last_seen_scraping_datum IS NULL OR last_seen_scraping_datum < ?)
+            """, (profil_id, lauf_start))
+            deleted_count = cursor.rowcount
+        logger.info("%s Bewertungen für Profil ID %s nicht mehr gefunden und als gelöscht markiert.", deleted_count, profil_id)
+        return deleted_count
     except Exception as e:
-        print(f"Fehler beim Aktualisieren der Bewertung ID {bewertung_db_id}: {e}")
+        logger.error("Fehler bei der Löscherkennung für Profil ID %s: %s", profil_id, e)
         conn.rollback()
-        return False
+        return 0
 
-def get_existing_review_data(conn, profil_id, platform_review_id):
-    """Holt Daten einer existierenden Bewertung anhand der Kununu UUID."""
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, platform_data_updated_at, is_deleted
-        FROM bewertungen
-        WHERE profil_id = ? AND platform_review_id = ?
-    """, (profil_id, platform_review_id))
-    row = cursor.fetchone()
-    if row:
-        return {"db_id": row["id"], "platform_data_updated_at_db": row["platform_data_updated_at"], "is_deleted_db": row["is_deleted"]}
-    return None
+def is_full_sweep_due(conn, profil_id, interval_days=KUNUNU_FULL_SWEEP_INTERVAL_DAYS):
+    """Prüft, ob der letzte vollständige Durchlauf eines Profils länger als interval_days zurückliegt."""
+    row = conn.execute("SELECT letzter_vollscan FROM unternehmens_profile WHERE id = ?", (profil_id,)).fetchone()
+    if not row or not row['letzter_vollscan']:
+        return True
+    try:
+        letzter_vollscan = datetime.fromisoformat(str(row['letzter_vollscan']))
+    except ValueError:
+        return True
+    return datetime.now() - letzter_vollscan >= timedelta(days=interval_days)
 
+def record_full_sweep(conn, profil_id):
+    """Speichert den Zeitpunkt eines abgeschlossenen vollständigen Durchlaufs."""
+    with conn:
+        conn.execute("UPDATE unternehmens_profile SET letzter_vollscan = ? WHERE id = ?", (datetime.now(), profil_id))
 
-def add_bewertung_faktor(conn, bewertung_id, faktor_name, faktor_sterne):
+def get_profile_identifiers(conn, profil_id):
     """
-    Fügt die Sternebewertung eines Faktors zu einer Bewertung hinzu.
+    Liest die gespeicherte Kununu-Profilkennung eines Profils.
 
-    Args:
-        conn: SQLite-Datenbankverbindung.
-        bewertung_id (int): ID der zugehörigen Bewertung.
-        faktor_name (str): Name des Bewertungsfaktors.
-        faktor_sterne (float): Sternebewertung für diesen Faktor.
+    Returns:
+        dict or None: {'profile_uuid', 'slug', 'country_code', 'uebersicht_stand'} oder None, wenn noch
+        keine UUID gespeichert ist.
     """
-    cursor = conn.cursor()
+    row = conn.execute(
+        "SELECT plattform_profil_uuid, plattform_slug, plattform_land, uebersicht_stand FROM unternehmens_profile WHERE id = ?",
+        (profil_id,)).fetchone()
+    if not row or not row['plattform_profil_uuid']:
+        return None
+    return {
+        'profile_uuid': row['plattform_profil_uuid'],
+        'slug': row['plattform_slug'],
+        'country_code': row['plattform_land'],
+        'uebersicht_stand': row['uebersicht_stand'],
+    }
+
+def save_profile_identifiers(conn, profil_id, profile_uuid, slug, country_code):
+    """Speichert UUID, Slug und Ländercode eines Profils zusammen mit dem Zeitpunkt des Übersichtsabrufs."""
+    with conn:
+        conn.execute(
+            "UPDATE unternehmens_profile SET plattform_profil_uuid = ?, plattform_slug = ?, plattform_land = ?, uebersicht_stand = ? WHERE id = ?",
+            (profile_uuid, slug, country_code, datetime.now(), profil_id))
+
+def is_overview_refresh_due(identifiers, interval_hours=KUNUNU_OVERVIEW_REFRESH_INTERVAL_HOURS):
+    """Prüft, ob die Übersichtsseite (erneut) abgerufen werden muss."""
+    if not identifiers or not identifiers['uebersicht_stand']:
+        return True
     try:
-        cursor.execute("""
-            INSERT INTO bewertung_faktoren (bewertung_id, faktor_name, faktor_sterne)
-            VALUES (?, ?, ?)
-        """, (bewertung_id, faktor_name, faktor_sterne))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        print(f"Hinweis: Faktor '{faktor_name}' für Bewertung ID {bewertung_id} existiert bereits oder konnte nicht hinzugefügt werden.")
-    except Exception as e:
-        print(f"Fehler beim Hinzufügen des Faktors '{faktor_name}' für Bewertung ID {bewertung_id}: {e}")
-        conn.rollback()
+        uebersicht_stand = datetime.fromisoformat(str(identifiers['uebersicht_stand']))
+    except ValueError:
+        return True
+    return datetime.now() - uebersicht_stand >= timedelta(hours=interval_hours)
+
+def slug_and_country_from_url(profil_uebersicht_url, unternehmen_name):
+    """
+    Extrahiert Slug und Ländercode aus der Übersichts-URL für die API-URL.
+    Beispiel: https://www.kununu.com/de/deutsche-bahn -> slug='deutsche-bahn', country_code='de'
+    """
+    url_parts = profil_uebersicht_url.rstrip('/').split('/')
+    slug = url_parts[-1] if url_parts else unternehmen_name.lower().replace(' ', '-') # Fallback für Slug
+    country_code = "de" # Standard, oder aus URL extrahieren, falls variabler
+    if len(url_parts) > 3 and len(url_parts[-2]) == 2 : # Einfache Prüfung für Ländercode
+        country_code = url_parts[-2]
+    return slug, country_code
+
+def build_reviews_api_url(country_code, slug, profile_uuid, page):
+    """Baut die URL einer Seite der Kununu-Bewertungs-API (neueste zuerst, mit Faktor-Bewertungen)."""
+    # Basis-URL: https://www.kununu.com/middlewares/profiles/{countryCode}/{slug}/{profileUuid}/reviews
+    # Parameter: ?fetchFactorScores=0&reviewType=employees&sort=newest&page={page}
+    # urlParams ist optional und wird hier durch sort=newest abgedeckt
+    return (f"{KUNUNU_BASE_URL}/middlewares/profiles/{country_code}/{slug}/{profile_uuid}/reviews"
+            f"?fetchFactorScores=1&reviewType=employees&sort=newest&page={page}")
 
 # --- Hilfsfunktion zum Abrufen und Parsen von URLs ---
 def fetch_and_parse_url(url_to_fetch):
@@ -273,33 +410,26 @@ def fetch_and_parse_url(url_to_fetch):
     Returns:
         BeautifulSoup or None: BeautifulSoup-Objekt bei Erfolg, sonst None.
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
     try:
-        print(f"Rufe URL ab: {url_to_fetch}")
-        response = requests.get(url_to_fetch, headers=headers, timeout=15)
-        response.raise_for_status() # Löst HTTPError bei fehlerhaften Antworten (4XX, 5XX)
+        logger.debug("Rufe URL ab: %s", url_to_fetch)
+        response = http_client.fetch(url_to_fetch, timeout=15) # Löst HTTPError bei fehlerhaften Antworten (4XX, 5XX)
         return BeautifulSoup(response.content, 'html.parser')
     except requests.exceptions.RequestException as e:
-        print(f"Fehler beim Abrufen und Parsen der URL {url_to_fetch}: {e}")
+        logger.error("Fehler beim Abrufen und Parsen der URL %s: %s", url_to_fetch, e)
         return None
 
 def fetch_json_data(url_to_fetch):
     """Ruft eine URL ab, die JSON-Daten zurückgibt, und parst diese."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/json' # Wichtig, um sicherzustellen, dass der Server JSON sendet
-    }
     try:
-        print(f"Rufe JSON-API ab: {url_to_fetch}")
-        response = requests.get(url_to_fetch, headers=headers, timeout=15)
-        response.raise_for_status()
-        return response.json() # Parst die JSON-Antwort direkt in ein Python-Dict
+        logger.debug("Rufe JSON-API ab: %s", url_to_fetch)
+        # Accept: application/json ist wichtig, um sicherzustellen, dass der Server JSON sendet
+        response = http_client.fetch(url_to_fetch, accept='application/json', timeout=15)
+        with metrics.PARSE_SECONDS.time(plattform='kununu', seite='json'):
+            return response.json() # Parst die JSON-Antwort direkt in ein Python-Dict
     except requests.exceptions.RequestException as e:
-        print(f"Fehler beim Abrufen der JSON-Daten von {url_to_fetch}: {e}")
+        logger.error("Fehler beim Abrufen der JSON-Daten von %s: %s", url_to_fetch, e)
     except json.JSONDecodeError as e:
-        print(f"Fehler beim Parsen der JSON-Antwort von {url_to_fetch}: {e}")
+        logger.error("Fehler beim Parsen der JSON-Antwort von %s: %s", url_to_fetch, e)
     return None
 
 
@@ -333,9 +463,9 @@ def scrape_kununu_overview_data(soup, kununu_url_for_logging):
         anzahl_bewertungen_str = reviews_element.get_text(strip=True) # z.B. "13.163 Bewertungen"
 
     if not gesamtdurchschnitt_str:
-        print(f"Gesamtdurchschnitt nicht auf {kununu_url_for_logging} gefunden. Überprüfe Selektoren.")
+        logger.warning("Gesamtdurchschnitt nicht auf %s gefunden. Überprüfe Selektoren.", kununu_url_for_logging)
     if not anzahl_bewertungen_str:
-        print(f"Anzahl Bewertungen nicht auf {kununu_url_for_logging} gefunden. Überprüfe Selektoren.")
+        logger.warning("Anzahl Bewertungen nicht auf %s gefunden. Überprüfe Selektoren.", kununu_url_for_logging)
 
     gesamtdurchschnitt = None
     if gesamtdurchschnitt_str:
@@ -343,7 +473,7 @@ def scrape_kununu_overview_data(soup, kununu_url_for_logging):
             # Kununu verwendet Komma als Dezimaltrennzeichen, z.B. "3,8"
             gesamtdurchschnitt = float(gesamtdurchschnitt_str.replace(',', '.'))
         except ValueError:
-            print(f"Fehler beim Umwandeln des Gesamtdurchschnitts: '{gesamtdurchschnitt_str}'")
+            logger.error("Fehler beim Umwandeln des Gesamtdurchschnitts: '%s'", gesamtdurchschnitt_str)
 
     anzahl_bewertungen = None
     if anzahl_bewertungen_str:
@@ -352,210 +482,265 @@ def scrape_kununu_overview_data(soup, kununu_url_for_logging):
             if anzahl_bewertungen_numeric_str:
                  anzahl_bewertungen = int(anzahl_bewertungen_numeric_str)
         except ValueError:
-            print(f"Fehler beim Umwandeln der Anzahl Bewertungen: '{anzahl_bewertungen_str}'")
+            logger.error("Fehler beim Umwandeln der Anzahl Bewertungen: '%s'", anzahl_bewertungen_str)
             
     return gesamtdurchschnitt, anzahl_bewertungen
 
-def extract_profile_uuid_from_html(soup):
+def fetch_overview_html(url_to_fetch):
     """
-    Versucht, die Kununu Profil-UUID aus dem HTML einer Übersichtsseite zu extrahieren.
-    Oft in einem <script data-testid="apollo-state"> Tag.
+    Ruft eine Kununu-Übersichtsseite ab, ohne sie zu parsen.
+
+    Args:
+        url_to_fetch (str): Die abzurufende URL.
+
+    Returns:
+        bytes or None: Roher HTML-Inhalt bei Erfolg, sonst None.
     """
-    if not soup:
+    try:
+        logger.debug("Rufe URL ab: %s", url_to_fetch)
+        response = http_client.fetch(url_to_fetch, timeout=15) # Löst HTTPError bei fehlerhaften Antworten (4XX, 5XX)
+        return response.content
+    except requests.exceptions.RequestException as e:
+        logger.error("Fehler beim Abrufen der URL %s: %s", url_to_fetch, e)
         return None
-    
-    apollo_state_script = soup.find('script', attrs={'data-testid': 'apollo-state'})
-    if apollo_state_script:
-        try:
-            json_data = json.loads(apollo_state_script.string)
-            # Durchsuche die JSON-Struktur nach einem Schlüssel, der die Profil-UUID enthält.
-            # Dies ist spezifisch für Kununus Struktur und muss ggf. angepasst werden.
-            # Beispiel: ROOT_QUERY -> profile({"slug":"..."}) -> uuid
-            for key, value in json_data.get("ROOT_QUERY", {}).items():
-                if isinstance(value, dict) and "uuid" in value and "slug" in value: # Einfache Prüfung
-                    profile_uuid = value.get("uuid")
-                    if isinstance(profile_uuid, str) and len(profile_uuid) == 36: # UUID v4 Länge
-                        print(f"  DEBUG: Profil-UUID aus Apollo-State extrahiert: {profile_uuid}")
-                        return profile_uuid
-        except json.JSONDecodeError:
-            print("  DEBUG: Fehler beim Parsen des Apollo-State JSON.")
-        except Exception as e:
-            print(f"  DEBUG: Unerwarteter Fehler beim Extrahieren der UUID aus Apollo-State: {e}")
-    
+
+def parse_overview_html(html):
+    """
+    Parst nur die für scrape_kununu_overview_data benötigten Elemente einer Übersichtsseite.
+
+    Args:
+        html (bytes): Roher HTML-Inhalt der Übersichtsseite.
+
+    Returns:
+        BeautifulSoup or None: Reduzierter Baum mit den Bewertungs-<span>-Elementen.
+    """
+    if not html:
+        return None
+    return BeautifulSoup(html, OVERVIEW_HTML_PARSER, parse_only=OVERVIEW_SPAN_STRAINER)
+
+def extract_apollo_state(html):
+    """
+    Liest den JSON-Inhalt des <script data-testid="apollo-state"> Tags direkt aus dem rohen HTML.
+
+    Returns:
+        dict or None: Der Apollo-State oder None, wenn er fehlt oder kein gültiges JSON ist.
+    """
+    if not html:
+        return None
+    match = APOLLO_STATE_PATTERN.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        logger.debug("Fehler beim Parsen des Apollo-State JSON.")
+        return None
+
+def extract_profile_uuid(html, apollo_state=None):
+    """
+    Versucht, die Kununu Profil-UUID aus dem rohen HTML einer Übersichtsseite zu extrahieren.
+    Oft im Apollo-State (<script data-testid="apollo-state">).
+
+    Args:
+        html (bytes): Roher HTML-Inhalt der Übersichtsseite.
+        apollo_state (dict, optional): Bereits extrahierter Apollo-State.
+
+    Returns:
+        str or None: Die Profil-UUID oder None.
+    """
+    if not html:
+        return None
+
+    if apollo_state is None:
+        apollo_state = extract_apollo_state(html)
+    if isinstance(apollo_state, dict):
+        # Durchsuche die JSON-Struktur nach einem Schlüssel, der die Profil-UUID enthält.
+        # Dies ist spezifisch für Kununus Struktur und muss ggf. angepasst werden.
+        # Beispiel: ROOT_QUERY -> profile({"slug":"..."}) -> uuid
+        for key, value in apollo_state.get("ROOT_QUERY", {}).items():
+            if isinstance(value, dict) and "uuid" in value and "slug" in value: # Einfache Prüfung
+                profile_uuid = value.get("uuid")
+                if isinstance(profile_uuid, str) and len(profile_uuid) == 36: # UUID v4 Länge
+                    logger.debug("Profil-UUID aus Apollo-State extrahiert: %s", profile_uuid)
+                    return profile_uuid
+
     # Fallback: Suche nach Mustern im gesamten HTML (weniger zuverlässig)
     # Dieses Muster ist sehr generisch und sollte nur als letzte Möglichkeit dienen.
-    uuid_match = re.search(r'"uuid":"([a-f0-9\-]{36})"', str(soup))
+    uuid_match = PROFILE_UUID_FALLBACK_PATTERN.search(html)
     if uuid_match:
-        profile_uuid = uuid_match.group(1)
+        profile_uuid = uuid_match.group(1).decode('ascii')
         # Hier müsste man noch prüfen, ob es wirklich die *Profil*-UUID ist.
         # Fürs Erste nehmen wir an, die erste gefundene 36-stellige UUID in diesem Format ist es.
-        print(f"  DEBUG: Profil-UUID (potenziell) aus HTML-Regex extrahiert: {profile_uuid}")
+        logger.debug("Profil-UUID (potenziell) aus HTML-Regex extrahiert: %s", profile_uuid)
         return profile_uuid
-        
-    print("  DEBUG: Profil-UUID konnte nicht aus HTML extrahiert werden.")
+
+    logger.debug("Profil-UUID konnte nicht aus HTML extrahiert werden.")
     return None
 
 
-def scrape_kununu_individual_reviews_from_json(json_page_data, profil_id, conn):
+def load_overview(conn, profil_id, unternehmen_name, profil_uebersicht_url):
     """
-    Verarbeitet eine Seite mit Bewertungsdaten im JSON-Format und speichert sie.
+    Ruft die Übersichtsseite ab und speichert die darin gefundene Profil-UUID samt Slug und Ländercode.
+
+    Returns:
+        tuple: (gesamtdurchschnitt, anzahl_bewertungen, identifiers); identifiers ist None, wenn keine
+        UUID gefunden wurde.
+    """
+    return process_overview_html(conn, profil_id, unternehmen_name, profil_uebersicht_url,
+                                 fetch_overview_html(profil_uebersicht_url))
+
+def process_overview_html(conn, profil_id, unternehmen_name, profil_uebersicht_url, html_uebersicht):
+    """Wertet eine bereits abgerufene Übersichtsseite aus (wie load_overview, z.B. für async_engine)."""
+    if not html_uebersicht:
+        return None, None, None
+    # Kein vollständiger DOM-Baum: nur die Bewertungs-<span>-Elemente parsen, UUID direkt aus den Rohbytes
+    with metrics.PARSE_SECONDS.time(plattform='kununu', seite='uebersicht'):
+        gesamtdurchschnitt, anzahl_bewertungen = scrape_kununu_overview_data(parse_overview_html(html_uebersicht), profil_uebersicht_url)
+        # Die recommendationRate ist nicht direkt auf der HTML-Übersichtsseite, sondern in der JSON-API.
+        profile_uuid = extract_profile_uuid(html_uebersicht) # UUID aus HTML extrahieren
+    if not profile_uuid:
+        return gesamtdurchschnitt, anzahl_bewertungen, None
+    slug, country_code = slug_and_country_from_url(profil_uebersicht_url, unternehmen_name)
+    save_profile_identifiers(conn, profil_id, profile_uuid, slug, country_code)
+    return gesamtdurchschnitt, anzahl_bewertungen, {'profile_uuid': profile_uuid, 'slug': slug, 'country_code': country_code}
+
+
+def parse_kununu_review(review_data):
+    """
+    Wandelt eine einzelne Bewertung aus der Kununu-JSON-API in ein Dict mit den Spalten der
+    Tabelle bewertungen (plus 'faktoren') um.
+
+    Args:
+        review_data (dict): Eine Bewertung aus json_page_data['reviews'].
+
+    Returns:
+        dict or None: Die normalisierte Bewertung, oder None bei unvollständigen Kerndaten.
+    """
+    gesammelte_faktoren = []
+    full_review_text_parts = []
+
+    bewertung_unique_id = review_data.get('uuid')
+    titel = review_data.get('title')
+    sterne = review_data.get('score') # Ist bereits eine Zahl
+    datum_iso = review_data.get('createdAt')
+
+    is_former_employee_json_val = review_data.get('former')
+    # Ein ehemaliger Mitarbeiter wird durch ein Objekt im 'former'-Feld signalisiert (z.B. {"since": ...}).
+    # null oder boolean false bedeuten aktueller Mitarbeiter.
+    if isinstance(is_former_employee_json_val, dict):
+        is_former_employee = True
+    else: # 'former' ist null, also kein ehemaliger Mitarbeiter
+        is_former_employee = False
+
+    logger.debug("Verarbeite Bewertung (JSON): UUID=%s, Titel='%s'", bewertung_unique_id, titel)
+
+    for text_item in review_data.get('texts', []):
+        text_id = text_item.get('id', 'unknown').capitalize() # z.B. Positive, Negative, Suggestion
+        text_content = text_item.get('text')
+        if text_content:
+            full_review_text_parts.append(f"{text_id}: {text_content}")
+
+    full_review_text = "\n\n".join(full_review_text_parts)
+
+    company_info = review_data.get('company', {})
+    location_info = company_info.get('location', {})
+
+    for rating_item in review_data.get('ratings', []):
+        faktor_name = rating_item.get('id') # z.B. "atmosphere", "image"
+        faktor_sterne_wert = rating_item.get('score') # Ist bereits eine Zahl
+
+        if faktor_name and faktor_sterne_wert is not None:
+            # Stelle sicher, dass faktor_sterne_wert ein Float ist, falls es als String kommt (sollte aber Zahl sein)
+            try:
+                gesammelte_faktoren.append({"name": faktor_name, "sterne": float(faktor_sterne_wert)})
+            except (ValueError, TypeError):
+                logger.warning("Ungültiger Sternewert '%s' für Faktor '%s'.", faktor_sterne_wert, faktor_name)
+
+    if not (titel and sterne is not None and datum_iso and bewertung_unique_id):
+        gruende = [grund for fehlt, grund in ((not titel, "Titel fehlt"), (sterne is None, "Gesamtsterne fehlen"),
+                                              (not datum_iso, "Datum fehlt"), (not bewertung_unique_id, "Bewertungs-ID fehlt"))
+                   if fehlt]
+        logger.warning("Unvollständige Kerndaten für Bewertung (Titel: %s), wird übersprungen: %s", titel or 'N/A', ", ".join(gruende))
+        return None
+
+    if not full_review_text:
+        logger.debug("Bewertung '%s...' (Kununu-ID: %s) hat keinen beschreibenden Text.", titel[:30], bewertung_unique_id)
+
+    return {
+        'platform_review_id': bewertung_unique_id,
+        'sterne': sterne,
+        'titel': titel,
+        'text': full_review_text,
+        'datum': datum_iso,
+        'review_type': review_data.get('type'),
+        'is_recommended': review_data.get('recommended'),
+        # Zusätzliche Meta-Daten des Bewerters/der Bewertung
+        'reviewer_position': review_data.get('position'),
+        'reviewer_department': review_data.get('department'),
+        'reviewed_entity_name': company_info.get('name'),
+        'reviewed_entity_uuid': company_info.get('uuid'),
+        'is_former_employee': is_former_employee,
+        'platform_data_updated_at': review_data.get('updatedAt'),
+        'reviewer_city': location_info.get('city'),
+        'reviewer_state': location_info.get('state'),
+        'apprenticeship_job_title': review_data.get('apprenticeshipJob'),
+        'faktoren': gesammelte_faktoren,
+    }
+
+def scrape_kununu_individual_reviews_from_json(json_page_data, profil_id, conn, stats=None, checkpoint=None, seite=None):
+    """
+    Verarbeitet eine Seite mit Bewertungsdaten im JSON-Format und speichert sie
+    gesammelt in einer Transaktion (siehe upsert_kununu_reviews_bulk).
 
     Args:
         json_page_data (dict): Die geparsten JSON-Daten einer Bewertungsseite.
         profil_id (int): ID des Unternehmensprofils.
         conn: SQLite-Datenbankverbindung.
+        stats (dict, optional): Wird mit den Zählern {"neu", "geaendert", "unveraendert"} und "fehlgeschlagen"
+            der Seite befüllt (siehe upsert_kununu_reviews_bulk).
+        checkpoint (ScrapeCheckpoint, optional): Checkpoint des Durchlaufs, wird mit der Seite geschrieben.
+        seite (int, optional): Nummer der Seite.
+
+    Returns:
+        list: Kununu UUIDs aller Bewertungen auf der Seite.
     """
     if not json_page_data or 'reviews' not in json_page_data:
-        print("Keine gültigen JSON-Bewertungsdaten oder 'reviews'-Schlüssel nicht gefunden.")
+        logger.warning("Keine gültigen JSON-Bewertungsdaten oder 'reviews'-Schlüssel nicht gefunden.")
         return [] # Leere Liste zurückgeben, wenn keine Daten vorhanden sind
 
     reviews = json_page_data.get('reviews', [])
-    print(f"Verarbeite {len(reviews)} Bewertungen von der aktuellen JSON-Seite.")
-    
-    seen_review_uuids_on_page = []
-
-    for review_data in reviews:
-        titel = None
-        sterne = None
-        datum_iso = None
-        bewertung_unique_id = None
-        is_former_employee = None
-        updated_at_kununu_api = None
-        review_type = None
-        is_recommended = None
-        reviewer_position = None
-        reviewer_department = None
-        reviewed_entity_name = None
-        reviewed_entity_uuid = None
-        reviewer_city = None
-        reviewer_state = None
-        apprenticeship_job_title = None
-        gesammelte_faktoren = []
-        full_review_text_parts = []
-
-        bewertung_unique_id = review_data.get('uuid')
-        titel = review_data.get('title')
-        sterne = review_data.get('score') # Ist bereits eine Zahl
-        datum_iso = review_data.get('createdAt')
-        review_type = review_data.get('type')
-        is_recommended = review_data.get('recommended')
-
-        is_former_employee_json_val = review_data.get('former')
-        # Ein ehemaliger Mitarbeiter wird durch ein Objekt im 'former'-Feld signalisiert (z.B. {"since": ...}).
-        # null oder boolean false bedeuten aktueller Mitarbeiter.
-        if isinstance(is_former_employee_json_val, dict):
-            is_former_employee = True
-        else: # 'former' ist null, also kein ehemaliger Mitarbeiter
-            is_former_employee = False
-        updated_at_kununu_api = review_data.get('updatedAt')
-
-        if bewertung_unique_id:
-            seen_review_uuids_on_page.append(bewertung_unique_id)
-            
-        print(f"\n--- Verarbeite Bewertung (JSON): UUID={bewertung_unique_id}, Titel='{titel}' ---")
-
-        for text_item in review_data.get('texts', []):
-            text_id = text_item.get('id', 'unknown').capitalize() # z.B. Positive, Negative, Suggestion
-            text_content = text_item.get('text')
-            if text_content:
-                full_review_text_parts.append(f"{text_id}: {text_content}")
-        
-        full_review_text = "\n\n".join(full_review_text_parts)
+    logger.debug("Verarbeite %s Bewertungen von der aktuellen JSON-Seite.", len(reviews))
 
-        # Zusätzliche Meta-Daten des Bewerters/der Bewertung
-        reviewer_position = review_data.get('position')
-        reviewer_department = review_data.get('department')
-        apprenticeship_job_title = review_data.get('apprenticeshipJob')
+    metrics.REVIEWS_PER_PAGE.observe(len(reviews), plattform='kununu')
+    seen_review_uuids_on_page = [review_data.get('uuid') for review_data in reviews if review_data.get('uuid')]
+    with metrics.PARSE_SECONDS.time(plattform='kununu', seite='bewertungen'):
+        parsed_reviews = [parsed for parsed in (parse_kununu_review(review_data) for review_data in reviews) if parsed]
+    counts = upsert_kununu_reviews_bulk(conn, profil_id, parsed_reviews, checkpoint=checkpoint, seite=seite)
+    if stats is not None:
+        stats.update(counts)
 
-        company_info = review_data.get('company', {})
-        reviewed_entity_name = company_info.get('name')
-        reviewed_entity_uuid = company_info.get('uuid')
-        
-        location_info = company_info.get('location', {})
-        reviewer_city = location_info.get('city')
-        reviewer_state = location_info.get('state')
-
-        for rating_item in review_data.get('ratings', []):
-            faktor_name = rating_item.get('id') # z.B. "atmosphere", "image"
-            faktor_sterne_wert = rating_item.get('score') # Ist bereits eine Zahl
-
-            if faktor_name and faktor_sterne_wert is not None:
-                # Stelle sicher, dass faktor_sterne_wert ein Float ist, falls es als String kommt (sollte aber Zahl sein)
-                try:
-                    gesammelte_faktoren.append({"name": faktor_name, "sterne": float(faktor_sterne_wert)})
-                except (ValueError, TypeError):
-                    print(f"Warnung: Ungültiger Sternewert '{faktor_sterne_wert}' für Faktor '{faktor_name}'.")
-
-        if titel and sterne is not None and datum_iso and bewertung_unique_id:
-            existing_review = get_existing_review_data(conn, profil_id, bewertung_unique_id)
-
-            if existing_review:
-                # Bewertung existiert bereits, prüfe auf Änderungen
-                print(f"  DEBUG: Bewertung {bewertung_unique_id} existiert in DB (ID: {existing_review['db_id']}). API updatedAt: {updated_at_kununu_api}, DB updatedAt: {existing_review['platform_data_updated_at_db']}")
-                if updated_at_kununu_api and (existing_review['platform_data_updated_at_db'] is None or updated_at_kununu_api > existing_review['platform_data_updated_at_db'] or existing_review['is_deleted_db']):
-                    print(f"  -> Bewertung {bewertung_unique_id} wurde geändert oder war gelöscht. Aktualisiere...")
-                    # Faktoren der alten Bewertung löschen, bevor neue hinzugefügt werden
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM bewertung_faktoren WHERE bewertung_id = ?", (existing_review['db_id'],))
-                    conn.commit()
-                    
-                    update_successful = update_bewertung(
-                        conn, existing_review['db_id'], sterne, titel, full_review_text, datum_iso,
-                        review_type, is_recommended, reviewer_position, reviewer_department,
-                        reviewed_entity_name, reviewed_entity_uuid, is_former_employee, updated_at_kununu_api,
-                        reviewer_city, reviewer_state, apprenticeship_job_title
-                    )
-                    if update_successful:
-                        for faktor_data in gesammelte_faktoren:
-                            add_bewertung_faktor(conn, existing_review['db_id'], faktor_data["name"], faktor_data["sterne"])
-                else:
-                    # Keine Änderung, nur last_seen aktualisieren
-                    cursor = conn.cursor()
-                    cursor.execute("UPDATE bewertungen SET last_seen_scraping_datum = ?, is_deleted = 0 WHERE id = ?", (datetime.now(), existing_review['db_id']))
-                    conn.commit()
-                    print(f"  -> Bewertung {bewertung_unique_id} unverändert. 'last_seen' aktualisiert.")
-            else:
-                # Neue Bewertung
-                bewertung_id_in_db = add_bewertung(
-                    conn=conn, profil_id=profil_id, sterne=sterne, titel=titel,
-                    text=full_review_text, datum_str=datum_iso, platform_review_id=bewertung_unique_id,
-                    review_type=review_type,
-                    is_recommended=is_recommended,
-                    reviewer_position=reviewer_position,
-                    reviewer_department=reviewer_department,
-                    reviewed_entity_name=reviewed_entity_name,
-                    reviewed_entity_uuid=reviewed_entity_uuid,
-                    is_former_employee=is_former_employee,
-                    updated_at_kununu=updated_at_kununu_api, # This should be platform_data_updated_at
-                    reviewer_city=reviewer_city,
-                    reviewer_state=reviewer_state,
-                    apprenticeship_job_title=apprenticeship_job_title
-                )
-                if bewertung_id_in_db:
-                    for faktor_data in gesammelte_faktoren:
-                        add_bewertung_faktor(conn, bewertung_id_in_db, faktor_data["name"], faktor_data["sterne"])
-                if not full_review_text and bewertung_id_in_db:
-                    print(f"Hinweis: Bewertung '{titel[:30]}...' (DB-ID: {bewertung_id_in_db}, Kununu-ID: {bewertung_unique_id}) wurde ohne beschreibenden Text gespeichert.")
-        else:
-            print(f"FEHLER: Unvollständige Kerndaten für Bewertung (Titel: {titel or 'N/A'}) oder ID fehlt, wird übersprungen:")
-            if not titel: print("  - Grund: Titel fehlt")
-            if sterne is None: print(f"  - Grund: Gesamtsterne fehlen")
-            if not datum_iso: print("  - Grund: Datum fehlt")
-            if not bewertung_unique_id: print("  - Grund: Eindeutige Bewertungs-ID (aus JSON) fehlt (Finale Prüfung)")
-    
     return seen_review_uuids_on_page
 
 # --- Haupt-Ausführungslogik ---
 
-def main_scraper(unternehmen_name, profil_uebersicht_url, profil_kommentare_url):
+def main_scraper(unternehmen_name, profil_uebersicht_url, profil_kommentare_url, incremental=None, progress_callback=None):
     """
     Hauptfunktion für den Kununu-Scraping-Prozess eines Unternehmens.
     Holt Übersichtsdaten und einzelne Bewertungen.
 
+    Die Profil-UUID wird nach dem ersten Abruf der Übersichtsseite gespeichert. Danach geht ein Lauf
+    direkt an die JSON-API; die Übersichtsseite (Gesamtdurchschnitt, Anzahl Bewertungen und damit ein
+    neuer Eintrag in profil_verlauf) wird nur alle KUNUNU_OVERVIEW_REFRESH_INTERVAL_HOURS Stunden geladen.
+
     Args:
         unternehmen_name (str): Name des Unternehmens.
         profil_uebersicht_url (str): URL zur Kununu-Übersichtsseite.
         profil_kommentare_url (str): URL zur Kununu-Kommentarseite.
+        incremental (bool, optional): True bricht die Paginierung (sort=newest) ab, sobald eine Seite
+            nur noch unveränderte Bewertungen enthält. False durchläuft immer alle Seiten und markiert
+            danach nicht mehr gefundene Bewertungen als gelöscht. None (Standard) arbeitet inkrementell,
+            außer der letzte vollständige Durchlauf ist älter als KUNUNU_FULL_SWEEP_INTERVAL_DAYS.
+        progress_callback (callable, optional): Wird nach jeder Seite mit (seiten_fertig, seiten_gesamt) aufgerufen.
     """
     conn = None
     try:
@@ -565,66 +750,64 @@ def main_scraper(unternehmen_name, profil_uebersicht_url, profil_kommentare_url)
         plattform_id = get_plattform_id(conn, "Kununu")
 
         if not unternehmen_id or not plattform_id:
-            print(f"Fehler: Unternehmen '{unternehmen_name}' oder Plattform 'Kununu' konnte nicht initialisiert werden.")
+            logger.error("Unternehmen '%s' oder Plattform 'Kununu' konnte nicht initialisiert werden.", unternehmen_name)
             return
 
         profil_id = get_or_create_profil(conn, unternehmen_id, plattform_id, profil_uebersicht_url)
         if not profil_id:
-            print(f"Fehler: Unternehmensprofil für URL '{profil_uebersicht_url}' konnte nicht initialisiert werden.")
+            logger.error("Unternehmensprofil für URL '%s' konnte nicht initialisiert werden.", profil_uebersicht_url)
             return
         
-        print(f"Verarbeite Profil ID: {profil_id} für {unternehmen_name} (Übersicht: {profil_uebersicht_url}, Kommentare: {profil_kommentare_url})")
+        logger.info("Verarbeite Profil ID: %s für %s (Übersicht: %s, Kommentare: %s)", profil_id, unternehmen_name, profil_uebersicht_url, profil_kommentare_url)
 
-        # 1. Übersichtsdaten holen und Profil-UUID extrahieren
-        soup_uebersicht = fetch_and_parse_url(profil_uebersicht_url)
+        # 1. Profil-UUID aus der Datenbank; die Übersichtsseite nur abrufen, wenn keine UUID gespeichert
+        #    ist oder Gesamtdurchschnitt und Anzahl Bewertungen wieder fällig sind
         gesamtdurchschnitt, anzahl_bewertungen = None, None
-        recommendation_rate_overview = None # Für die Empfehlungsrate von der Übersichtsseite/ersten JSON-Seite
-        profile_uuid = None
-        
-        if soup_uebersicht:
-            gesamtdurchschnitt, anzahl_bewertungen = scrape_kununu_overview_data(soup_uebersicht, profil_uebersicht_url)
-            # Die recommendationRate ist nicht direkt auf der HTML-Übersichtsseite, sondern in der JSON-API.
-            profile_uuid = extract_profile_uuid_from_html(soup_uebersicht) # UUID aus HTML extrahieren
-
-        if gesamtdurchschnitt is not None and anzahl_bewertungen is not None:
-            # Wir übergeben recommendation_rate_overview hier noch als None, da wir es erst aus der JSON holen.
-            # Alternativ: add_profil_verlauf erst nach dem ersten JSON-Abruf aufrufen.
-            pass # add_profil_verlauf wird nach dem ersten JSON-Abruf aufgerufen
+        recommendation_rate_overview = None # Für die Empfehlungsrate von der ersten JSON-Seite
+        identifiers = get_profile_identifiers(conn, profil_id)
+        uebersicht_geladen = False
+
+        if is_overview_refresh_due(identifiers):
+            gesamtdurchschnitt, anzahl_bewertungen, neue_identifiers = load_overview(conn, profil_id, unternehmen_name, profil_uebersicht_url)
+            identifiers = neue_identifiers or identifiers
+            uebersicht_geladen = True
+            if gesamtdurchschnitt is None or anzahl_bewertungen is None:
+                logger.warning("Keine vollständigen Übersichtsdaten von %s gescraped. Nichts zum Profilverlauf hinzugefügt.", profil_uebersicht_url)
         else:
-            print(f"Keine vollständigen Übersichtsdaten von {profil_uebersicht_url} gescraped. Nichts zum Profilverlauf hinzugefügt.")
-        
+            logger.info("Profil-UUID %s aus der Datenbank, Übersichtsseite erst nach %s h wieder fällig.", identifiers['profile_uuid'], KUNUNU_OVERVIEW_REFRESH_INTERVAL_HOURS)
+
         # 2. Einzelne Bewertungen über die JSON-API holen, falls UUID vorhanden
-        if not profile_uuid:
-            print(f"FEHLER: Profil-UUID konnte für {unternehmen_name} nicht extrahiert werden. Überspringe das Scrapen einzelner Bewertungen via API.")
-            # Fallback: Versuche, die alte HTML-basierte Methode für Kommentare zu nutzen, falls gewünscht
-            # print(f"\nVersuche, einzelne Bewertungen von {profil_kommentare_url} (HTML) zu laden...")
-            # soup_kommentare_html = fetch_and_parse_url(profil_kommentare_url)
-            # if soup_kommentare_html:
-            #     scrape_kununu_individual_reviews_from_html(soup_kommentare_html, profil_id, conn) # Alte Funktion umbenennen
-            # else:
-            #     print(f"Konnte die Kommentarseite {profil_kommentare_url} (HTML) nicht laden. Überspringe Einzelbewertungen.")
+        if not identifiers:
+            logger.error("Profil-UUID konnte für %s nicht extrahiert werden. Überspringe das Scrapen einzelner Bewertungen via API.", unternehmen_name)
             return # Beende hier, wenn keine UUID für API-Abruf da ist
 
-        # Extrahiere Slug und Ländercode aus der Übersichts-URL für die API-URL
-        # Beispiel: https://www.kununu.com/de/deutsche-bahn -> slug='deutsche-bahn', country_code='de'
-        url_parts = profil_uebersicht_url.split('/')
-        slug = url_parts[-1] if url_parts else unternehmen_name.lower().replace(' ', '-') # Fallback für Slug
-        country_code = "de" # Standard, oder aus URL extrahieren, falls variabler
-        if len(url_parts) > 3 and len(url_parts[-2]) == 2 : # Einfache Prüfung für Ländercode
-            country_code = url_parts[-2]
+        if incremental is None:
+            # Ein abgebrochener vollständiger Durchlauf wird fortgesetzt, statt inkrementell zu arbeiten
+            incremental = not is_full_sweep_due(conn, profil_id) and not scrape_checkpoints.load_resumable(conn, profil_id)
+        logger.info("Modus: %s", 'inkrementell' if incremental else 'vollständiger Durchlauf')
+
+        # Nur vollständige Durchläufe bekommen einen Checkpoint; inkrementelle enden ohnehin nach wenigen Seiten
+        checkpoint = None if incremental else scrape_checkpoints.start_or_resume(conn, profil_id, plattform_id)
+        if checkpoint and checkpoint.fortgesetzt:
+            logger.info("Setze abgebrochenen Durchlauf %s nach Seite %s/%s fort.", checkpoint.lauf_id, checkpoint.letzte_seite, checkpoint.seiten_gesamt)
+        lauf_start = checkpoint.lauf_start if checkpoint else datetime.now()
 
         current_page = 1
         total_pages = 1 # Wird nach dem ersten API-Aufruf aktualisiert
-        all_seen_review_uuids_this_scrape = []
+        sweep_complete = False
 
         while current_page <= total_pages:
-            # JSON API URL konstruieren
-            # Basis-URL: https://www.kununu.com/middlewares/profiles/{countryCode}/{slug}/{profileUuid}/reviews
-            # Parameter: ?fetchFactorScores=0&reviewType=employees&sort=newest&page={page}
-            # urlParams ist optional und wird hier durch sort=newest abgedeckt
-            json_api_url = f"https://www.kununu.com/middlewares/profiles/{country_code}/{slug}/{profile_uuid}/reviews?fetchFactorScores=1&reviewType=employees&sort=newest&page={current_page}"
-            
-            json_data = fetch_json_data(json_api_url)
+            json_data = fetch_json_data(build_reviews_api_url(
+                identifiers['country_code'], identifiers['slug'], identifiers['profile_uuid'], current_page))
+
+            if not json_data and current_page == 1 and not uebersicht_geladen:
+                # Gespeicherte UUID/Slug evtl. veraltet (z.B. Profil umbenannt): Übersicht neu laden und erneut versuchen
+                logger.warning("Erste API-Seite mit gespeicherter Profil-UUID fehlgeschlagen. Lade Übersichtsseite neu.")
+                gesamtdurchschnitt, anzahl_bewertungen, neue_identifiers = load_overview(conn, profil_id, unternehmen_name, profil_uebersicht_url)
+                uebersicht_geladen = True
+                if neue_identifiers:
+                    identifiers = neue_identifiers
+                    continue
 
             if json_data:
                 if current_page == 1 and 'pagesCount' in json_data: # Gesamtseitenzahl vom ersten Aufruf holen
@@ -634,29 +817,58 @@ def main_scraper(unternehmen_name, profil_uebersicht_url, profil_kommentare_url)
                     if gesamtdurchschnitt is not None and anzahl_bewertungen is not None:
                          add_profil_verlauf(conn, profil_id, gesamtdurchschnitt, anzahl_bewertungen, recommendation_rate_overview)
                     total_pages = json_data['pagesCount']
-                    print(f"Insgesamt {total_pages} Seiten mit Bewertungen gefunden.")
-                scrape_kununu_individual_reviews_from_json(json_data, profil_id, conn)
-                current_page += 1
+                    logger.info("Insgesamt %s Seiten mit Bewertungen gefunden.", total_pages)
+                    if checkpoint:
+                        checkpoint.seiten_gesamt = total_pages
+                page_stats = {}
+                scrape_kununu_individual_reviews_from_json(json_data, profil_id, conn, stats=page_stats,
+                                                           checkpoint=checkpoint, seite=current_page)
+                if page_stats.get("fehlgeschlagen"):
+                    # Die Bewertungen der Seite haben kein neues last_seen: ohne Abbruch würden sie als gelöscht
+                    # markiert. Der Checkpoint steht noch vor der Seite, ein Folgelauf setzt hier fort.
+                    logger.error("Seite %s konnte nicht gespeichert werden. Breche Paginierung ab.", current_page)
+                    break
+                if incremental and page_stats.get("unveraendert") and not page_stats.get("neu") and not page_stats.get("geaendert"):
+                    logger.info("Seite %s enthält nur bekannte, unveränderte Bewertungen. Inkrementeller Durchlauf beendet.", current_page)
+                    break
+                if progress_callback:
+                    progress_callback(current_page, total_pages)
+                if current_page == 1 and checkpoint and checkpoint.fortgesetzt:
+                    # Seite 1 wird immer geholt (Seitenzahl, Empfehlungsrate), danach geht es am Checkpoint weiter
+                    current_page = checkpoint.resume_page
+                else:
+                    current_page += 1
             else:
-                print(f"Keine JSON-Daten für Seite {current_page} erhalten. Breche Paginierung ab.")
+                logger.warning("Keine JSON-Daten für Seite %s erhalten. Breche Paginierung ab.", current_page)
                 break # Paginierung abbrechen, wenn eine Seite fehlschlägt
+        else:
+            sweep_complete = True
+
+        # Löschungen lassen sich nur nach einem vollständigen Durchlauf aller Seiten sicher erkennen
+        if sweep_complete:
+            mark_unseen_reviews_deleted(conn, profil_id, lauf_start)
+            record_full_sweep(conn, profil_id)
+            if checkpoint:
+                scrape_checkpoints.finish(conn, checkpoint)
 
     except Exception as e:
-        print(f"Ein Fehler ist im Hauptprozess aufgetreten: {e}")
+        logger.exception("Ein Fehler ist im Hauptprozess aufgetreten: %s", e)
     finally:
+        logger.info("HTTP-Statistik:\n%s", http_client.format_fetch_stats())
         if conn:
             conn.close()
-            print("Datenbankverbindung geschlossen.")
+            logger.debug("Datenbankverbindung geschlossen.")
 
 if __name__ == '__main__':
     # WICHTIG: Stelle sicher, dass database_setup.py vorher einmal ausgeführt wurde!
     # from database_setup import setup_database
     # setup_database() # Nur einmalig oder bei Bedarf ausführen
 
+    metrics.configure_logging()
     test_unternehmen_name = "Zentek"
     test_profil_uebersicht_url = "https://www.kununu.com/de/sap"
     test_profil_kommentare_url = "https://www.kununu.com/de/sap/kommentare?sort=newest" 
 
-    print(f"Starte Kununu-Scraper für: {test_unternehmen_name}")
+    logger.info("Starte Kununu-Scraper für: %s", test_unternehmen_name)
     main_scraper(test_unternehmen_name, test_profil_uebersicht_url, test_profil_kommentare_url)
-    print("Kununu-Scraper-Durchlauf beendet.")
\ No newline at end of file
+    logger.info("Kununu-Scraper-Durchlauf beendet.")
\ No newline at end of file
@@ -0,0 +1,197 @@
+# metrics.py
+"""
+Zähler und Histogramme für Scraper und Web UI sowie die Log-Konfiguration.
+
+Die Metriken liegen prozessweit in einer Registry und werden von web_ui unter /metrics im
+Prometheus-Textformat ausgegeben. Scrapes, die die Web UI über die Job-Warteschlange startet,
+laufen im selben Prozess und tauchen dort direkt auf; der Mehrprozess-Runner gibt am Ende seine
+eigene Zusammenfassung aus.
+
+    with metrics.PARSE_SECONDS.time(plattform='kununu'):
+        ...
+    metrics.REVIEWS_PER_PAGE.observe(len(reviews), plattform='kununu')
+
+Log-Level: SCRAPER_LOG_LEVEL (z.B. DEBUG, INFO, WARNING) bzw. --log-level der Kommandozeilen-Tools.
+Pro Bewertung wird nur auf DEBUG geloggt; mit WARNING laufen die Scraper bis auf Fehler still.
+"""
+import bisect
+import contextlib
+import logging
+import os
+import threading
+import time
+
+DEFAULT_LOG_LEVEL = os.environ.get('SCRAPER_LOG_LEVEL', 'INFO')
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+# Sekunden; deckt Cache-Treffer (<1 ms) bis zu langsamen Seitenabrufen (Timeout 20 s) ab
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def configure_logging(level=None):
+    """Richtet das Logging für Kommandozeilen-Tools und die Web UI ein (einmal pro Prozess)."""
+    level = (level or DEFAULT_LOG_LEVEL).upper()
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    logging.getLogger().setLevel(level)
+    logging.getLogger('urllib3').setLevel(max(logging.getLogger().level, logging.WARNING))
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = [*zip(labelnames, labelvalues), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Gemeinsame Basis: Name, Hilfetext, Label-Namen und ein Lock für alle Label-Kombinationen."""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: Labels {sorted(labels)} passen nicht zu {list(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Zähler pro Bucket (nicht kumuliert), Summe, Anzahl
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Misst die Dauer des with-Blocks in Sekunden (auch wenn er mit einer Exception endet)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """Gibt (Anzahl, Summe) für eine Label-Kombination zurück."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return (entry[2], entry[1]) if entry else (0, 0.0)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for upper_bound, bucket_count in zip((*self.buckets, float('inf')), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, extra=(('le', _format_value(upper_bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Alle Metriken im Prometheus-Textformat (Version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            metric.reset()
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# --- Metriken der Scraper ---
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    'scraper_fetch_seconds', "Dauer der HTTP-Abrufe (ohne Cache-Treffer)", ('host',)))
+FETCH_TOTAL = REGISTRY.register(Counter(
+    'scraper_fetch_total', "HTTP-Abrufe nach Ergebnis (ok, fehler, nicht_geaendert, cache)", ('host', 'ergebnis')))
+PARSE_SECONDS = REGISTRY.register(Histogram(
+    'scraper_parse_seconds', "Parse-Zeit pro Seite (Bewertungsseite bzw. Übersichtsseite)", ('plattform', 'seite')))
+DB_WRITE_SECONDS = REGISTRY.register(Histogram(
+    'scraper_db_write_seconds', "Dauer der Schreibtransaktion pro Bewertungsseite", ('plattform',)))
+REVIEWS_PER_PAGE = REGISTRY.register(Histogram(
+    'scraper_reviews_per_page', "Bewertungen pro abgerufener Seite", ('plattform',),
+    buckets=(0, 1, 5, 10, 15, 20, 25, 50, 100)))
+REVIEWS_TOTAL = REGISTRY.register(Counter(
+    'scraper_reviews_total', "Geschriebene Bewertungen nach Ergebnis (neu, geaendert, unveraendert)", ('plattform', 'ergebnis')))
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'scraper_rate_limit_wait_seconds', "Wartezeit im Rate-Limiter vor einer Anfrage", ('plattform',),
+    buckets=(0, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)))
+PROXY_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    'scraper_proxy_requests_total', "Anfragen über den Proxy-Pool nach Ergebnis (ok, blockiert, fehler)", ('proxy', 'ergebnis')))
+PROXY_QUARANTINE_TOTAL = REGISTRY.register(Counter(
+    'scraper_proxy_quarantine_total', "Quarantänen pro Proxy (nach 403/429, Verbindungsfehlern oder fehlgeschlagener Prüfung)", ('proxy',)))
+
+# --- Metriken der Web UI ---
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'webui_request_seconds', "Dauer der Web-UI-Anfragen pro Route", ('route', 'methode', 'status')))
+
+def record_page_counts(plattform, counts):
+    """Zählt das Ergebnis einer gespeicherten Bewertungsseite (counts wie von den upsert-Funktionen)."""
+    for ergebnis in ('neu', 'geaendert', 'unveraendert'):
+        if counts.get(ergebnis):
+            REVIEWS_TOTAL.inc(counts[ergebnis], plattform=plattform, ergebnis=ergebnis)
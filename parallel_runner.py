@@ -0,0 +1,372 @@
+# parallel_runner.py
+"""
+Mehrprozess-Runner für den Massen-Rescrape gespeicherter Profile.
+
+Die Profile werden auf einen Pool von Worker-Prozessen verteilt. Jeder Worker ruft die Seiten eines
+Profils ab, dekodiert das JSON und normalisiert die Bewertungen (parse_kununu_review bzw.
+parse_trustpilot_review). Diese CPU-lastigen Schritte laufen damit auf mehreren Kernen statt
+nacheinander unter dem GIL eines Prozesses. An den Hauptprozess geht pro Seite nur die Liste der
+normalisierten Bewertungen (statt der rohen, bei Trustpilot mehrere hundert KB großen Seite).
+
+Der Hauptprozess ist der einzige Schreiber: Er besitzt die SQLite-Verbindung, schreibt jede Seite
+samt Checkpoint in einer Transaktion und führt nach vollständigen Durchläufen die Löscherkennung aus.
+Die Worker öffnen die Datenbank nur lesend, um im inkrementellen Modus das Ende der neuen
+Bewertungen zu erkennen.
+
+Aufruf (z.B. per cron, statt scheduler.py):
+    python parallel_runner.py                         # alle Profile, ein Worker pro CPU-Kern
+    python parallel_runner.py --plattform Trustpilot --limit 20 --workers 8
+    python parallel_runner.py --voll                  # vollständige Durchläufe erzwingen
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import http_client
+import kununu_scraper
+import metrics
+import proxy_pool
+import scrape_checkpoints
+import trustpilot_scraper
+from db import DB_NAME, connect
+from scheduler import get_profiles_by_priority
+
+logger = logging.getLogger(__name__)
+
+# Worker-Prozesse werden per "spawn" gestartet: keine geerbten SQLite-Verbindungen oder HTTP-Sessions
+MP_CONTEXT = 'spawn'
+WRITER_POLL_SECONDS = 1.0
+
+# --- Worker-Prozesse ---
+
+_message_queue = None
+_db_name = DB_NAME
+
+def _init_worker(message_queue, db_name, worker_count, kununu_base_url, trustpilot_max_requests, log_level):
+    """Initialisiert einen Worker-Prozess (ProcessPoolExecutor initializer)."""
+    global _message_queue, _db_name
+    metrics.configure_logging(log_level) # spawn: die Log-Konfiguration des Hauptprozesses wird nicht geerbt
+    _message_queue = message_queue
+    _db_name = db_name
+    if kununu_base_url:
+        kununu_scraper.KUNUNU_BASE_URL = kununu_base_url
+    # Jeder Prozess hat seinen eigenen Token-Bucket; zusammen dürfen sie das Trustpilot-Limit nicht überschreiten
+    trustpilot_scraper.trustpilot_rate_limiter = trustpilot_scraper.TokenBucket(
+        trustpilot_max_requests / worker_count, trustpilot_scraper.TIMEFRAME_SECONDS,
+        capacity=max(1, trustpilot_scraper.RATE_LIMIT_BURST // worker_count))
+    # Ebenso das Budget pro Proxy: alle Worker teilen sich dieselben Proxys
+    proxy_urls = proxy_pool.load_proxy_urls()
+    if proxy_urls:
+        http_client.configure_proxy_pool(proxy_pool.ProxyPool(
+            proxy_urls, max_requests=proxy_pool.PROXY_MAX_REQUESTS / worker_count, user_agent=http_client.USER_AGENT))
+
+def _send(art, profil_id, **daten):
+    _message_queue.put((art, profil_id, daten))
+
+def is_page_unchanged(conn, profil_id, parsed_reviews, get_existing_bulk):
+    """
+    Prüft lesend, ob eine Seite nur bekannte, unveränderte Bewertungen enthält (gleiche Regel wie die
+    Upserts der Scraper). Noch nicht geschriebene Seiten desselben Laufs zählen als neu, der Worker
+    läuft im Zweifel also eine Seite weiter.
+    """
+    if not parsed_reviews:
+        return False
+    existing = get_existing_bulk(conn, profil_id, [review['platform_review_id'] for review in parsed_reviews])
+    for review in parsed_reviews:
+        existing_review = existing.get(review['platform_review_id'])
+        if not existing_review:
+            return False
+        if review['platform_data_updated_at'] and (existing_review['platform_data_updated_at_db'] is None or review['platform_data_updated_at'] > existing_review['platform_data_updated_at_db'] or existing_review['is_deleted_db']):
+            return False
+    return True
+
+def scrape_profile_worker(job):
+    """Ruft alle Seiten eines Profils ab und schickt die normalisierten Bewertungen an den Schreiber."""
+    conn = connect(_db_name)
+    try:
+        if job['plattform'] == 'Kununu':
+            _scrape_kununu_profile(conn, job)
+        else:
+            _scrape_trustpilot_profile(conn, job)
+    except Exception as e:
+        logger.exception("Worker: Fehler bei Profil ID %s: %s", job['profil_id'], e)
+        _send('fertig', job['profil_id'], sweep_complete=False, fehler=str(e))
+    finally:
+        conn.close()
+
+def _load_kununu_overview(job):
+    """Wie kununu_scraper.load_overview, speichert aber nichts (das macht der Schreiber)."""
+    html_uebersicht = kununu_scraper.fetch_overview_html(job['url'])
+    if not html_uebersicht:
+        return {}
+    gesamtdurchschnitt, anzahl_bewertungen = kununu_scraper.scrape_kununu_overview_data(
+        kununu_scraper.parse_overview_html(html_uebersicht), job['url'])
+    uebersicht = {'gesamtdurchschnitt': gesamtdurchschnitt, 'anzahl_bewertungen': anzahl_bewertungen}
+    profile_uuid = kununu_scraper.extract_profile_uuid(html_uebersicht)
+    if profile_uuid:
+        slug, country_code = kununu_scraper.slug_and_country_from_url(job['url'], job['unternehmen_name'])
+        uebersicht['identifiers'] = {'profile_uuid': profile_uuid, 'slug': slug, 'country_code': country_code}
+    return uebersicht
+
+def _scrape_kununu_profile(conn, job):
+    profil_id = job['profil_id']
+    identifiers = job['identifiers']
+    uebersicht = {}
+    uebersicht_geladen = False
+    if job['uebersicht_faellig'] or not identifiers:
+        uebersicht = _load_kununu_overview(job)
+        identifiers = uebersicht.get('identifiers') or identifiers
+        uebersicht_geladen = True
+    if not identifiers:
+        _send('fertig', profil_id, sweep_complete=False, fehler="Profil-UUID konnte nicht extrahiert werden")
+        return
+
+    current_page, total_pages = 1, 1
+    while current_page <= total_pages:
+        json_data = kununu_scraper.fetch_json_data(kununu_scraper.build_reviews_api_url(
+            identifiers['country_code'], identifiers['slug'], identifiers['profile_uuid'], current_page))
+        if not json_data and current_page == 1 and not uebersicht_geladen:
+            # Gespeicherte UUID evtl. veraltet: Übersicht neu laden und erneut versuchen
+            uebersicht = _load_kununu_overview(job)
+            uebersicht_geladen = True
+            if uebersicht.get('identifiers'):
+                identifiers = uebersicht['identifiers']
+                continue
+        if not json_data:
+            logger.warning("Keine JSON-Daten für Seite %s von Profil ID %s erhalten. Breche Paginierung ab.", current_page, profil_id)
+            break
+
+        if current_page == 1:
+            total_pages = json_data.get('pagesCount', 1)
+            _send('profil', profil_id, seiten_gesamt=total_pages,
+                  recommendation_rate=(json_data.get('recommendationRate') or {}).get('percentage'), **uebersicht)
+        parsed_reviews = [parsed for parsed in (kununu_scraper.parse_kununu_review(review_data)
+                                                for review_data in json_data.get('reviews', [])) if parsed]
+        unveraendert = job['incremental'] and is_page_unchanged(
+            conn, profil_id, parsed_reviews, kununu_scraper.get_existing_reviews_data_bulk)
+        _send('seite', profil_id, seite=current_page, seiten_gesamt=total_pages, bewertungen=parsed_reviews, checkpoint_ok=True)
+        if unveraendert:
+            break
+        if current_page == 1 and job['resume_page'] > 2:
+            current_page = job['resume_page']
+        else:
+            current_page += 1
+    else:
+        _send('fertig', profil_id, sweep_complete=True, fehler=None)
+        return
+    _send('fertig', profil_id, sweep_complete=False, fehler=None)
+
+def _scrape_trustpilot_profile(conn, job):
+    profil_id = job['profil_id']
+    api_base_url = job['api_base_url']
+    slug = job['url'].rstrip('/').split('/review/')[1].split('/')[0]
+    build_id = trustpilot_scraper.trustpilot_build_ids.get(api_base_url, slug) or trustpilot_scraper.TRUSTPILOT_JSON_BUILD_ID
+    build_id_erneuert = False
+
+    def page_json_url(page_num):
+        json_url = f"{api_base_url}/_next/data/{build_id}/review/{slug}.json"
+        return f"{json_url}?page={page_num}" if page_num > 1 else json_url
+
+    def fetch_page(page_num):
+        nonlocal build_id, build_id_erneuert
+        page_data = trustpilot_scraper.fetch_trustpilot_page_json(page_json_url(page_num))
+        if page_data is trustpilot_scraper.PAGE_NOT_FOUND and not build_id_erneuert:
+            # Einmal pro Profil: Build-ID neu ermitteln (Deployment) und die Seite erneut abrufen
+            build_id_erneuert = True
+            neue_build_id = trustpilot_scraper.trustpilot_build_ids.refresh(api_base_url, slug, build_id)
+            if neue_build_id and neue_build_id != build_id:
+                build_id = neue_build_id
+                page_data = trustpilot_scraper.fetch_trustpilot_page_json(page_json_url(page_num))
+        return page_data
+
+    initial_data = fetch_page(1)
+    if not initial_data or "businessUnit" not in initial_data.get("pageProps", {}):
+        _send('fertig', profil_id, sweep_complete=False, fehler="Ungültige oder fehlende Daten auf Seite 1")
+        return
+    business_unit = initial_data["pageProps"]["businessUnit"]
+    total_pages = initial_data["pageProps"].get("filters", {}).get("pagination", {}).get("totalPages", 1)
+    _send('profil', profil_id, seiten_gesamt=total_pages,
+          trust_score=business_unit.get("trustScore"), anzahl_bewertungen=business_unit.get("numberOfReviews"))
+
+    failed_pages, consecutive_failures = 0, 0
+    for page_num in [1, *range(job['resume_page'], total_pages + 1)]:
+        page_data = initial_data if page_num == 1 else fetch_page(page_num)
+        if not page_data or "reviews" not in page_data.get("pageProps", {}):
+            failed_pages += 1
+            consecutive_failures += 1
+            if consecutive_failures >= trustpilot_scraper.MAX_CONSECUTIVE_PAGE_FAILURES:
+                logger.error("%s Seiten in Folge fehlgeschlagen. Breche Profil ID %s ab.", consecutive_failures, profil_id)
+                break
+            continue
+        consecutive_failures = 0
+        parsed_reviews = [parsed for parsed in (trustpilot_scraper.parse_trustpilot_review(review_json)
+                                                for review_json in page_data["pageProps"]["reviews"]) if parsed]
+        unveraendert = job['incremental'] and is_page_unchanged(
+            conn, profil_id, parsed_reviews, trustpilot_scraper.get_existing_trustpilot_reviews_data_bulk)
+        # Nach einer fehlgeschlagenen Seite darf der Checkpoint nicht mehr weiterrücken
+        _send('seite', profil_id, seite=page_num, seiten_gesamt=total_pages, bewertungen=parsed_reviews,
+              checkpoint_ok=not failed_pages)
+        if unveraendert:
+            break
+    else:
+        _send('fertig', profil_id, sweep_complete=not failed_pages, fehler=None)
+        return
+    _send('fertig', profil_id, sweep_complete=False, fehler=None)
+
+# --- Schreiber (Hauptprozess) ---
+
+def prepare_job(conn, profile, incremental=None, trustpilot_base_url=trustpilot_scraper.TRUSTPILOT_BASE_URL):
+    """
+    Bereitet einen Auftrag für einen Worker vor (Modus, Checkpoint, gespeicherte Kununu-UUID).
+
+    Returns:
+        tuple: (job, checkpoint, lauf_start); checkpoint ist None bei inkrementellen Läufen.
+    """
+    profil_id = profile['profil_id']
+    plattform_id = conn.execute("SELECT plattform_id FROM unternehmens_profile WHERE id = ?", (profil_id,)).fetchone()['plattform_id']
+    job = {
+        'profil_id': profil_id,
+        'plattform': profile['plattform'],
+        'url': profile['url'],
+        'unternehmen_name': profile['unternehmen_name'],
+        'api_base_url': trustpilot_base_url,
+        'resume_page': 2,
+    }
+    if profile['plattform'] == 'Kununu':
+        job['identifiers'] = kununu_scraper.get_profile_identifiers(conn, profil_id)
+        job['uebersicht_faellig'] = kununu_scraper.is_overview_refresh_due(job['identifiers'])
+        full_sweep_due = kununu_scraper.is_full_sweep_due(conn, profil_id)
+    else:
+        full_sweep_due = trustpilot_scraper.is_full_sweep_due(conn, profil_id)
+    if incremental is None:
+        incremental = not full_sweep_due and not scrape_checkpoints.load_resumable(conn, profil_id)
+    job['incremental'] = incremental
+
+    checkpoint = None if incremental else scrape_checkpoints.start_or_resume(conn, profil_id, plattform_id)
+    if checkpoint and checkpoint.fortgesetzt:
+        job['resume_page'] = checkpoint.resume_page
+    return job, checkpoint, checkpoint.lauf_start if checkpoint else datetime.now()
+
+def _write_message(conn, jobs, art, profil_id, daten, stats):
+    job, checkpoint, lauf_start = jobs[profil_id]
+    kununu = job['plattform'] == 'Kununu'
+    if art == 'profil':
+        if checkpoint:
+            checkpoint.seiten_gesamt = daten['seiten_gesamt']
+        if kununu:
+            identifiers = daten.get('identifiers')
+            if identifiers:
+                kununu_scraper.save_profile_identifiers(conn, profil_id, identifiers['profile_uuid'], identifiers['slug'], identifiers['country_code'])
+            if daten.get('gesamtdurchschnitt') is not None and daten.get('anzahl_bewertungen') is not None:
+                kununu_scraper.add_profil_verlauf(conn, profil_id, daten['gesamtdurchschnitt'], daten['anzahl_bewertungen'], daten['recommendation_rate'])
+        elif daten['trust_score'] is not None and daten['anzahl_bewertungen'] is not None:
+            trustpilot_scraper.add_profil_verlauf_entry_trustpilot(conn, profil_id, daten['trust_score'], daten['anzahl_bewertungen'])
+    elif art == 'seite':
+        # Nach einem Schreibfehler rückt der Checkpoint nicht mehr weiter (die Seite würde sonst übersprungen)
+        page_checkpoint = checkpoint if daten['checkpoint_ok'] and not job.get('schreibfehler') else None
+        upsert = kununu_scraper.upsert_kununu_reviews_bulk if kununu else trustpilot_scraper.upsert_trustpilot_reviews_bulk
+        counts = upsert(conn, profil_id, daten['bewertungen'], checkpoint=page_checkpoint, seite=daten['seite'])
+        if counts['fehlgeschlagen']:
+            job['schreibfehler'] = True
+            return
+        stats['seiten'] += 1
+        stats['bewertungen'] += counts['neu'] + counts['geaendert'] + counts['unveraendert']
+    elif art == 'fertig':
+        if daten['fehler']:
+            stats['fehler'] += 1
+            logger.error("Profil ID %s (%s) fehlgeschlagen: %s", profil_id, job['unternehmen_name'], daten['fehler'])
+        if job.get('schreibfehler'):
+            # Die Worker wissen nichts vom Schreibfehler: Bewertungen der nicht gespeicherten Seite wären sonst "ungesehen"
+            if not daten['fehler']:
+                stats['fehler'] += 1
+            logger.error("Profil ID %s (%s): Seiten konnten nicht gespeichert werden, Löscherkennung übersprungen.", profil_id, job['unternehmen_name'])
+        elif daten['sweep_complete']:
+            mark_deleted = kununu_scraper.mark_unseen_reviews_deleted if kununu else trustpilot_scraper.mark_unseen_trustpilot_reviews_deleted
+            mark_deleted(conn, profil_id, lauf_start)
+            (kununu_scraper.record_full_sweep if kununu else trustpilot_scraper.record_full_sweep)(conn, profil_id)
+            if checkpoint:
+                scrape_checkpoints.finish(conn, checkpoint)
+
+def run(profiles, workers=None, db_name=DB_NAME, incremental=None, trustpilot_base_url=trustpilot_scraper.TRUSTPILOT_BASE_URL,
+        kununu_base_url=None, trustpilot_max_requests=trustpilot_scraper.MAX_REQUESTS_PER_TIMEFRAME):
+    """
+    Scraped die Profile mit `workers` Worker-Prozessen; der aufrufende Prozess schreibt.
+
+    Args:
+        profiles (list): dicts mit profil_id, plattform, url, unternehmen_name (z.B. aus
+            scheduler.get_profiles_by_priority), in der gewünschten Reihenfolge.
+        workers (int, optional): Anzahl Worker-Prozesse (Standard: Anzahl CPU-Kerne).
+        db_name (str): Datenbankdatei.
+        incremental (bool, optional): Wie bei den Scrapern; None entscheidet pro Profil.
+        trustpilot_base_url (str): Basis-URL für Trustpilot (z.B. ein lokaler Stub-Server).
+        kununu_base_url (str, optional): Basis-URL für die Kununu-API (Standard: KUNUNU_BASE_URL).
+        trustpilot_max_requests (int): Trustpilot-Anfragen pro Zeitfenster, auf alle Worker aufgeteilt.
+
+    Returns:
+        dict: {'profile', 'seiten', 'bewertungen', 'fehler', 'sekunden'}.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = {'profile': len(profiles), 'seiten': 0, 'bewertungen': 0, 'fehler': 0}
+    start_time = time.perf_counter()
+    conn = connect(db_name)
+    try:
+        jobs = {}
+        for profile in profiles:
+            jobs[profile['profil_id']] = prepare_job(conn, profile, incremental, trustpilot_base_url)
+
+        context = multiprocessing.get_context(MP_CONTEXT)
+        message_queue = context.Queue(maxsize=workers * 8) # Begrenzt den Speicher, falls der Schreiber zurückliegt
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(message_queue, db_name, workers, kununu_base_url, trustpilot_max_requests,
+                                           logging.getLevelName(logging.getLogger().getEffectiveLevel()))) as executor:
+            futures = {profil_id: executor.submit(scrape_profile_worker, job) for profil_id, (job, _, _) in jobs.items()}
+            offen = set(futures)
+            while offen:
+                try:
+                    art, profil_id, daten = message_queue.get(timeout=WRITER_POLL_SECONDS)
+                except queue.Empty:
+                    # Abgestürzte Worker-Prozesse schicken kein 'fertig' mehr
+                    for profil_id in [p for p in offen if futures[p].done() and futures[p].exception()]:
+                        _write_message(conn, jobs, 'fertig', profil_id,
+                                       {'sweep_complete': False, 'fehler': str(futures[profil_id].exception())}, stats)
+                        offen.discard(profil_id)
+                    continue
+                _write_message(conn, jobs, art, profil_id, daten, stats)
+                if art == 'fertig':
+                    offen.discard(profil_id)
+    finally:
+        conn.close()
+    stats['sekunden'] = time.perf_counter() - start_time
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescrape aller gespeicherten Profile mit mehreren Worker-Prozessen.")
+    parser.add_argument('--plattform', choices=['Kununu', 'Trustpilot'], help="Nur Profile dieser Plattform")
+    parser.add_argument('--limit', type=int, help="Nur die N dringendsten Profile")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Anzahl Worker-Prozesse")
+    parser.add_argument('--voll', action='store_true', help="Vollständige Durchläufe statt inkrementell")
+    parser.add_argument('--db', default=DB_NAME, help="Datenbankdatei")
+    parser.add_argument('--log-level', help="DEBUG, INFO, WARNING, ... (Standard: SCRAPER_LOG_LEVEL bzw. INFO)")
+    args = parser.parse_args()
+    metrics.configure_logging(args.log_level)
+
+    conn = connect(args.db)
+    try:
+        profiles = get_profiles_by_priority(conn, args.plattform)
+    finally:
+        conn.close()
+    if args.limit:
+        profiles = profiles[:args.limit]
+
+    stats = run(profiles, workers=args.workers, db_name=args.db, incremental=False if args.voll else None)
+    logger.info("Runner: %s Profile, %s Seiten, %s Bewertungen in %.1f s (%.0f Bewertungen/s), %s fehlgeschlagen.",
+                stats['profile'], stats['seiten'], stats['bewertungen'], stats['sekunden'],
+                stats['bewertungen'] / max(stats['sekunden'], 1e-9), stats['fehler'])
+
+if __name__ == '__main__':
+    main()
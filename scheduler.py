@@ -0,0 +1,155 @@
+# scheduler.py
+"""
+Geplanter Massen-Rescrape aller gespeicherten Profile.
+
+Die Profile werden nach Dringlichkeit sortiert: Je länger der letzte Scrape (profil_verlauf)
+zurückliegt und je mehr neue Bewertungen ein Profil zuletzt bekommen hat, desto früher ist es
+dran. Die Aufträge laufen über die ScrapeJobQueue, d.h. mehrere Unternehmen werden parallel
+gescraped, die Anzahl gleichzeitiger Scraper ist aber pro Plattform begrenzt (Trustpilot teilt
+sich zusätzlich den Token-Bucket).
+
+Aufruf von der Kommandozeile (z.B. per cron):
+    python scheduler.py                      # alle Profile, wartet bis alle Aufträge fertig sind
+    python scheduler.py --plattform Kununu --limit 10
+    python scheduler.py --dry-run            # nur die Reihenfolge anzeigen
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+import metrics
+from db import get_db_connection
+from scrape_jobs import ScrapeJobQueue, SCRAPE_WORKERS_PER_PLATFORM
+
+logger = logging.getLogger(__name__)
+
+# Zeitraum, über den die Bewertungsfrequenz (neue Bewertungen pro Tag) gemessen wird
+VELOCITY_WINDOW_DAYS = 30
+# Staleness für noch nie gescrapte Profile (in Stunden), damit sie vorne einsortiert werden
+NEVER_SCRAPED_STALENESS_HOURS = 24 * 365
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def get_profiles_by_priority(conn, plattform=None, now=None):
+    """
+    Ermittelt alle Profile inkl. Priorität für den Rescrape.
+
+    Die Priorität ist staleness_stunden * (1 + neue_bewertungen_pro_tag): Ein Profil, das seit
+    zwei Tagen nicht gescraped wurde und täglich fünf Bewertungen bekommt, ist dringender als
+    eines, das seit einer Woche ruht, aber kaum Bewertungen erhält.
+
+    Args:
+        conn (sqlite3.Connection): Datenbankverbindung (mit sqlite3.Row).
+        plattform (str, optional): Nur Profile dieser Plattform ('Kununu' oder 'Trustpilot').
+        now (datetime, optional): Bezugszeitpunkt (Standard: jetzt).
+
+    Returns:
+        list: Liste von dicts (profil_id, plattform, url, unternehmen_name, letzter_scrape,
+              bewertungen_pro_tag, staleness_stunden, prioritaet), absteigend nach Priorität.
+    """
+    now = now or datetime.now()
+    velocity_since = (now - timedelta(days=VELOCITY_WINDOW_DAYS)).isoformat()
+    query = """
+        SELECT up.id AS profil_id, up.url, u.name AS unternehmen_name, p.name AS plattform,
+               (SELECT MAX(pv.scraping_datum) FROM profil_verlauf pv WHERE pv.profil_id = up.id) AS letzter_scrape,
+               (SELECT COUNT(*) FROM bewertungen b
+                WHERE b.profil_id = up.id AND b.is_deleted = 0 AND b.datum >= ?) AS neue_bewertungen
+        FROM unternehmens_profile up
+        JOIN unternehmen u ON up.unternehmen_id = u.id
+        JOIN plattformen p ON up.plattform_id = p.id
+    """
+    params = [velocity_since]
+    if plattform:
+        query += " WHERE p.name = ?"
+        params.append(plattform)
+
+    profiles = []
+    for row in conn.execute(query, params):
+        letzter_scrape = _parse_timestamp(row['letzter_scrape'])
+        if letzter_scrape:
+            staleness_stunden = max((now - letzter_scrape).total_seconds() / 3600, 0.0)
+        else:
+            staleness_stunden = NEVER_SCRAPED_STALENESS_HOURS
+        bewertungen_pro_tag = row['neue_bewertungen'] / VELOCITY_WINDOW_DAYS
+        profiles.append({
+            'profil_id': row['profil_id'],
+            'plattform': row['plattform'],
+            'url': row['url'],
+            'unternehmen_name': row['unternehmen_name'],
+            'letzter_scrape': row['letzter_scrape'],
+            'bewertungen_pro_tag': round(bewertungen_pro_tag, 2),
+            'staleness_stunden': round(staleness_stunden, 1),
+            'prioritaet': round(staleness_stunden * (1 + bewertungen_pro_tag), 2),
+        })
+    profiles.sort(key=lambda profile: profile['prioritaet'], reverse=True)
+    return profiles
+
+def schedule_rescrape(job_queue, plattform=None, limit=None):
+    """
+    Reiht alle (bzw. die dringendsten `limit`) Profile mit ihrer Priorität in die Job-Warteschlange ein.
+
+    Returns:
+        tuple: (Anzahl neu eingereihter Aufträge, Anzahl bereits wartender/laufender Aufträge)
+    """
+    conn = job_queue.connection_factory()
+    try:
+        profiles = get_profiles_by_priority(conn, plattform)
+    finally:
+        conn.close()
+    if limit:
+        profiles = profiles[:limit]
+
+    neu, vorhanden = 0, 0
+    for profile in profiles:
+        if not job_queue.workers_per_platform.get(profile['plattform']):
+            logger.warning("Plattform '%s' wird nicht unterstützt, überspringe %s.", profile['plattform'], profile['url'])
+            continue
+        _, neu_angelegt = job_queue.submit(profile['plattform'], profile['url'],
+                                           profile['unternehmen_name'], prioritaet=profile['prioritaet'])
+        if neu_angelegt:
+            neu += 1
+        else:
+            vorhanden += 1
+    logger.info("%s Aufträge eingereiht, %s bereits wartend/laufend.", neu, vorhanden)
+    return neu, vorhanden
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescrape aller gespeicherten Profile nach Dringlichkeit.")
+    parser.add_argument('--plattform', choices=sorted(SCRAPE_WORKERS_PER_PLATFORM), help="Nur Profile dieser Plattform")
+    parser.add_argument('--limit', type=int, help="Nur die N dringendsten Profile")
+    parser.add_argument('--workers-kununu', type=int, default=SCRAPE_WORKERS_PER_PLATFORM['Kununu'])
+    parser.add_argument('--workers-trustpilot', type=int, default=SCRAPE_WORKERS_PER_PLATFORM['Trustpilot'])
+    parser.add_argument('--dry-run', action='store_true', help="Nur die Reihenfolge anzeigen, nichts scrapen")
+    parser.add_argument('--log-level', help="DEBUG, INFO, WARNING, ... (Standard: SCRAPER_LOG_LEVEL bzw. INFO)")
+    args = parser.parse_args()
+    metrics.configure_logging(args.log_level)
+
+    if args.dry_run:
+        conn = get_db_connection()
+        try:
+            profiles = get_profiles_by_priority(conn, args.plattform)
+        finally:
+            conn.close()
+        for profile in profiles[:args.limit] if args.limit else profiles:
+            print(f"{profile['prioritaet']:>10.1f}  {profile['plattform']:<10} {profile['unternehmen_name']} "
+                  f"(zuletzt: {profile['letzter_scrape'] or 'nie'}, {profile['bewertungen_pro_tag']} Bewertungen/Tag)")
+        return
+
+    job_queue = ScrapeJobQueue(get_db_connection, workers_per_platform={
+        'Kununu': args.workers_kununu,
+        'Trustpilot': args.workers_trustpilot,
+    })
+    # Nur die eigenen Aufträge abarbeiten; verwaiste Aufträge übernimmt die Web UI beim Start
+    job_queue.start(recover=False)
+    schedule_rescrape(job_queue, plattform=args.plattform, limit=args.limit)
+    job_queue.wait()
+    logger.info("Alle Aufträge abgearbeitet.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# scrape_checkpoints.py
+"""
+Checkpoints für vollständige Scraping-Durchläufe.
+
+Ein vollständiger Durchlauf (alle Seiten eines Profils, danach Löscherkennung) legt eine Zeile in
+scrape_checkpoints an und setzt letzte_seite in derselben Transaktion, in der die Bewertungen der
+Seite geschrieben werden. Bricht der Lauf ab (Timeout, Proxy-Wechsel, Neustart), setzt der nächste
+Lauf für das Profil nach der letzten geschriebenen Seite fort, statt wieder bei Seite 1 zu beginnen.
+
+Die Löscherkennung braucht dafür keine Liste der gesehenen IDs: Jede gesehene Bewertung bekommt
+last_seen_scraping_datum >= lauf_start, nach Abschluss des Durchlaufs gelten alle älteren als gelöscht.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+# Ältere Checkpoints werden verworfen und der Durchlauf beginnt von vorn
+CHECKPOINT_MAX_AGE_HOURS = 48
+# Beim Fortsetzen wird die letzte fertige Seite noch einmal geholt: Wurden inzwischen Bewertungen
+# gelöscht, rutschen spätere Bewertungen auf frühere Seiten und würden sonst übersprungen.
+CHECKPOINT_RESUME_OVERLAP_PAGES = 1
+
+class ScrapeCheckpoint:
+    """Fortschritt eines vollständigen Durchlaufs für ein Profil."""
+
+    def __init__(self, profil_id, plattform_id, lauf_id, lauf_start, letzte_seite=0, seiten_gesamt=None, fortgesetzt=False):
+        self.profil_id = profil_id
+        self.plattform_id = plattform_id
+        self.lauf_id = lauf_id
+        self.lauf_start = lauf_start
+        self.letzte_seite = letzte_seite
+        self.seiten_gesamt = seiten_gesamt
+        self.fortgesetzt = fortgesetzt
+
+    @property
+    def resume_page(self):
+        """Erste Seite, die (nach Seite 1) geholt werden muss."""
+        return max(self.letzte_seite + 1 - CHECKPOINT_RESUME_OVERLAP_PAGES, 2)
+
+    def record_page(self, cursor, seite, seiten_gesamt=None):
+        """
+        Speichert eine fertige Seite. Muss innerhalb der Transaktion aufgerufen werden, die die
+        Bewertungen der Seite schreibt; letzte_seite wird nie zurückgesetzt (Seite 1 beim Fortsetzen).
+        """
+        seiten_gesamt = seiten_gesamt or self.seiten_gesamt
+        cursor.execute("""
+            UPDATE scrape_checkpoints
+            SET letzte_seite = MAX(letzte_seite, ?), seiten_gesamt = IFNULL(?, seiten_gesamt), aktualisiert_am = ?
+            WHERE profil_id = ? AND lauf_id = ?
+        """, (seite, seiten_gesamt, datetime.now(), self.profil_id, self.lauf_id))
+        self.letzte_seite = max(self.letzte_seite, seite)
+        self.seiten_gesamt = seiten_gesamt
+
+    def save_page(self, conn, seite, seiten_gesamt=None):
+        """Wie record_page, aber in einer eigenen Transaktion (z.B. für Seiten ohne Bewertungen)."""
+        with conn:
+            self.record_page(conn.cursor(), seite, seiten_gesamt)
+
+def load_resumable(conn, profil_id, plattform_id=None, max_age_hours=CHECKPOINT_MAX_AGE_HOURS):
+    """
+    Lädt den Checkpoint eines abgebrochenen Durchlaufs.
+
+    Returns:
+        ScrapeCheckpoint or None: None, wenn keiner vorhanden, noch keine Seite fertig oder er zu alt ist.
+    """
+    row = conn.execute(
+        "SELECT plattform_id, lauf_id, lauf_start, letzte_seite, seiten_gesamt FROM scrape_checkpoints WHERE profil_id = ?",
+        (profil_id,)).fetchone()
+    if not row or not row['letzte_seite']:
+        return None
+    try:
+        lauf_start = datetime.fromisoformat(str(row['lauf_start']))
+    except ValueError:
+        return None
+    if datetime.now() - lauf_start >= timedelta(hours=max_age_hours):
+        return None
+    return ScrapeCheckpoint(profil_id, plattform_id or row['plattform_id'], row['lauf_id'], lauf_start,
+                            row['letzte_seite'], row['seiten_gesamt'], fortgesetzt=True)
+
+def start_or_resume(conn, profil_id, plattform_id, max_age_hours=CHECKPOINT_MAX_AGE_HOURS):
+    """
+    Setzt einen abgebrochenen Durchlauf des Profils fort oder beginnt einen neuen.
+
+    Returns:
+        ScrapeCheckpoint: fortgesetzt=True, wenn ein nicht zu alter Checkpoint vorhanden war.
+    """
+    checkpoint = load_resumable(conn, profil_id, plattform_id, max_age_hours)
+    if checkpoint:
+        return checkpoint
+    checkpoint = ScrapeCheckpoint(profil_id, plattform_id, uuid.uuid4().hex, datetime.now())
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO scrape_checkpoints (profil_id, plattform_id, lauf_id, lauf_start, letzte_seite, aktualisiert_am)
+            VALUES (?, ?, ?, ?, 0, ?)
+        """, (profil_id, plattform_id, checkpoint.lauf_id, checkpoint.lauf_start, checkpoint.lauf_start))
+    return checkpoint
+
+def finish(conn, checkpoint):
+    """Entfernt den Checkpoint nach einem abgeschlossenen Durchlauf."""
+    with conn:
+        conn.execute("DELETE FROM scrape_checkpoints WHERE profil_id = ? AND lauf_id = ?", (checkpoint.profil_id, checkpoint.lauf_id))
@@ -0,0 +1,277 @@
+# scrape_jobs.py
+"""
+Job-Warteschlange für Scraping-Aufträge aus der Web UI.
+
+Aufträge werden in der Tabelle scrape_jobs gespeichert und von einem begrenzten Pool an
+Worker-Threads pro Plattform abgearbeitet (höhere Priorität zuerst). Pro Profil-URL kann
+höchstens ein Auftrag wartend oder laufend sein (partieller UNIQUE-Index), weitere Klicks
+werden auf diesen Auftrag umgeleitet.
+
+Laufende Aufträge tragen ihren Besitzer (Host und PID) und ein Lebenszeichen, das ein Thread der
+Warteschlange alle HEARTBEAT_SECONDS erneuert. Beim Start werden nur Aufträge zurückgesetzt, deren
+Besitzer nicht mehr läuft bzw. deren Lebenszeichen älter als STALE_AFTER_SECONDS ist, nicht die
+eines parallel laufenden Scheduler- oder Web-UI-Prozesses.
+"""
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Maximale Anzahl gleichzeitig laufender Scraper pro Plattform. Alle Trustpilot-Worker teilen
+# sich zusätzlich den Token-Bucket des trustpilot_scraper.
+SCRAPE_WORKERS_PER_PLATFORM = {'Kununu': 2, 'Trustpilot': 2}
+
+# SCRAPER_ENGINE=asyncio führt die Aufträge im gemeinsamen Event-Loop von async_engine aus. Die
+# Worker-Threads warten dann nur noch auf das Ergebnis, daher sind mehr gleichzeitige Aufträge möglich.
+SCRAPER_ENGINE = os.environ.get('SCRAPER_ENGINE', 'threads')
+if SCRAPER_ENGINE == 'asyncio':
+    SCRAPE_WORKERS_PER_PLATFORM = {'Kununu': 8, 'Trustpilot': 8}
+
+STATUS_WARTEND = 'wartend'
+STATUS_LAEUFT = 'laeuft'
+STATUS_FERTIG = 'fertig'
+STATUS_FEHLGESCHLAGEN = 'fehlgeschlagen'
+
+JOBS_LIST_SQL = "SELECT * FROM scrape_jobs ORDER BY id DESC LIMIT ?"
+
+# Lebenszeichen laufender Aufträge; ohne Erneuerung gilt ein Auftrag nach STALE_AFTER_SECONDS als verwaist
+HEARTBEAT_SECONDS = 30
+STALE_AFTER_SECONDS = 4 * HEARTBEAT_SECONDS
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def _process_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _is_owner_alive(besitzer):
+    """False, wenn der Besitzer-Prozess auf diesem Host nachweislich beendet ist (sonst True)."""
+    host, _, pid = (besitzer or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit() or os.name != 'posix':
+        return True # Fremder Host oder Windows (os.kill würde den Prozess beenden): nur das Lebenszeichen zählt
+    if int(pid) == os.getpid():
+        return False # Vorgänger dieses Prozesses mit derselben PID
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def run_scraper_for_job(job, progress_callback):
+    """Startet den passenden Scraper für einen Auftrag (blockiert bis zum Ende des Scrapes)."""
+    if SCRAPER_ENGINE == 'asyncio':
+        import async_engine
+        async_engine.run_scraper_for_job(job, progress_callback)
+        return
+    profil_url = job['profil_url'].rstrip('/')
+    if job['plattform'] == 'Kununu':
+        from kununu_scraper import main_scraper
+        main_scraper(job['unternehmen_name'], profil_url, f"{profil_url}/kommentare?sort=newest",
+                     progress_callback=progress_callback)
+    elif job['plattform'] == 'Trustpilot':
+        from trustpilot_scraper import main_trustpilot_scraper
+        main_trustpilot_scraper(profil_url, None, job['unternehmen_name'],
+                                progress_callback=progress_callback)
+    else:
+        raise ValueError(f"Unbekannte Plattform für Auftrag {job['id']}: {job['plattform']}")
+
+class ScrapeJobQueue:
+    """
+    Persistente Warteschlange mit begrenztem Worker-Pool pro Plattform.
+
+    Args:
+        connection_factory (callable): Liefert eine neue SQLite-Verbindung (mit sqlite3.Row).
+        workers_per_platform (dict): Anzahl der Worker-Threads je Plattform.
+        runner (callable): Führt einen Auftrag aus, Signatur runner(job, progress_callback).
+    """
+    def __init__(self, connection_factory, workers_per_platform=None, runner=run_scraper_for_job):
+        self.connection_factory = connection_factory
+        self.workers_per_platform = dict(workers_per_platform or SCRAPE_WORKERS_PER_PLATFORM)
+        self.runner = runner
+        # Eine Prioritäts-Warteschlange pro Plattform: (-prioritaet, job_id)
+        self._queues = {plattform: queue.PriorityQueue() for plattform in self.workers_per_platform}
+        self._workers = []
+        self._start_lock = threading.Lock()
+        self.besitzer = _process_owner()
+
+    def start(self, recover=True):
+        """
+        Startet die Worker und den Lebenszeichen-Thread (idempotent). Mit recover=True werden wartende
+        Aufträge eingereiht und verwaiste laufende Aufträge (siehe _recover_orphaned_jobs) erneut
+        gestartet; laufende Aufträge anderer lebender Prozesse bleiben unangetastet. Prozesse, die nur
+        ihre eigenen Aufträge abarbeiten (z.B. der Scheduler), verwenden recover=False.
+        """
+        with self._start_lock:
+            if self._workers:
+                return
+            pending_jobs = []
+            if recover:
+                conn = self.connection_factory()
+                try:
+                    self._recover_orphaned_jobs(conn)
+                    pending_jobs = conn.execute("SELECT id, plattform, prioritaet FROM scrape_jobs WHERE status = ? ORDER BY id", (STATUS_WARTEND,)).fetchall()
+                finally:
+                    conn.close()
+            for job in pending_jobs:
+                self._enqueue(job['id'], job['plattform'], job['prioritaet'])
+            for plattform, worker_count in self.workers_per_platform.items():
+                for worker_num in range(worker_count):
+                    worker = threading.Thread(target=self._worker_loop, args=(self._queues[plattform],),
+                                              name=f"scrape-worker-{plattform.lower()}-{worker_num + 1}", daemon=True)
+                    worker.start()
+                    self._workers.append(worker)
+            heartbeat = threading.Thread(target=self._heartbeat_loop, name="scrape-heartbeat", daemon=True)
+            heartbeat.start()
+            self._workers.append(heartbeat)
+            logger.info("Job-Warteschlange gestartet: %s Worker, %s wartende Aufträge übernommen.", self.workers_per_platform, len(pending_jobs))
+
+    def _recover_orphaned_jobs(self, conn):
+        """
+        Setzt laufende Aufträge auf wartend zurück, deren Besitzer-Prozess beendet ist oder deren
+        Lebenszeichen älter als STALE_AFTER_SECONDS ist (bei Aufträgen aus älteren Versionen ohne
+        Lebenszeichen zählt gestartet_am).
+        """
+        stale_before = datetime.now() - timedelta(seconds=STALE_AFTER_SECONDS)
+        rows = conn.execute("SELECT id, besitzer, IFNULL(lebenszeichen_am, gestartet_am) AS lebenszeichen_am FROM scrape_jobs WHERE status = ?",
+                            (STATUS_LAEUFT,)).fetchall()
+        for row in rows:
+            lebenszeichen_am = _parse_timestamp(row['lebenszeichen_am'])
+            if _is_owner_alive(row['besitzer']) and lebenszeichen_am and lebenszeichen_am >= stale_before:
+                continue
+            with conn:
+                # Nur zurücksetzen, wenn der Auftrag inzwischen nicht beendet oder übernommen wurde
+                reset = conn.execute("""
+                    UPDATE scrape_jobs SET status = ?, gestartet_am = NULL, besitzer = NULL, lebenszeichen_am = NULL
+                    WHERE id = ? AND status = ? AND besitzer IS ? AND IFNULL(lebenszeichen_am, gestartet_am) IS ?
+                """, (STATUS_WARTEND, row['id'], STATUS_LAEUFT, row['besitzer'], row['lebenszeichen_am'])).rowcount
+            if reset:
+                logger.warning("Verwaister Auftrag %s (Besitzer %s, letztes Lebenszeichen %s) wird erneut eingereiht.",
+                               row['id'], row['besitzer'] or 'unbekannt', row['lebenszeichen_am'] or 'nie')
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            try:
+                conn = self.connection_factory()
+                try:
+                    with conn:
+                        conn.execute("UPDATE scrape_jobs SET lebenszeichen_am = ? WHERE besitzer = ? AND status = ?",
+                                     (datetime.now(), self.besitzer, STATUS_LAEUFT))
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning("Lebenszeichen der laufenden Aufträge konnte nicht gespeichert werden: %s", e)
+
+    def _enqueue(self, job_id, plattform, prioritaet):
+        job_queue = self._queues.get(plattform)
+        if job_queue is None:
+            logger.warning("Keine Worker für Plattform '%s', Auftrag %s bleibt wartend.", plattform, job_id)
+            return
+        job_queue.put((-(prioritaet or 0), job_id))
+
+    def wait(self):
+        """Blockiert, bis alle eingereihten Aufträge abgearbeitet sind."""
+        for job_queue in self._queues.values():
+            job_queue.join()
+
+    def submit(self, plattform, profil_url, unternehmen_name, prioritaet=0):
+        """
+        Reiht einen Scraping-Auftrag ein. Aufträge mit höherer Priorität werden zuerst gestartet.
+
+        Returns:
+            tuple: (job_id, neu_angelegt). Läuft oder wartet bereits ein Auftrag für dieselbe
+                   Profil-URL, wird dessen ID mit neu_angelegt=False zurückgegeben.
+        """
+        self.start()
+        profil_url = profil_url.rstrip('/')
+        conn = self.connection_factory()
+        try:
+            try:
+                with conn:
+                    cursor = conn.execute("""
+                        INSERT INTO scrape_jobs (plattform, profil_url, unternehmen_name, status, prioritaet, erstellt_am)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (plattform, profil_url, unternehmen_name, STATUS_WARTEND, prioritaet, datetime.now()))
+                    job_id = cursor.lastrowid
+            except sqlite3.IntegrityError:
+                row = conn.execute("SELECT id FROM scrape_jobs WHERE profil_url = ? AND status IN (?, ?)",
+                                   (profil_url, STATUS_WARTEND, STATUS_LAEUFT)).fetchone()
+                if row:
+                    return row['id'], False
+                raise
+        finally:
+            conn.close()
+        self._enqueue(job_id, plattform, prioritaet)
+        return job_id, True
+
+    def _worker_loop(self, job_queue):
+        while True:
+            _, job_id = job_queue.get()
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                logger.exception("Unerwarteter Fehler bei Auftrag %s: %s", job_id, e)
+            finally:
+                job_queue.task_done()
+
+    def _run_job(self, job_id):
+        conn = self.connection_factory()
+        try:
+            with conn:
+                now = datetime.now()
+                claimed = conn.execute("""
+                    UPDATE scrape_jobs SET status = ?, gestartet_am = ?, besitzer = ?, lebenszeichen_am = ?
+                    WHERE id = ? AND status = ?
+                """, (STATUS_LAEUFT, now, self.besitzer, now, job_id, STATUS_WARTEND)).rowcount
+            if not claimed:
+                return # Bereits von einem anderen Worker übernommen
+            job = dict(conn.execute("SELECT * FROM scrape_jobs WHERE id = ?", (job_id,)).fetchone())
+
+            def progress_callback(seiten_fertig, seiten_gesamt):
+                with conn:
+                    conn.execute("UPDATE scrape_jobs SET seiten_fertig = ?, seiten_gesamt = ? WHERE id = ?",
+                                 (seiten_fertig, seiten_gesamt, job_id))
+
+            logger.info("Starte Auftrag %s (%s, %s).", job_id, job['plattform'], job['unternehmen_name'])
+            try:
+                self.runner(job, progress_callback)
+                status, fehlermeldung = STATUS_FERTIG, None
+            except Exception as e:
+                logger.exception("Auftrag %s fehlgeschlagen.", job_id)
+                status, fehlermeldung = STATUS_FEHLGESCHLAGEN, str(e)
+            with conn:
+                conn.execute("UPDATE scrape_jobs SET status = ?, beendet_am = ?, fehlermeldung = ? WHERE id = ?",
+                             (status, datetime.now(), fehlermeldung, job_id))
+            logger.info("Auftrag %s beendet (%s).", job_id, status)
+        finally:
+            conn.close()
+
+    def list_jobs(self, limit=50):
+        """Gibt die neuesten Aufträge inkl. Fortschritt und Dauer als Liste von dicts zurück."""
+        conn = self.connection_factory()
+        try:
+            rows = conn.execute(JOBS_LIST_SQL, (limit,)).fetchall()
+        finally:
+            conn.close()
+        jobs = []
+        now = datetime.now()
+        for row in rows:
+            job = dict(row)
+            gestartet_am = _parse_timestamp(job['gestartet_am'])
+            beendet_am = _parse_timestamp(job['beendet_am'])
+            job['dauer_sekunden'] = round(((beendet_am or now) - gestartet_am).total_seconds(), 1) if gestartet_am else None
+            jobs.append(job)
+        return jobs
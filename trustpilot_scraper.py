@@ -1,29 +1,126 @@
 # trustpilot_scraper.py
+import logging
 import sqlite3
 import requests
 import json
-from datetime import datetime
+import re
+import http_client # Shared pooled HTTP session
+import metrics # Counters/histograms for /metrics
+import scrape_checkpoints # Resumable full sweeps
+from db import DB_NAME, get_db_connection # Shared SQLite connections (WAL, pooled)
+from datetime import datetime, timedelta
 import time # Importiere das time Modul
-from collections import deque # Für effizientes Verwalten der Zeitstempel
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 # --- Globals & Constants ---
-DB_NAME = 'Datenbank.db'
-# This Build ID is extracted from the example URL. It might change over time,
-# making the scraper break. For a robust solution, this ID might need to be
-# dynamically discovered or updated.
+# The Next.js build ID changes with every Trustpilot deployment. It is discovered from the
+# __NEXT_DATA__ script of the profile page and cached for BUILD_ID_TTL_SECONDS; this value
+# is only used if discovery fails.
 TRUSTPILOT_JSON_BUILD_ID = "businessunitprofile-consumersite-2.3939.0"
+BUILD_ID_TTL_SECONDS = 6 * 60 * 60
+NEXT_BUILD_ID_PATTERN = re.compile(rb'"buildId"\s*:\s*"([^"]+)"')
+# Abbruch nach so vielen Seiten in Folge ohne gültige Bewertungsdaten (z.B. nach einem Deployment)
+MAX_CONSECUTIVE_PAGE_FAILURES = 5
+# Base URL for all requests; can be pointed at a local stub server serving
+# trustpilot_example.json-shaped pages.
+TRUSTPILOT_BASE_URL = "https://de.trustpilot.com"
 
 # Rate Limiting für Trustpilot
-MAX_REQUESTS_PER_TIMEFRAME = 800 # Wieder erhöht, da Proxy-Wechsel manuell erfolgt
+MAX_REQUESTS_PER_TIMEFRAME = 800 # Gesamt; pro Proxy begrenzt proxy_pool zusätzlich (PROXY_MAX_REQUESTS)
 TIMEFRAME_SECONDS = 5 * 60  # 5 Minuten
-request_timestamps = deque()
+RATE_LIMIT_BURST = 10 # Anfragen, die ohne Wartezeit direkt hintereinander erlaubt sind
+
+# Parallele Seitenabrufe (1 = sequentiell)
+TRUSTPILOT_FETCH_WORKERS = 4
+
+# Delta-Sync: spätestens nach diesem Intervall wird wieder ein vollständiger Durchlauf
+# gemacht, der gelöschte Bewertungen erkennt.
+TRUSTPILOT_FULL_SWEEP_INTERVAL_DAYS = 7
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    The bucket holds at most `capacity` tokens and refills continuously so that, including the
+    initial burst, no more than `max_requests` requests are granted within any `timeframe_seconds`.
+    """
+    def __init__(self, max_requests, timeframe_seconds, capacity=RATE_LIMIT_BURST):
+        self.capacity = capacity
+        self.refill_rate = (max_requests - capacity) / timeframe_seconds # Tokens pro Sekunde
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available. Returns the time waited in seconds."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                time_to_wait = (1 - self._tokens) / self.refill_rate
+            time.sleep(time_to_wait)
+            waited += time_to_wait
+
+trustpilot_rate_limiter = TokenBucket(MAX_REQUESTS_PER_TIMEFRAME, TIMEFRAME_SECONDS)
 
-# --- Database Connection ---
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+class _PageNotFound:
+    """Falsy marker for a 404 response, so callers treating None as a failed page keep working."""
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "PAGE_NOT_FOUND"
+
+PAGE_NOT_FOUND = _PageNotFound()
+
+class BuildIdCache:
+    """
+    Thread-safe cache of the Next.js build ID per base URL, with a TTL.
+
+    All scraper threads share one instance, so a deployment is detected and the profile page
+    re-read only once instead of once per running scrape.
+    """
+    def __init__(self, ttl_seconds=BUILD_ID_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {} # api_base_url -> (build_id, discovered_at)
+        self._lock = threading.Lock()
+
+    def get(self, api_base_url, slug):
+        """Returns the cached build ID, discovering it from the profile page when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(api_base_url)
+            if entry and time.monotonic() - entry[1] < self.ttl_seconds:
+                return entry[0]
+            return self._discover_locked(api_base_url, slug, entry)
+
+    def refresh(self, api_base_url, slug, stale_build_id):
+        """
+        Re-discovers the build ID after stale_build_id returned a 404. If another thread already
+        replaced it, the newer ID is returned without another request.
+        """
+        with self._lock:
+            entry = self._entries.get(api_base_url)
+            if entry and entry[0] != stale_build_id and time.monotonic() - entry[1] < self.ttl_seconds:
+                return entry[0]
+            return self._discover_locked(api_base_url, slug, entry, bypass_cache=True)
+
+    def _discover_locked(self, api_base_url, slug, entry, bypass_cache=False):
+        build_id = discover_build_id(api_base_url, slug, bypass_cache=bypass_cache)
+        if build_id:
+            self._entries[api_base_url] = (build_id, time.monotonic())
+            return build_id
+        return entry[0] if entry else None
+
+trustpilot_build_ids = BuildIdCache()
 
 # --- Database Helper Functions (adapted from kununu_scraper.py) ---
 def get_or_create_unternehmen(conn, unternehmen_name):
@@ -74,7 +171,7 @@ def get_or_create_profil(conn, unternehmen_id, plattform_id, profil_url):
                            (unternehmen_id, plattform_id))
             row = cursor.fetchone()
             if row:
-                print(f"Hinweis: Profil für Unternehmen ID {unternehmen_id} und Plattform ID {plattform_id} existiert bereits, ggf. mit anderer URL. Verwende existierendes Profil.")
+                logger.info("Profil für Unternehmen ID %s und Plattform ID %s existiert bereits, ggf. mit anderer URL. Verwende existierendes Profil.", unternehmen_id, plattform_id)
                 return row['id']
             else:
                 # This case should ideally not happen if the first select by URL failed and then insert failed.
@@ -94,151 +191,311 @@ def add_profil_verlauf_entry_trustpilot(conn, profil_id, trust_score, num_review
             VALUES (?, ?, ?, ?, NULL)
         """, (profil_id, trust_score, num_reviews, current_time))
         conn.commit()
-        print(f"Neuer Trustpilot Verlaufseintrag für Profil ID {profil_id}: Score={trust_score}, Bewertungen={num_reviews} ({current_time}).")
+        logger.info("Neuer Trustpilot Verlaufseintrag für Profil ID %s: Score=%s, Bewertungen=%s (%s).", profil_id, trust_score, num_reviews, current_time)
     except Exception as e:
-        print(f"Fehler beim Hinzufügen des Trustpilot Profilverlaufs für Profil ID {profil_id}: {e}")
+        logger.error("Fehler beim Hinzufügen des Trustpilot Profilverlaufs für Profil ID %s: %s", profil_id, e)
         conn.rollback()
 
-def get_existing_trustpilot_review_data(conn, profil_id, trustpilot_review_id):
-    """Fetches existing review data by Trustpilot review ID."""
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, platform_data_updated_at, is_deleted
-        FROM bewertungen
-        WHERE profil_id = ? AND platform_review_id = ?
-    """, (profil_id, trustpilot_review_id))
-    row = cursor.fetchone()
-    if row:
-        return {"db_id": row["id"], "platform_data_updated_at_db": row["platform_data_updated_at"], "is_deleted_db": row["is_deleted"]}
-    return None
+# Maximum number of IDs per IN (...) lookup (SQLite's placeholder limit is 999 on older versions).
+SQLITE_IN_CHUNK_SIZE = 500
 
-def add_or_update_trustpilot_review(conn, profil_id, review_json):
-    """Adds or updates a single Trustpilot review in the database."""
+TRUSTPILOT_REVIEW_COLUMNS = (
+    'sterne', 'titel', 'text', 'datum', 'platform_data_updated_at',
+    'consumer_display_name', 'date_of_experience', 'review_language',
+    'review_source', 'review_likes', 'is_verified_by_platform'
+)
+
+def get_existing_trustpilot_reviews_data_bulk(conn, profil_id, trustpilot_review_ids):
+    """Fetches existing review data for many Trustpilot review IDs with one keyed lookup per chunk."""
+    ids = list(trustpilot_review_ids)
+    existing = {}
     cursor = conn.cursor()
-    
+    for start in range(0, len(ids), SQLITE_IN_CHUNK_SIZE):
+        chunk = ids[start:start + SQLITE_IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(f"""
+            SELECT id, platform_review_id, platform_data_updated_at, is_deleted
+            FROM bewertungen
+            WHERE profil_id = ? AND platform_review_id IN ({placeholders})
+        """, (profil_id, *chunk))
+        for row in cursor.fetchall():
+            existing[row["platform_review_id"]] = {"db_id": row["id"], "platform_data_updated_at_db": row["platform_data_updated_at"], "is_deleted_db": row["is_deleted"]}
+    return existing
+
+def parse_trustpilot_review(review_json):
+    """
+    Normalizes a single review from pageProps.reviews into the columns of the bewertungen table.
+    Returns None if the core data (id, rating, published date) is missing.
+    """
     review_id_tp = review_json.get('id')
     sterne = review_json.get('rating')
     titel = review_json.get('title')
-    text = review_json.get('text')
-    
     published_date = review_json.get('dates', {}).get('publishedDate')
-    experienced_date = review_json.get('dates', {}).get('experiencedDate')
-    updated_date = review_json.get('dates', {}).get('updatedDate') # This is platform_data_updated_at
-    
-    consumer_name = review_json.get('consumer', {}).get('displayName')
-    language = review_json.get('language')
-    source = review_json.get('source')
-    likes = review_json.get('likes', 0)
-    is_verified = review_json.get('labels', {}).get('verification', {}).get('isVerified', False)
 
     if not all([review_id_tp, sterne is not None, published_date]):
-        print(f"FEHLER: Unvollständige Kerndaten für Trustpilot Bewertung ID {review_id_tp}, Titel: '{titel}'. Übersprungen.")
-        return
+        logger.warning("Unvollständige Kerndaten für Trustpilot Bewertung ID %s, Titel: '%s'. Übersprungen.", review_id_tp, titel)
+        return None
+
+    return {
+        'platform_review_id': review_id_tp,
+        'sterne': sterne,
+        'titel': titel,
+        'text': review_json.get('text'),
+        'datum': published_date,
+        'platform_data_updated_at': review_json.get('dates', {}).get('updatedDate'),
+        'consumer_display_name': review_json.get('consumer', {}).get('displayName'),
+        'date_of_experience': review_json.get('dates', {}).get('experiencedDate'),
+        'review_language': review_json.get('language'),
+        'review_source': review_json.get('source'),
+        'review_likes': review_json.get('likes', 0),
+        'is_verified_by_platform': review_json.get('labels', {}).get('verification', {}).get('isVerified', False),
+    }
 
-    existing_review = get_existing_trustpilot_review_data(conn, profil_id, review_id_tp)
-    current_time = datetime.now()
+def add_or_update_trustpilot_reviews_page(conn, profil_id, reviews_json, checkpoint=None, seite=None):
+    """
+    Diffs a whole page of Trustpilot reviews (pageProps.reviews) against the database with one
+    keyed lookup and applies inserts, updates and last_seen touches in a single transaction.
+    If a checkpoint is given, it is advanced to `seite` in the same transaction.
+
+    Returns:
+        dict: Per-page counts {"neu", "geaendert", "unveraendert"}, plus "fehlgeschlagen" (True if the
+            transaction was rolled back; the caller must then treat the page as failed).
+    """
+    metrics.REVIEWS_PER_PAGE.observe(len(reviews_json), plattform='trustpilot')
+    with metrics.PARSE_SECONDS.time(plattform='trustpilot', seite='bewertungen'):
+        parsed_reviews = [parsed for parsed in (parse_trustpilot_review(review_json) for review_json in reviews_json) if parsed]
+    return upsert_trustpilot_reviews_bulk(conn, profil_id, parsed_reviews, checkpoint=checkpoint, seite=seite)
 
-    if existing_review:
-        db_id = existing_review['db_id']
-        updated_at_db = existing_review['platform_data_updated_at_db']
-        is_deleted_db = existing_review['is_deleted_db']
+def upsert_trustpilot_reviews_bulk(conn, profil_id, parsed_reviews, checkpoint=None, seite=None):
+    """
+    Writes already parsed reviews (parse_trustpilot_review) like add_or_update_trustpilot_reviews_page.
+    Used by the multi-process runner, whose workers parse the pages.
+    """
+    counts = {"neu": 0, "geaendert": 0, "unveraendert": 0, "fehlgeschlagen": False}
+    write_start = time.perf_counter()
+    # Duplicate IDs within one page are collapsed (last one wins)
+    reviews_by_id = {review['platform_review_id']: review for review in parsed_reviews}
+    if not reviews_by_id:
+        if checkpoint:
+            checkpoint.save_page(conn, seite)
+        return counts
 
-        if updated_date and (updated_at_db is None or updated_date > updated_at_db or is_deleted_db):
-            print(f"  -> Trustpilot Bewertung {review_id_tp} wird aktualisiert (ID: {db_id}).")
-            try:
-                cursor.execute("""
+    current_time = datetime.now()
+    new_reviews, changed_reviews, unchanged_db_ids = [], [], []
+    try:
+        existing = get_existing_trustpilot_reviews_data_bulk(conn, profil_id, reviews_by_id.keys())
+        for review_id_tp, review in reviews_by_id.items():
+            existing_review = existing.get(review_id_tp)
+            if not existing_review:
+                new_reviews.append(review)
+            elif review['platform_data_updated_at'] and (existing_review['platform_data_updated_at_db'] is None or review['platform_data_updated_at'] > existing_review['platform_data_updated_at_db'] or existing_review['is_deleted_db']):
+                changed_reviews.append((existing_review['db_id'], review))
+            else:
+                unchanged_db_ids.append(existing_review['db_id'])
+
+        with conn:
+            cursor = conn.cursor()
+            if new_reviews:
+                cursor.executemany(f"""
+                    INSERT INTO bewertungen (
+                        profil_id, platform_review_id, last_seen_scraping_datum, is_deleted, scraping_datum,
+                        {", ".join(TRUSTPILOT_REVIEW_COLUMNS)}
+                    ) VALUES (?, ?, ?, 0, ?, {", ".join("?" * len(TRUSTPILOT_REVIEW_COLUMNS))})
+                """, [(profil_id, review['platform_review_id'], current_time, current_time, *(review[col] for col in TRUSTPILOT_REVIEW_COLUMNS))
+                      for review in new_reviews])
+            if changed_reviews:
+                cursor.executemany(f"""
                     UPDATE bewertungen
-                    SET sterne = ?, titel = ?, text = ?, datum = ?, platform_data_updated_at = ?,
-                        consumer_display_name = ?, date_of_experience = ?, review_language = ?,
-                        review_source = ?, review_likes = ?, is_verified_by_platform = ?,
+                    SET {", ".join(f"{col} = ?" for col in TRUSTPILOT_REVIEW_COLUMNS)},
                         last_seen_scraping_datum = ?, is_deleted = 0
                     WHERE id = ?
-                """, (sterne, titel, text, published_date, updated_date,
-                      consumer_name, experienced_date, language, source, likes, is_verified,
-                      current_time, db_id))
-                conn.commit()
-            except Exception as e:
-                print(f"Fehler beim Aktualisieren der Trustpilot Bewertung ID {db_id}: {e}")
-                conn.rollback()
-        else:
-            # No change, just update last_seen and ensure is_deleted is 0
-            cursor.execute("UPDATE bewertungen SET last_seen_scraping_datum = ?, is_deleted = 0 WHERE id = ?", (current_time, db_id))
-            conn.commit()
-            print(f"  -> Trustpilot Bewertung {review_id_tp} unverändert. 'last_seen' aktualisiert.")
-    else:
-        # New review
-        print(f"  -> Neue Trustpilot Bewertung {review_id_tp} wird hinzugefügt.")
-        try:
-            cursor.execute("""
-                INSERT INTO bewertungen (
-                    profil_id, sterne, titel, text, datum, platform_review_id,
-                    platform_data_updated_at, last_seen_scraping_datum, is_deleted,
-                    consumer_display_name, date_of_experience, review_language,
-                    review_source, review_likes, is_verified_by_platform, scraping_datum
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (profil_id, sterne, titel, text, published_date, review_id_tp,
-                  updated_date, current_time, 0,
-                  consumer_name, experienced_date, language, source, likes, is_verified, current_time))
-            conn.commit()
-        except sqlite3.IntegrityError:
-            print(f"HINWEIS (Integrity): Trustpilot Bewertung {review_id_tp} konnte nicht hinzugefügt werden (existiert evtl. doch und wurde bereits aktualisiert).")
-        except Exception as e:
-            print(f"Fehler beim Hinzufügen der Trustpilot Bewertung {review_id_tp}: {e}")
-            conn.rollback()
+                """, [(*(review[col] for col in TRUSTPILOT_REVIEW_COLUMNS), current_time, db_id)
+                      for db_id, review in changed_reviews])
+            if unchanged_db_ids:
+                # No change, just update last_seen and ensure is_deleted is 0
+                cursor.executemany("UPDATE bewertungen SET last_seen_scraping_datum = ?, is_deleted = 0 WHERE id = ?",
+                                   [(current_time, db_id) for db_id in unchanged_db_ids])
+            if checkpoint:
+                checkpoint.record_page(cursor, seite)
+
+        counts["neu"] = len(new_reviews)
+        counts["geaendert"] = len(changed_reviews)
+        counts["unveraendert"] = len(unchanged_db_ids)
+    except Exception as e:
+        logger.error("Fehler beim Speichern der Trustpilot Bewertungsseite für Profil ID %s: %s", profil_id, e)
+        conn.rollback()
+        counts["fehlgeschlagen"] = True
+    metrics.DB_WRITE_SECONDS.observe(time.perf_counter() - write_start, plattform='trustpilot')
+    metrics.record_page_counts('trustpilot', counts)
+    return counts
+
+def add_or_update_trustpilot_review(conn, profil_id, review_json):
+    """Adds or updates a single Trustpilot review in the database."""
+    return add_or_update_trustpilot_reviews_page(conn, profil_id, [review_json])
+
+def mark_unseen_trustpilot_reviews_deleted(conn, profil_id, lauf_start):
+    """
+    Flags every review of the profile that was not seen during a completed full sweep as deleted,
+    i.e. whose last_seen_scraping_datum is older than the start of the (possibly resumed) sweep.
+    """
+    try:
+        seen = conn.execute(
+            "SELECT 1 FROM bewertungen WHERE profil_id = ? AND last_seen_scraping_datum >= ? LIMIT 1",
+            (profil_id, lauf_start)).fetchone()
+        if not seen:
+            logger.info("Keine Trustpilot Bewertungen gesehen, Löscherkennung für Profil ID %s übersprungen.", profil_id)
+            return 0
+        with conn:
+            cursor = conn.execute("""
+                UPDATE bewertungen SET is_deleted = 1
+                WHERE profil_id = ? AND is_deleted = 0
+                  AND (last_seen_scraping_datum IS NULL OR last_seen_scraping_datum < ?)
+            """, (profil_id, lauf_start))
+            deleted_count = cursor.rowcount
+        logger.info("%s Trustpilot Bewertungen für Profil ID %s nicht mehr gefunden und als gelöscht markiert.", deleted_count, profil_id)
+        return deleted_count
+    except Exception as e:
+        logger.error("Fehler bei der Trustpilot Löscherkennung für Profil ID %s: %s", profil_id, e)
+        conn.rollback()
+        return 0
+
+def is_full_sweep_due(conn, profil_id, interval_days=TRUSTPILOT_FULL_SWEEP_INTERVAL_DAYS):
+    """Checks whether the last full sweep of the profile is older than interval_days (or never happened)."""
+    row = conn.execute("SELECT letzter_vollscan FROM unternehmens_profile WHERE id = ?", (profil_id,)).fetchone()
+    if not row or not row['letzter_vollscan']:
+        return True
+    try:
+        letzter_vollscan = datetime.fromisoformat(str(row['letzter_vollscan']))
+    except ValueError:
+        return True
+    return datetime.now() - letzter_vollscan >= timedelta(days=interval_days)
+
+def record_full_sweep(conn, profil_id):
+    """Stores the time of a completed full sweep."""
+    with conn:
+        conn.execute("UPDATE unternehmens_profile SET letzter_vollscan = ? WHERE id = ?", (datetime.now(), profil_id))
 
 # --- Rate Limiting Helper ---
 def _apply_trustpilot_rate_limit():
     """
     Stellt sicher, dass das Rate-Limit für Trustpilot-Anfragen eingehalten wird.
-    Wartet, falls notwendig.
+    Wartet, falls notwendig. Der Token-Bucket wird von allen Threads geteilt.
     """
-    global request_timestamps
-    current_time = time.time()
-
-    # Entferne Zeitstempel, die älter als das Zeitfenster sind
-    while request_timestamps and request_timestamps[0] < current_time - TIMEFRAME_SECONDS:
-        request_timestamps.popleft()
-
-    if len(request_timestamps) >= MAX_REQUESTS_PER_TIMEFRAME:
-        oldest_relevant_request_time = request_timestamps[0]
-        time_to_wait = (oldest_relevant_request_time + TIMEFRAME_SECONDS) - current_time + 0.5 # +0.5s Puffer
-        if time_to_wait > 0:
-            print(f"Trustpilot Rate-Limit fast erreicht ({len(request_timestamps)} Anfragen). Warte {time_to_wait:.2f} Sekunden...")
-            time.sleep(time_to_wait)
-            _apply_trustpilot_rate_limit() # Erneuter Check nach dem Warten
+    waited = trustpilot_rate_limiter.acquire()
+    metrics.RATE_LIMIT_WAIT_SECONDS.observe(waited, plattform='trustpilot')
+    if waited > 1:
+        logger.info("Trustpilot Rate-Limit erreicht. %.2f Sekunden gewartet.", waited)
 
 # --- Trustpilot Scraping Functions ---
+def discover_build_id(api_base_url, slug, bypass_cache=False):
+    """
+    Reads the current Next.js build ID from the __NEXT_DATA__ script of a profile page.
+
+    Returns:
+        str or None: The build ID, or None if the page could not be loaded or contains none.
+    """
+    profile_url = f"{api_base_url}/review/{slug}"
+    try:
+        if bypass_cache or http_client.would_hit_network(profile_url):
+            _apply_trustpilot_rate_limit()
+        logger.debug("Ermittle Trustpilot Build-ID von: %s", profile_url)
+        response = http_client.fetch(profile_url, accept='text/html', timeout=20, bypass_cache=bypass_cache)
+    except requests.exceptions.RequestException as e:
+        logger.error("Fehler beim Abrufen der Trustpilot-Profilseite %s: %s", profile_url, e)
+        return None
+    return extract_build_id(response.content, profile_url)
+
+def extract_build_id(html, profile_url):
+    """Extracts the build ID from the raw HTML of a profile page (None if there is none)."""
+    match = NEXT_BUILD_ID_PATTERN.search(html)
+    if not match:
+        logger.warning("Keine Build-ID in __NEXT_DATA__ von %s gefunden.", profile_url)
+        return None
+    build_id = match.group(1).decode('utf-8', 'replace')
+    logger.info("Trustpilot Build-ID: %s", build_id)
+    return build_id
+
 def fetch_trustpilot_page_json(json_url):
-    """Fetches and parses JSON data from a Trustpilot URL."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/json'
-    }
+    """
+    Fetches and parses JSON data from a Trustpilot URL.
+
+    Returns:
+        dict, PAGE_NOT_FOUND or None: The parsed JSON, PAGE_NOT_FOUND for a 404 (usually an
+        outdated build ID), None for any other error.
+    """
     try:
-        _apply_trustpilot_rate_limit() # Rate-Limit prüfen/anwenden VOR der Anfrage
-        
-        # Zeitstempel für die aktuelle Anfrage hinzufügen, NACHDEM das Rate-Limit bestanden wurde
-        request_timestamps.append(time.time())
-        print(f"Rufe Trustpilot JSON API ab: {json_url}")
-        response = requests.get(json_url, headers=headers, timeout=20)
-        response.raise_for_status()
-        return response.json()
+        if http_client.would_hit_network(json_url): # Antworten aus dem Cache zählen nicht gegen das Limit
+            _apply_trustpilot_rate_limit() # Rate-Limit prüfen/anwenden VOR der Anfrage
+        logger.debug("Rufe Trustpilot JSON API ab: %s", json_url)
+        response = http_client.fetch(json_url, accept='application/json', timeout=20)
+        with metrics.PARSE_SECONDS.time(plattform='trustpilot', seite='json'):
+            return response.json()
+    except requests.exceptions.HTTPError as e:
+        logger.error("Fehler beim Abrufen der Trustpilot JSON-Daten von %s: %s", json_url, e)
+        if e.response is not None and e.response.status_code == 404:
+            return PAGE_NOT_FOUND
     except requests.exceptions.RequestException as e:
-        print(f"Fehler beim Abrufen der Trustpilot JSON-Daten von {json_url}: {e}")
+        logger.error("Fehler beim Abrufen der Trustpilot JSON-Daten von %s: %s", json_url, e)
     except json.JSONDecodeError as e:
-        print(f"Fehler beim Parsen der Trustpilot JSON-Antwort von {json_url}: {e}")
+        logger.error("Fehler beim Parsen der Trustpilot JSON-Antwort von %s: %s", json_url, e)
     return None
 
-def main_trustpilot_scraper(trustpilot_profile_base_url, json_build_id=TRUSTPILOT_JSON_BUILD_ID, manual_unternehmen_name=None):
+def fetch_trustpilot_pages(page_urls, workers=TRUSTPILOT_FETCH_WORKERS):
+    """
+    Fetches pages with a bounded worker pool and yields (page_num, page_data) in page order,
+    so that a single consumer can write them to the database.
+
+    Args:
+        page_urls (iterable): (page_num, json_url) tuples.
+        workers (int): Number of parallel fetches; 1 fetches sequentially.
+    """
+    if workers <= 1:
+        for page_num, json_url in page_urls:
+            yield page_num, fetch_trustpilot_page_json(json_url)
+        return
+
+    page_urls = iter(page_urls)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trustpilot-fetch")
+    pending = deque()
+    try:
+        # Höchstens 2 * workers Seiten gleichzeitig im Flug bzw. im Speicher halten
+        for page_num, json_url in page_urls:
+            pending.append((page_num, executor.submit(fetch_trustpilot_page_json, json_url)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            page_num, future = pending.popleft()
+            next_page = next(page_urls, None)
+            if next_page:
+                pending.append((next_page[0], executor.submit(fetch_trustpilot_page_json, next_page[1])))
+            yield page_num, future.result()
+    finally:
+        # Greift auch, wenn der Verbraucher die Paginierung vorzeitig abbricht
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def main_trustpilot_scraper(trustpilot_profile_base_url, json_build_id=None, manual_unternehmen_name=None,
+                            fetch_workers=TRUSTPILOT_FETCH_WORKERS, api_base_url=TRUSTPILOT_BASE_URL, incremental=None,
+                            progress_callback=None):
     """
     Main function for scraping a Trustpilot company profile.
 
     Args:
         trustpilot_profile_base_url (str): The base URL of the Trustpilot profile 
                                            (e.g., "https://de.trustpilot.com/review/www.mindfactory.de").
-        json_build_id (str): The build ID for the JSON API URL.
+        json_build_id (str, optional): The build ID for the JSON API URL. None (default) uses the
+                                       build ID discovered from the profile page (cached with a TTL).
+                                       Either way, a 404 triggers one re-discovery and a retry.
         manual_unternehmen_name (str, optional): Manually provided company name.
                                                  If provided, this name is used for DB operations.
+        fetch_workers (int): Number of pages fetched in parallel (1 = sequential). All fetches
+                             share the token-bucket rate limiter; the DB is written by this thread only.
+        api_base_url (str): Base URL the JSON pages are fetched from (e.g. a local stub server).
+        incremental (bool, optional): True stops paging at the first page that only contains known,
+                                      unchanged reviews (delta sync). False always walks all pages and,
+                                      if every page was processed, flags unseen reviews as deleted.
+                                      None (default) is incremental unless the last full sweep is older
+                                      than TRUSTPILOT_FULL_SWEEP_INTERVAL_DAYS.
+        progress_callback (callable, optional): Called after every page with (pages_done, total_pages).
     """
     conn = None
     try:
@@ -249,16 +506,42 @@ def main_trustpilot_scraper(trustpilot_profile_base_url, json_build_id=TRUSTPILO
             trustpilot_profile_base_url += '/'
         slug = trustpilot_profile_base_url.split('/review/')[1].split('/')[0]
         if not slug:
-            print(f"FEHLER: Konnte Slug nicht aus Trustpilot URL extrahieren: {trustpilot_profile_base_url}")
+            logger.error("Konnte Slug nicht aus Trustpilot URL extrahieren: %s", trustpilot_profile_base_url)
             return
 
+        build_id = {'aktuell': json_build_id or trustpilot_build_ids.get(api_base_url, slug) or TRUSTPILOT_JSON_BUILD_ID,
+                    'erneuert': False}
+        page_build_ids = {} # Seite -> Build-ID, mit der sie angefragt wurde
+
+        def page_json_url(page_num=1):
+            page_build_ids[page_num] = build_id['aktuell']
+            json_url = f"{api_base_url}/_next/data/{build_id['aktuell']}/review/{slug}.json"
+            return f"{json_url}?page={page_num}" if page_num > 1 else json_url
+
+        def retry_after_not_found(page_num=1):
+            """
+            After a 404, re-discovers the build ID (once per run) and fetches the page again if the
+            ID has changed since the page was requested. Returns None if a retry is pointless.
+            """
+            if not build_id['erneuert']:
+                build_id['erneuert'] = True
+                stale_build_id = build_id['aktuell']
+                build_id['aktuell'] = trustpilot_build_ids.refresh(api_base_url, slug, stale_build_id) or stale_build_id
+                if build_id['aktuell'] != stale_build_id:
+                    logger.info("Neue Trustpilot Build-ID %s (alt: %s).", build_id['aktuell'], stale_build_id)
+            if page_build_ids.get(page_num) == build_id['aktuell']:
+                return None
+            return fetch_trustpilot_page_json(page_json_url(page_num))
+
         # Fetch initial page to get company info and total pages
-        initial_json_url = f"https://de.trustpilot.com/_next/data/{json_build_id}/review/{slug}.json"
-        print(f"Starte Trustpilot Scraper für Slug: {slug} mit URL: {initial_json_url}")
+        initial_json_url = page_json_url()
+        logger.info("Starte Trustpilot Scraper für Slug: %s mit URL: %s", slug, initial_json_url)
         
         initial_data = fetch_trustpilot_page_json(initial_json_url)
+        if initial_data is PAGE_NOT_FOUND:
+            initial_data = retry_after_not_found()
         if not initial_data or "pageProps" not in initial_data or "businessUnit" not in initial_data["pageProps"]:
-            print(f"FEHLER: Konnte initiale JSON-Daten für {slug} nicht laden oder ungültige Struktur.")
+            logger.error("Konnte initiale JSON-Daten für %s nicht laden oder ungültige Struktur.", slug)
             return
 
         business_unit = initial_data["pageProps"]["businessUnit"]
@@ -273,12 +556,12 @@ def main_trustpilot_scraper(trustpilot_profile_base_url, json_build_id=TRUSTPILO
         final_unternehmen_name = manual_unternehmen_name if manual_unternehmen_name else company_name_from_json
 
         if not final_unternehmen_name:
-            print(f"FEHLER: Unternehmensname weder manuell angegeben noch in JSON-Daten für {slug} gefunden.")
+            logger.error("Unternehmensname weder manuell angegeben noch in JSON-Daten für %s gefunden.", slug)
             return
 
-        print(f"Unternehmen (final): {final_unternehmen_name}, TrustScore: {trust_score}, Bewertungen: {total_reviews_count}, Seiten: {total_pages}")
+        logger.info("Unternehmen (final): %s, TrustScore: %s, Bewertungen: %s, Seiten: %s", final_unternehmen_name, trust_score, total_reviews_count, total_pages)
         if manual_unternehmen_name and company_name_from_json and manual_unternehmen_name.lower() != company_name_from_json.lower():
-            print(f"HINWEIS: Manueller Name '{manual_unternehmen_name}' weicht von Trustpilot-Name '{company_name_from_json}' ab. Manueller Name wird verwendet.")
+            logger.info("Manueller Name '%s' weicht von Trustpilot-Name '%s' ab. Manueller Name wird verwendet.", manual_unternehmen_name, company_name_from_json)
 
         unternehmen_id = get_or_create_unternehmen(conn, final_unternehmen_name)
         plattform_id = get_plattform_id(conn, "Trustpilot")
@@ -289,70 +572,106 @@ def main_trustpilot_scraper(trustpilot_profile_base_url, json_build_id=TRUSTPILO
         if trust_score is not None and total_reviews_count is not None:
             add_profil_verlauf_entry_trustpilot(conn, profil_id, trust_score, total_reviews_count)
         
-        # --- Mark all existing reviews for this profile as potentially deleted ---
-        # This helps in identifying reviews that were removed from the platform
-        cursor = conn.cursor()
-        cursor.execute("UPDATE bewertungen SET is_deleted = 1, last_seen_scraping_datum = ? WHERE profil_id = ?", (datetime.now(), profil_id))
-        conn.commit()
-        print(f"Alle bestehenden Bewertungen für Profil ID {profil_id} als 'is_deleted=1' markiert vor dem Scannen.")
-
-        pages_since_last_manual_pause = 0
-        MANUAL_PAUSE_AFTER_PAGES = 200
-
-        # Process reviews from all pages
-        for page_num in range(1, total_pages + 1):
-            current_page_json_url = f"https://de.trustpilot.com/_next/data/{json_build_id}/review/{slug}.json?page={page_num}"
-            if page_num == 1 and initial_data: # Use already fetched data for page 1
-                page_data = initial_data
-            else:
-                # Der einfache time.sleep(2) wird durch den Rate-Limiter _apply_trustpilot_rate_limit
-                # ersetzt, der vor dem fetch_trustpilot_page_json Aufruf greift.
-                # Ein kleiner, genereller Sleep kann trotzdem sinnvoll sein, um nicht zu aggressiv zu wirken,
-                # auch wenn das Rate-Limit noch nicht erreicht ist. Erhöht für mehr Vorsicht.
-
-                # Manuelle Pause nach X Seiten
-                if pages_since_last_manual_pause >= MANUAL_PAUSE_AFTER_PAGES:
-                    print(f"\n--- MANUELLE PAUSE ---")
-                    print(f"{MANUAL_PAUSE_AFTER_PAGES} Seiten wurden gescraped.")
-                    input("Bitte wechsle jetzt den Proxy und drücke dann ENTER, um fortzufahren...")
-                    print(f"Scraping wird fortgesetzt...\n")
-                    pages_since_last_manual_pause = 0 # Zähler zurücksetzen
-                time.sleep(0.5) # Generelle Pause zwischen den Seiten wieder reduziert
-                page_data = fetch_trustpilot_page_json(current_page_json_url)
-
+        if incremental is None:
+            # An interrupted full sweep is resumed instead of running a delta sync
+            incremental = not is_full_sweep_due(conn, profil_id) and not scrape_checkpoints.load_resumable(conn, profil_id)
+        logger.info("Modus: %s", 'Delta-Sync' if incremental else 'vollständiger Durchlauf')
+
+        # Full sweeps are checkpointed per page and continue after the last written page when restarted.
+        # Deleted reviews are detected after a completed sweep from last_seen_scraping_datum < lauf_start,
+        # which also covers the pages written by earlier, interrupted runs of the same sweep.
+        checkpoint = None if incremental else scrape_checkpoints.start_or_resume(conn, profil_id, plattform_id)
+        resume_page = 2
+        if checkpoint:
+            checkpoint.seiten_gesamt = total_pages
+        if checkpoint and checkpoint.fortgesetzt:
+            resume_page = checkpoint.resume_page
+            logger.info("Setze abgebrochenen Durchlauf %s ab Seite %s/%s fort.", checkpoint.lauf_id, resume_page, total_pages)
+        lauf_start = checkpoint.lauf_start if checkpoint else datetime.now()
+        failed_pages = 0
+        consecutive_failures = 0
+        sweep_complete = False
+
+        def iter_pages():
+            # Seite 1 wurde bereits abgerufen. Die restlichen Seiten (beim Fortsetzen ab dem Checkpoint)
+            # werden parallel geholt; den Proxy-Wechsel übernimmt der Proxy-Pool von http_client.
+            yield 1, initial_data
+            yield from fetch_trustpilot_pages(((page_num, page_json_url(page_num)) for page_num in range(resume_page, total_pages + 1)),
+                                              workers=fetch_workers)
+
+        # Process reviews from all pages (fetched concurrently, written by this thread only)
+        page_num = 0
+        for page_num, page_data in iter_pages():
+            if progress_callback:
+                progress_callback(page_num - 1, total_pages)
+            if page_data is PAGE_NOT_FOUND:
+                page_data = retry_after_not_found(page_num)
             if not page_data or "pageProps" not in page_data or "reviews" not in page_data["pageProps"]:
-                print(f"FEHLER: Konnte JSON-Daten für Seite {page_num} von {slug} nicht laden oder ungültige Struktur.")
+                logger.error("Konnte JSON-Daten für Seite %s von %s nicht laden oder ungültige Struktur.", page_num, slug)
+                failed_pages += 1
+                consecutive_failures += 1
+                if consecutive_failures >= MAX_CONSECUTIVE_PAGE_FAILURES:
+                    # Weitere Anfragen würden mit hoher Wahrscheinlichkeit ebenfalls scheitern und nur das Rate-Limit verbrauchen
+                    logger.error("%s Seiten in Folge fehlgeschlagen. Breche den Lauf für %s ab (Fortsetzung beim nächsten Lauf).", consecutive_failures, slug)
+                    break
                 continue
+            consecutive_failures = 0
             
+            # The checkpoint only moves forward while all pages so far succeeded, so a resumed sweep never skips a failed page
+            page_checkpoint = checkpoint if not failed_pages else None
             reviews_on_page = page_data["pageProps"]["reviews"]
             if not reviews_on_page:
-                print(f"Keine Bewertungen auf Seite {page_num} für {slug} gefunden.")
+                logger.info("Keine Bewertungen auf Seite %s für %s gefunden.", page_num, slug)
+                if page_checkpoint:
+                    page_checkpoint.save_page(conn, page_num, total_pages)
                 continue
 
-            print(f"Verarbeite {len(reviews_on_page)} Bewertungen von Seite {page_num}/{total_pages} für {final_unternehmen_name}...")
-            for review_item_json in reviews_on_page:
-                add_or_update_trustpilot_review(conn, profil_id, review_item_json)
-            pages_since_last_manual_pause += 1
-        
-        print(f"Trustpilot Scraping für {final_unternehmen_name} abgeschlossen.")
+            logger.debug("Verarbeite %s Bewertungen von Seite %s/%s für %s...", len(reviews_on_page), page_num, total_pages, final_unternehmen_name)
+            page_counts = add_or_update_trustpilot_reviews_page(conn, profil_id, reviews_on_page, checkpoint=page_checkpoint, seite=page_num)
+            if page_counts['fehlgeschlagen']:
+                # Not written means not seen: blocks deletion detection and further checkpoint moves like a failed fetch
+                failed_pages += 1
+                continue
+            logger.debug("Seite %s: %s neu, %s geändert, %s unverändert.", page_num, page_counts['neu'], page_counts['geaendert'], page_counts['unveraendert'])
+
+            if incremental and page_counts['unveraendert'] and not page_counts['neu'] and not page_counts['geaendert']:
+                logger.info("Seite %s enthält nur bekannte, unveränderte Bewertungen. Delta-Sync beendet.", page_num)
+                break
+        else:
+            sweep_complete = failed_pages == 0
+
+        if progress_callback:
+            progress_callback(page_num, total_pages)
+
+        if sweep_complete:
+            mark_unseen_trustpilot_reviews_deleted(conn, profil_id, lauf_start)
+            record_full_sweep(conn, profil_id)
+            if checkpoint:
+                scrape_checkpoints.finish(conn, checkpoint)
+        elif failed_pages:
+            logger.warning("%s Seiten fehlgeschlagen, Löscherkennung für %s übersprungen.", failed_pages, final_unternehmen_name)
+
+        logger.info("Trustpilot Scraping für %s abgeschlossen.", final_unternehmen_name)
 
     except Exception as e:
-        print(f"Ein Fehler ist im Trustpilot Hauptprozess aufgetreten: {e}")
+        logger.exception("Ein Fehler ist im Trustpilot Hauptprozess aufgetreten: %s", e)
     finally:
+        logger.info("HTTP-Statistik:\n%s", http_client.format_fetch_stats())
         if conn:
             conn.close()
-            print("Trustpilot: Datenbankverbindung geschlossen.")
+            logger.debug("Datenbankverbindung geschlossen.")
 
 if __name__ == '__main__':
     # --- WICHTIG: Stelle sicher, dass database_setup.py vorher einmal ausgeführt wurde! ---
     # from database_setup import setup_database
     # setup_database() # Nur einmalig oder bei Bedarf ausführen
     
+    metrics.configure_logging()
     # Beispielaufruf:
     test_trustpilot_url = "https://de.trustpilot.com/review/www.mindfactory.de"
-    # Der json_build_id wird standardmäßig aus der Konstante oben verwendet.
-    # Man könnte ihn auch hier übergeben: main_trustpilot_scraper(test_trustpilot_url, "neuer_build_id_falls_bekannt")
+    # Die Build-ID wird standardmäßig von der Profilseite ermittelt.
+    # Man könnte sie auch hier übergeben: main_trustpilot_scraper(test_trustpilot_url, "neuer_build_id_falls_bekannt")
     
-    print(f"Starte Trustpilot-Scraper für: {test_trustpilot_url}")
+    logger.info("Starte Trustpilot-Scraper für: %s", test_trustpilot_url)
     main_trustpilot_scraper(test_trustpilot_url)
-    print("Trustpilot-Scraper-Durchlauf beendet.")
+    logger.info("Trustpilot-Scraper-Durchlauf beendet.")
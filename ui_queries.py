@@ -0,0 +1,350 @@
+# ui_queries.py
+"""
+SQL-Abfragen der Web UI.
+
+Die Abfragen liegen zentral an einer Stelle, damit check_query_plans.py ihre Ausführungspläne
+gegen die Indizes aus database_setup.py prüfen kann.
+"""
+import base64
+import binascii
+import json
+import re
+
+from scrape_jobs import JOBS_LIST_SQL
+
+UNTERNEHMEN_LISTE_SQL = """
+    SELECT DISTINCT u.id, u.name
+    FROM unternehmen u
+    JOIN unternehmens_profile up ON u.id = up.unternehmen_id
+    ORDER BY u.name ASC
+"""
+
+UNTERNEHMEN_NAME_SQL = "SELECT name FROM unternehmen WHERE id = ?"
+
+PLATTFORMEN_SQL = "SELECT name FROM plattformen ORDER BY name"
+
+# Profilverlauf für die Diagramme der Detailseite
+PROFIL_VERLAUF_SQL = """
+    SELECT pv.gesamtdurchschnitt, pv.anzahl_bewertungen_gesamt, pv.scraping_datum, pv.recommendation_rate,
+           p.name AS plattform_name
+    FROM profil_verlauf pv
+    JOIN unternehmens_profile up ON pv.profil_id = up.id
+    JOIN plattformen p ON up.plattform_id = p.id
+    WHERE up.unternehmen_id = ?
+    ORDER BY pv.scraping_datum ASC
+"""
+
+# Materialisierte Kennzahlen (siehe database_setup.create_unternehmens_statistik_triggers)
+UNTERNEHMENS_STATISTIK_SQL = "SELECT * FROM unternehmens_statistik WHERE unternehmen_id = ?"
+UNTERNEHMENS_FAKTOREN_SQL = """
+    SELECT faktor_name, summe / anzahl AS durchschnitt, anzahl
+    FROM unternehmens_faktor_statistik
+    WHERE unternehmen_id = ? AND anzahl > 0
+    ORDER BY faktor_name
+"""
+
+# Basis-SQL für Bewertungen (Detailseite und alle_bewertungen)
+BEWERTUNGEN_SELECT_SQL = """
+    SELECT
+        b.sterne, b.titel, b.text, b.datum, b.is_former_employee,
+        b.review_type, b.is_recommended, b.reviewer_position, b.reviewer_department,
+        p.name as plattform_name,
+        b.reviewed_entity_name, b.reviewer_city, b.reviewer_state,
+        b.apprenticeship_job_title,
+        b.consumer_display_name, b.date_of_experience, b.review_language, b.review_source, b.review_likes, b.is_verified_by_platform
+"""
+BEWERTUNGEN_FROM_SQL = """
+    FROM bewertungen b
+    JOIN unternehmens_profile up ON b.profil_id = up.id
+    JOIN plattformen p ON up.plattform_id = p.id
+"""
+# Die neuesten Bewertungen für die Detailseite
+NEUESTE_BEWERTUNGEN_LIMIT = 8
+NEUESTE_BEWERTUNGEN_SQL = f"""
+    {BEWERTUNGEN_SELECT_SQL}
+    {BEWERTUNGEN_FROM_SQL}
+    WHERE b.unternehmen_id = ? AND b.is_deleted = 0
+    ORDER BY IFNULL(b.datum, '') DESC, b.id DESC -- wie 'neueste' auf "Alle Bewertungen" (gleicher Index)
+    LIMIT {NEUESTE_BEWERTUNGEN_LIMIT}
+"""
+
+# Sortierschlüssel der Seite "Alle Bewertungen" (Keyset-Paginierung). b.id macht den Schlüssel
+# eindeutig; IFNULL sorgt dafür, dass Bewertungen ohne Datum/Sterne mit Cursor-Vergleichen funktionieren.
+# Zu jeder Sortierung gibt es einen Index mit genau diesen Ausdrücken (idx_bewertungen_unternehmen_*).
+ALLE_BEWERTUNGEN_SORT_KEYS = {
+    'neueste': [("IFNULL(b.datum, '')", 'DESC'), ("b.id", 'DESC')],
+    'sterne_asc': [("IFNULL(b.sterne, 0)", 'ASC'), ("IFNULL(b.datum, '')", 'DESC'), ("b.id", 'DESC')],
+    'sterne_desc': [("IFNULL(b.sterne, 0)", 'DESC'), ("IFNULL(b.datum, '')", 'DESC'), ("b.id", 'DESC')],
+}
+ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG = {
+    'true': "b.is_recommended = 1",
+    'false': "b.is_recommended = 0",
+}
+ALLE_BEWERTUNGEN_FILTER_STATUS = {
+    'true': "b.is_former_employee = 1",  # Ehemalig
+    'false': "b.is_former_employee = 0", # Aktuell
+}
+
+def _build_where_clause(filter_empfehlung, filter_status):
+    where_clauses_list = ["b.unternehmen_id = ?", "b.is_deleted = 0"]
+    if filter_empfehlung in ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG:
+        where_clauses_list.append(ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG[filter_empfehlung])
+    if filter_status in ALLE_BEWERTUNGEN_FILTER_STATUS:
+        where_clauses_list.append(ALLE_BEWERTUNGEN_FILTER_STATUS[filter_status])
+    return where_clauses_list
+
+def _build_keyset_condition(sort_keys, backwards):
+    """
+    Baut die Bedingung "Zeile liegt in Sortierrichtung hinter dem Cursor" für gemischte
+    Sortierrichtungen aus, z.B. für (sterne ASC, datum DESC, id DESC):
+    sterne >= ? AND (sterne > ? OR (sterne = ? AND datum < ?) OR (sterne = ? AND datum = ? AND id < ?))
+
+    Die vorangestellte Schranke auf den ersten Schlüssel ist logisch redundant, aber nur über sie kann
+    SQLite im Index direkt zum Cursor springen (die OR-Verknüpfung allein wird nicht als Bereich erkannt).
+    """
+    first_expression, first_direction = sort_keys[0]
+    bound = f"{first_expression} {'>=' if (first_direction == 'ASC') != backwards else '<='} ?"
+    alternatives = []
+    for i, (expression, direction) in enumerate(sort_keys):
+        operator = '>' if (direction == 'ASC') != backwards else '<'
+        terms = [f"{prev_expression} = ?" for prev_expression, _ in sort_keys[:i]]
+        terms.append(f"{expression} {operator} ?")
+        alternatives.append("(" + " AND ".join(terms) + ")")
+    return f"({bound} AND (" + " OR ".join(alternatives) + "))"
+
+def _keyset_params(cursor_keys):
+    # Reihenfolge passend zu _build_keyset_condition: Schranke, dann für jede Alternative die Präfix-Werte + eigener Wert
+    params = [cursor_keys[0]]
+    for i in range(len(cursor_keys)):
+        params.extend(cursor_keys[:i + 1])
+    return params
+
+def build_alle_bewertungen_count_query(filter_empfehlung='alle', filter_status='alle'):
+    """Gibt die COUNT-Abfrage für die Seite "Alle Bewertungen" zurück (Parameter: unternehmen_id)."""
+    sql_where_clause = " WHERE " + " AND ".join(_build_where_clause(filter_empfehlung, filter_status))
+    return f"SELECT COUNT(b.id) {BEWERTUNGEN_FROM_SQL} {sql_where_clause}"
+
+def build_alle_bewertungen_page_query(sort_option='neueste', filter_empfehlung='alle', filter_status='alle',
+                                      cursor_keys=None, backwards=False):
+    """
+    Baut die Abfrage für eine Seite von "Alle Bewertungen" mit Keyset-Paginierung.
+
+    Args:
+        sort_option (str): 'neueste', 'sterne_asc' oder 'sterne_desc'.
+        filter_empfehlung (str): 'alle', 'true' oder 'false'.
+        filter_status (str): 'alle', 'true' (ehemalig) oder 'false' (aktuell).
+        cursor_keys (list, optional): Sortierschlüssel der letzten (bzw. bei backwards der ersten)
+            Zeile der vorherigen Seite. None startet am Anfang (bzw. bei backwards am Ende).
+        backwards (bool): Rückwärts blättern; die Zeilen kommen dann in umgekehrter Reihenfolge.
+
+    Returns:
+        tuple: (page_sql, params_after_id). page_sql erwartet unternehmen_id, dann params_after_id,
+               dann LIMIT. Die Spalten sort_key_0, sort_key_1, ... enthalten den Schlüssel für den nächsten Cursor.
+    """
+    sort_keys = ALLE_BEWERTUNGEN_SORT_KEYS.get(sort_option, ALLE_BEWERTUNGEN_SORT_KEYS['neueste'])
+    where_clauses_list = _build_where_clause(filter_empfehlung, filter_status)
+    params_after_id = []
+    if cursor_keys is not None:
+        where_clauses_list.append(_build_keyset_condition(sort_keys, backwards))
+        params_after_id = _keyset_params(list(cursor_keys))
+    sql_where_clause = " WHERE " + " AND ".join(where_clauses_list)
+
+    order_terms = []
+    for expression, direction in sort_keys:
+        if backwards:
+            direction = 'ASC' if direction == 'DESC' else 'DESC'
+        order_terms.append(f"{expression} {direction}")
+    sort_key_columns = ", ".join(f"{expression} AS sort_key_{i}" for i, (expression, _) in enumerate(sort_keys))
+
+    page_sql = (f"{BEWERTUNGEN_SELECT_SQL}, {sort_key_columns} {BEWERTUNGEN_FROM_SQL} {sql_where_clause} "
+                f"ORDER BY {', '.join(order_terms)} LIMIT ?")
+    return page_sql, params_after_id
+
+def encode_review_cursor(sort_option, cursor_keys, page, backwards=False):
+    """Kodiert Sortierung, Schlüssel, Seitennummer und Richtung als undurchsichtigen URL-Parameter."""
+    payload = json.dumps({'s': sort_option, 'k': cursor_keys, 'p': page, 'r': 1 if backwards else 0}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_review_cursor(cursor, sort_option):
+    """
+    Dekodiert einen Cursor aus encode_review_cursor.
+
+    Returns:
+        dict: {'keys', 'page', 'backwards'}, oder None wenn der Cursor ungültig ist oder zu einer
+              anderen Sortierung gehört (dann wird ab der ersten Seite angezeigt).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        cursor_keys = payload['k']
+        page = int(payload['p'])
+        expected_key_count = len(ALLE_BEWERTUNGEN_SORT_KEYS.get(sort_option, ALLE_BEWERTUNGEN_SORT_KEYS['neueste']))
+        if payload['s'] != sort_option or page < 1:
+            return None
+        if cursor_keys is not None and (not isinstance(cursor_keys, list) or len(cursor_keys) != expected_key_count):
+            return None
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        return None
+    return {'keys': cursor_keys, 'page': page, 'backwards': bool(payload.get('r'))}
+
+# Volltextsuche (bewertungen_fts, siehe database_setup.create_bewertungen_fts).
+# Treffer im Titel zählen doppelt; gelöschte Bewertungen stehen noch im Index und werden hier ausgefiltert.
+SUCHE_TREFFER_START = '\x02' # Markierungen für snippet()/highlight(), werden in der Web UI nach
+SUCHE_TREFFER_ENDE = '\x03'  # dem HTML-Escaping durch <mark> ersetzt
+SUCHE_SORT_ORDER = {
+    'relevanz': "bm25(bewertungen_fts, 2.0, 1.0), b.id DESC",
+    'neueste': "b.datum DESC, b.id DESC",
+}
+SUCHE_FILTER_SQL = {
+    'plattform': "p.name = ?",
+    'unternehmen_id': "up.unternehmen_id = ?",
+    'datum_von': "b.datum >= ?",
+    'datum_bis': "b.datum < date(?, '+1 day')", # inklusive des Tages
+}
+
+def build_fts_match_query(suchbegriff):
+    """
+    Wandelt eine Benutzereingabe in einen sicheren FTS5-MATCH-Ausdruck um: Alle Wörter müssen
+    vorkommen, "in Anführungszeichen" wird als Phrase gesucht, ein * am Wortende sucht nach Präfixen
+    (z.B. Gehalt*). Sonderzeichen der FTS5-Syntax werden nicht interpretiert.
+
+    Returns:
+        str or None: Der MATCH-Ausdruck, oder None wenn die Eingabe keine Suchwörter enthält.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', suchbegriff or ''):
+        if phrase:
+            tokens = re.findall(r'\w+', phrase)
+            if tokens:
+                terms.append('"' + " ".join(tokens) + '"')
+            continue
+        tokens = re.findall(r'\w+', word)
+        if tokens:
+            # Wörter mit Bindestrich o.ä. (Home-Office) als Phrase suchen
+            terms.append('"' + " ".join(tokens) + '"' + ('*' if re.search(r'\w\*$', word) else ''))
+    return " ".join(terms) or None
+
+def build_suche_query(sort_option='relevanz', filters=None):
+    """
+    Baut die Abfrage für die Volltextsuche.
+
+    Args:
+        sort_option (str): 'relevanz' (bm25) oder 'neueste'.
+        filters (dict, optional): Werte für die Schlüssel aus SUCHE_FILTER_SQL; leere Werte werden ignoriert.
+
+    Returns:
+        tuple: (sql, filter_params). sql erwartet den MATCH-Ausdruck, dann filter_params, dann LIMIT und OFFSET.
+    """
+    where_clauses_list = ["bewertungen_fts MATCH ?", "b.is_deleted = 0"]
+    filter_params = []
+    for name, condition in SUCHE_FILTER_SQL.items():
+        value = (filters or {}).get(name)
+        if value not in (None, ''):
+            where_clauses_list.append(condition)
+            filter_params.append(value)
+    order_by = SUCHE_SORT_ORDER.get(sort_option, SUCHE_SORT_ORDER['relevanz'])
+    sql = f"""
+        {BEWERTUNGEN_SELECT_SQL},
+        u.id AS unternehmen_id, u.name AS unternehmen_name,
+        highlight(bewertungen_fts, 0, '{SUCHE_TREFFER_START}', '{SUCHE_TREFFER_ENDE}') AS titel_treffer,
+        snippet(bewertungen_fts, 1, '{SUCHE_TREFFER_START}', '{SUCHE_TREFFER_ENDE}', ' … ', 24) AS text_treffer
+        FROM bewertungen_fts
+        JOIN bewertungen b ON b.id = bewertungen_fts.rowid
+        JOIN unternehmens_profile up ON b.profil_id = up.id
+        JOIN plattformen p ON up.plattform_id = p.id
+        JOIN unternehmen u ON up.unternehmen_id = u.id
+        WHERE {" AND ".join(where_clauses_list)}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+    """
+    return sql, filter_params
+
+# Export der Bewertungen eines Unternehmens (/api/unternehmen/<id>/bewertungen).
+# Exportiert wird Profil für Profil; innerhalb eines Profils folgt die Sortierung einem Index, sodass
+# SQLite die Zeilen direkt aus dem Index liefert und nichts zwischensortieren muss (Streaming).
+EXPORT_PROFILE_SQL = """
+    SELECT up.id AS profil_id, p.name AS plattform
+    FROM unternehmens_profile up
+    JOIN plattformen p ON up.plattform_id = p.id
+    WHERE up.unternehmen_id = ?
+    ORDER BY up.id
+"""
+EXPORT_SPALTEN = [
+    'id', 'plattform', 'platform_review_id', 'sterne', 'titel', 'text', 'datum', 'faktoren',
+    'is_recommended', 'is_former_employee', 'review_type', 'reviewer_position', 'reviewer_department',
+    'reviewed_entity_name', 'reviewer_city', 'reviewer_state', 'apprenticeship_job_title',
+    'consumer_display_name', 'date_of_experience', 'review_language', 'review_source', 'review_likes',
+    'is_verified_by_platform', 'platform_data_updated_at', 'scraping_datum', 'last_seen_scraping_datum',
+    'geaendert_am', 'is_deleted',
+]
+EXPORT_BOOL_SPALTEN = ('is_recommended', 'is_former_employee', 'is_verified_by_platform', 'is_deleted')
+
+def build_bewertungen_export_query(filter_empfehlung='alle', filter_status='alle', since=None, since_nr=None):
+    """
+    Baut die Export-Abfrage für die Bewertungen eines Profils (Spalten wie EXPORT_SPALTEN, ohne 'plattform').
+
+    Ohne since/since_nr werden wie in der UI nur nicht gelöschte Bewertungen exportiert. Mit since_nr
+    (aenderung_nr aus X-Export-Stand des vorigen Abzugs) bzw. since (UTC, 'YYYY-MM-DD HH:MM:SS') alle
+    seitdem neuen oder geänderten Bewertungen, einschließlich gelöschter (is_deleted = 1), damit
+    inkrementelle Abzüge Löschungen übernehmen können. Nur since_nr ist lückenlos: Ein Zeitstempel
+    wird vor dem Commit vergeben, ein später committeter Schreiber kann also hinter since liegen.
+
+    Returns:
+        tuple: (sql, params_after_id). sql erwartet profil_id, dann params_after_id.
+    """
+    where_clauses_list = ["b.profil_id = ?"]
+    params_after_id = []
+    if since_nr is not None:
+        where_clauses_list.append("b.aenderung_nr > ?")
+        params_after_id.append(since_nr)
+        order_by = "b.aenderung_nr"
+    elif since:
+        where_clauses_list.append("b.geaendert_am >= ?")
+        params_after_id.append(since)
+        order_by = "b.geaendert_am, b.id"
+    else:
+        where_clauses_list.append("b.is_deleted = 0")
+        order_by = "b.datum, b.id"
+    if filter_empfehlung in ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG:
+        where_clauses_list.append(ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG[filter_empfehlung])
+    if filter_status in ALLE_BEWERTUNGEN_FILTER_STATUS:
+        where_clauses_list.append(ALLE_BEWERTUNGEN_FILTER_STATUS[filter_status])
+    columns = ", ".join(
+        "(SELECT json_group_object(f.faktor_name, f.faktor_sterne) FROM bewertung_faktoren f"
+        " WHERE f.bewertung_id = b.id) AS faktoren" if spalte == 'faktoren' else f"b.{spalte}"
+        for spalte in EXPORT_SPALTEN if spalte != 'plattform')
+    sql = f"SELECT {columns} FROM bewertungen b WHERE {' AND '.join(where_clauses_list)} ORDER BY {order_by}"
+    return sql, params_after_id
+
+def iter_ui_queries():
+    """Liefert alle Abfragen der Web UI als (Name, SQL, Beispielparameter) für check_query_plans.py."""
+    yield 'unternehmen_liste', UNTERNEHMEN_LISTE_SQL, ()
+    yield 'unternehmen_name', UNTERNEHMEN_NAME_SQL, (1,)
+    yield 'plattformen', PLATTFORMEN_SQL, ()
+    yield 'profil_verlauf', PROFIL_VERLAUF_SQL, (1,)
+    yield 'unternehmens_statistik', UNTERNEHMENS_STATISTIK_SQL, (1,)
+    yield 'unternehmens_faktoren', UNTERNEHMENS_FAKTOREN_SQL, (1,)
+    yield 'neueste_bewertungen', NEUESTE_BEWERTUNGEN_SQL, (1,)
+    for filter_empfehlung in ['alle'] + list(ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG):
+        for filter_status in ['alle'] + list(ALLE_BEWERTUNGEN_FILTER_STATUS):
+            yield (f"alle_bewertungen count[empfehlung={filter_empfehlung}, status={filter_status}]",
+                   build_alle_bewertungen_count_query(filter_empfehlung, filter_status), (1,))
+            for sort_option, sort_keys in ALLE_BEWERTUNGEN_SORT_KEYS.items():
+                for cursor_keys, backwards in ((None, False), ([0] * len(sort_keys), False), ([0] * len(sort_keys), True), (None, True)):
+                    page_sql, params_after_id = build_alle_bewertungen_page_query(
+                        sort_option, filter_empfehlung, filter_status, cursor_keys, backwards)
+                    name = (f"alle_bewertungen[{sort_option}, empfehlung={filter_empfehlung}, status={filter_status}, "
+                            f"cursor={'ja' if cursor_keys else 'nein'}, rueckwaerts={'ja' if backwards else 'nein'}]")
+                    yield name, page_sql, (1, *params_after_id, 25)
+    for sort_option in SUCHE_SORT_ORDER:
+        for filters in ({}, {'plattform': 'Kununu', 'unternehmen_id': 1, 'datum_von': '2024-01-01', 'datum_bis': '2024-12-31'}):
+            suche_sql, filter_params = build_suche_query(sort_option, filters)
+            yield (f"suche[{sort_option}, filter={'ja' if filters else 'nein'}]",
+                   suche_sql, ('"gehalt"', *filter_params, 25, 0))
+    yield 'export_profile', EXPORT_PROFILE_SQL, (1,)
+    for filter_empfehlung in ['alle'] + list(ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG):
+        for since, since_nr in ((None, None), ('2024-01-01 00:00:00', None), (None, 1000)):
+            export_sql, params_after_id = build_bewertungen_export_query(filter_empfehlung, 'alle', since, since_nr)
+            since_name = 'nr' if since_nr is not None else 'zeit' if since else 'nein'
+            yield f"export[empfehlung={filter_empfehlung}, since={since_name}]", export_sql, (1, *params_after_id)
+    yield 'scrape_jobs', JOBS_LIST_SQL, (50,)
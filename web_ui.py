@@ -1,28 +1,55 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
+import csv
+import io
+import json
+import logging
 import sqlite3
 import os
-from datetime import datetime # Importiere datetime für die Konvertierung
-from markupsafe import Markup # Markup wird von markupsafe importiert
 import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone # Importiere datetime für die Konvertierung
+from markupsafe import Markup, escape # Markup wird von markupsafe importiert
 import math # Für math.ceil bei der Paginierung
 
+from db import get_db_connection, DB_NAME # Gepoolte Verbindungen im WAL-Modus
+import metrics # Zähler/Histogramme, ausgegeben unter /metrics
+
+metrics.configure_logging() # Log-Level über SCRAPER_LOG_LEVEL, auch beim Start über 'flask run'
+logger = logging.getLogger(__name__)
+
 # Importiere die notwendigen Funktionen aus deinem Scraper-Skript
 # Stelle sicher, dass kununu_scraper.py im selben Verzeichnis liegt oder im Python-Pfad ist.
 try:
-    from trustpilot_scraper import main_trustpilot_scraper, TRUSTPILOT_JSON_BUILD_ID
+    from kununu_scraper import fetch_and_parse_url
 except ImportError:
-    print("Fehler: trustpilot_scraper.py nicht gefunden oder fehlerhaft.")
-    def main_trustpilot_scraper(url, build_id, manual_unternehmen_name=None): print("main_trustpilot_scraper nicht geladen") # Add manual_unternehmen_name
-    TRUSTPILOT_JSON_BUILD_ID = "businessunitprofile-consumersite-2.3939.0" # Fallback
-
-try:
-    from kununu_scraper import main_scraper, get_db_connection, DB_NAME, fetch_and_parse_url
-except ImportError:
-    print("Fehler: kununu_scraper.py nicht gefunden oder fehlerhaft.")
-    # Fallback, falls der Import fehlschlägt, um die App zumindest starten zu können
-    def main_scraper(name, url1, url2): print("main_scraper nicht geladen")
-    def get_db_connection(): return sqlite3.connect('Datenbank.db') # Annahme
-    DB_NAME = 'Datenbank.db'
+    logger.error("kununu_scraper.py nicht gefunden oder fehlerhaft.")
+
+from scrape_jobs import ScrapeJobQueue, SCRAPE_WORKERS_PER_PLATFORM
+from scheduler import schedule_rescrape
+from ui_queries import (
+    UNTERNEHMEN_LISTE_SQL, UNTERNEHMEN_NAME_SQL, PROFIL_VERLAUF_SQL,
+    UNTERNEHMENS_STATISTIK_SQL, UNTERNEHMENS_FAKTOREN_SQL, NEUESTE_BEWERTUNGEN_SQL,
+    ALLE_BEWERTUNGEN_SORT_KEYS, ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG, ALLE_BEWERTUNGEN_FILTER_STATUS,
+    build_alle_bewertungen_count_query, build_alle_bewertungen_page_query,
+    encode_review_cursor, decode_review_cursor,
+    PLATTFORMEN_SQL, SUCHE_SORT_ORDER, SUCHE_TREFFER_START, SUCHE_TREFFER_ENDE,
+    build_fts_match_query, build_suche_query,
+    EXPORT_PROFILE_SQL, EXPORT_SPALTEN, EXPORT_BOOL_SPALTEN, build_bewertungen_export_query,
+)
+
+# Scraping-Aufträge laufen über eine persistente Warteschlange mit begrenzter Anzahl Worker.
+# Die Worker starten erst beim ersten Auftrag bzw. Aufruf der Job-Übersicht (nicht im Reloader-Prozess).
+job_queue = ScrapeJobQueue(get_db_connection, workers_per_platform=SCRAPE_WORKERS_PER_PLATFORM)
+
+def submit_scrape_job(plattform, profil_url, unternehmen_name):
+    """Reiht einen Scraping-Auftrag ein und setzt eine passende Flash-Nachricht."""
+    job_id, neu_angelegt = job_queue.submit(plattform, profil_url, unternehmen_name)
+    if neu_angelegt:
+        flash(f"{plattform} Scraping für '{unternehmen_name}' wurde eingereiht (Auftrag #{job_id}).", 'info')
+    else:
+        flash(f"Für dieses {plattform}-Profil wartet oder läuft bereits Auftrag #{job_id}.", 'info')
+    return job_id
 
 def extract_company_name_from_kununu_profile(soup):
     """Extrahiert den Unternehmensnamen von einer geparsten Kununu-Profilseite."""
@@ -57,6 +84,25 @@ app = Flask(__name__)
 # Ein Secret Key wird für Flash-Nachrichten benötigt
 app.secret_key = os.urandom(24)
 
+@app.before_request
+def start_request_timer():
+    request.environ['webui.start'] = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    """Dauer pro Route (Regel statt konkreter URL, damit die Anzahl der Label-Werte begrenzt bleibt)."""
+    start = request.environ.get('webui.start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unbekannt'
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route,
+                                             methode=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Zähler und Histogramme von Scrapern und Web UI im Prometheus-Textformat."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 # --- Custom Jinja2 Filter ---
 def nl2br_filter(value):
     """Konvertiert Zeilenumbrüche in <br>-Tags."""
@@ -65,6 +111,14 @@ def nl2br_filter(value):
     return Markup(str(value).replace('\n', '<br>\n'))
 app.jinja_env.filters['nl2br'] = nl2br_filter
 
+def treffer_markieren_filter(value):
+    """Escaped einen Suchtreffer (snippet/highlight) und markiert die Fundstellen mit <mark>."""
+    if value is None:
+        return ''
+    html = str(escape(value)).replace(SUCHE_TREFFER_START, '<mark>').replace(SUCHE_TREFFER_ENDE, '</mark>')
+    return Markup(html.replace('\n', '<br>\n'))
+app.jinja_env.filters['treffer_markieren'] = treffer_markieren_filter
+
 @app.route('/', methods=['GET'])
 def index():
     """Zeigt die Hauptseite mit dem Eingabeformular an."""
@@ -104,14 +158,11 @@ def scrape():
                 temp_kununu_url = kununu_url.rstrip('/')
                 # Der Unternehmensname kommt jetzt direkt aus dem Formular.
                 # Die Funktion extract_company_name_from_kununu_profile wird hier nicht mehr benötigt.
-                print(f"WebUI: Verwende manuell eingegebenen Unternehmensnamen: {unternehmen_name}")
+                logger.info("Verwende manuell eingegebenen Unternehmensnamen: %s", unternehmen_name)
                 profil_kommentare_url = f"{temp_kununu_url}/kommentare?sort=newest"
 
-                print(f"WebUI: Starte Kununu Scraping für {unternehmen_name} mit URL {temp_kununu_url} in einem neuen Thread...")
-                # Starte den Kununu-Scraper in einem neuen Thread
-                kununu_thread = threading.Thread(target=main_scraper, args=(unternehmen_name, temp_kununu_url, profil_kommentare_url))
-                kununu_thread.start()
-                flash(f"Kununu Scraping für '{unternehmen_name}' wurde im Hintergrund gestartet.", 'info')
+                logger.info("Reihe Kununu Scraping für %s mit URL %s ein...", unternehmen_name, temp_kununu_url)
+                submit_scrape_job('Kununu', temp_kununu_url, unternehmen_name)
                 scraping_erfolgreich_oder_versucht = True
 
         if trustpilot_url:
@@ -119,11 +170,8 @@ def scrape():
                 flash(f"Die angegebene Trustpilot URL '{trustpilot_url}' scheint ungültig zu sein.", 'error')
             else:
                 temp_trustpilot_url = trustpilot_url.rstrip('/')
-                print(f"WebUI: Starte Trustpilot Scraping für {unternehmen_name} mit URL: {temp_trustpilot_url}...")
-                # Starte den Trustpilot-Scraper in einem neuen Thread
-                trustpilot_thread = threading.Thread(target=main_trustpilot_scraper, args=(temp_trustpilot_url, TRUSTPILOT_JSON_BUILD_ID, unternehmen_name))
-                trustpilot_thread.start()
-                flash(f"Trustpilot Scraping für '{unternehmen_name}' wurde im Hintergrund gestartet.", 'info')
+                logger.info("Reihe Trustpilot Scraping für %s mit URL: %s ein...", unternehmen_name, temp_trustpilot_url)
+                submit_scrape_job('Trustpilot', temp_trustpilot_url, unternehmen_name)
                 scraping_erfolgreich_oder_versucht = True
 
         
@@ -135,7 +183,7 @@ def scrape():
 
     except Exception as e:
         flash(f"Ein Fehler ist beim Scraping aufgetreten: {e}", 'error')
-        print(f"WebUI: Fehler beim Aufruf von main_scraper: {e}")
+        logger.exception("Fehler beim Aufruf von main_scraper: %s", e)
 
     return redirect(url_for('add_profile_page')) # Leitet nach Erfolg zurück zur Add-Seite (oder Startseite)
 
@@ -177,33 +225,147 @@ def scrape_company(unternehmen_id):
         
         # Unterscheiden, welcher Scraper aufgerufen werden soll, basierend auf der URL oder Plattform
         if "kununu.com" in profil_uebersicht_url:
-            # 4. Kommentare-URL generieren für Kununu
-            temp_uebersicht_url = profil_uebersicht_url.rstrip('/')
-            profil_kommentare_url = f"{temp_uebersicht_url}/kommentare?sort=newest"
-
-            # 5. Kununu Scraper aufrufen
-            print(f"WebUI: Starte Kununu Scraping für spezifisches Unternehmen: {unternehmen_name} (ID: {unternehmen_id})")
-            kununu_thread = threading.Thread(target=main_scraper, args=(unternehmen_name, profil_uebersicht_url, profil_kommentare_url))
-            kununu_thread.start()
-            flash(f"Kununu Scraping für {unternehmen_name} wurde im Hintergrund gestartet.", 'info')
+            # 4. Kununu Scraping einreihen (die Kommentare-URL wird vom Worker erzeugt)
+            logger.info("Reihe Kununu Scraping für spezifisches Unternehmen ein: %s (ID: %s)", unternehmen_name, unternehmen_id)
+            submit_scrape_job('Kununu', profil_uebersicht_url, unternehmen_name)
         elif "trustpilot.com" in profil_uebersicht_url:
-            # 5. Trustpilot Scraper aufrufen
-            print(f"WebUI: Starte Trustpilot Scraping für spezifisches Unternehmen: {unternehmen_name} (ID: {unternehmen_id}) im Thread")
-            trustpilot_thread = threading.Thread(target=main_trustpilot_scraper, args=(profil_uebersicht_url, TRUSTPILOT_JSON_BUILD_ID, unternehmen_name))
-            trustpilot_thread.start()
-            flash(f"Trustpilot Scraping für {unternehmen_name} wurde im Hintergrund gestartet.", 'info')
+            # 4. Trustpilot Scraping einreihen
+            logger.info("Reihe Trustpilot Scraping für spezifisches Unternehmen ein: %s (ID: %s)", unternehmen_name, unternehmen_id)
+            submit_scrape_job('Trustpilot', profil_uebersicht_url, unternehmen_name)
         else:
             flash(f"Unbekannte Profil-URL-Domain für {unternehmen_name}: {profil_uebersicht_url}", "error")
 
     except Exception as e:
         flash(f"Ein Fehler ist beim Scraping für {unternehmen_name} aufgetreten: {e}", 'error')
-        print(f"WebUI: Fehler beim Aufruf von main_scraper für ID {unternehmen_id}: {e}")
+        logger.exception("Fehler beim Aufruf von main_scraper für ID %s: %s", unternehmen_id, e)
     finally:
         if conn:
             conn.close()
     
     return redirect(url_for('unternehmens_details', unternehmen_id=unternehmen_id))
 
+@app.route('/jobs')
+def jobs_page():
+    """Zeigt die Scraping-Aufträge mit Status, Fortschritt und Dauer an."""
+    job_queue.start()
+    return render_template('jobs.html', jobs=job_queue.list_jobs())
+
+@app.route('/rescrape_all', methods=['POST'])
+def rescrape_all():
+    """Reiht alle gespeicherten Profile nach Dringlichkeit (Staleness, Bewertungsfrequenz) zum Scrapen ein."""
+    try:
+        neu, vorhanden = schedule_rescrape(job_queue)
+        flash(f"{neu} Profile zum Scrapen eingereiht ({vorhanden} bereits wartend oder laufend).", 'info')
+    except Exception as e:
+        flash(f"Fehler beim Einreihen der Profile: {e}", 'error')
+        logger.exception("Fehler bei rescrape_all: %s", e)
+    return redirect(url_for('jobs_page'))
+
+@app.route('/api/jobs')
+def api_jobs():
+    """Gibt die neuesten Scraping-Aufträge als JSON zurück."""
+    job_queue.start()
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify(job_queue.list_jobs(limit=min(max(limit, 1), 500)))
+
+# --- Export-API ---
+EXPORT_BATCH_SIZE = 500 # Zeilen pro fetchmany() und pro geschriebenem Block
+EXPORT_FORMATE = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+def _parse_since(value):
+    """Wandelt einen ISO-8601-Zeitpunkt in das UTC-Format von CURRENT_TIMESTAMP um (ohne Zeitzone = UTC)."""
+    zeitpunkt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if zeitpunkt.tzinfo is not None:
+        zeitpunkt = zeitpunkt.astimezone(timezone.utc).replace(tzinfo=None)
+    return zeitpunkt.strftime('%Y-%m-%d %H:%M:%S')
+
+def _iter_export_batches(conn, profile, export_sql, params_after_id):
+    """Liefert die Bewertungen aller Profile blockweise als Listen von dicts (Spalten wie EXPORT_SPALTEN)."""
+    for profil in profile:
+        cursor = conn.execute(export_sql, (profil['profil_id'], *params_after_id))
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield [{**dict(row), 'plattform': profil['plattform']} for row in rows]
+
+def _ndjson_stream(batches):
+    for batch in batches:
+        lines = []
+        for item in batch:
+            item['faktoren'] = json.loads(item['faktoren']) if item['faktoren'] else {}
+            for bool_field in EXPORT_BOOL_SPALTEN:
+                if item[bool_field] is not None:
+                    item[bool_field] = bool(item[bool_field])
+            lines.append(json.dumps({spalte: item[spalte] for spalte in EXPORT_SPALTEN}, ensure_ascii=False))
+        yield "\n".join(lines) + "\n"
+
+def _csv_stream(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_SPALTEN)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([item[spalte] for spalte in EXPORT_SPALTEN] for item in batch)
+        yield buffer.getvalue()
+
+@app.route('/api/unternehmen/<int:unternehmen_id>/bewertungen')
+def api_bewertungen_export(unternehmen_id):
+    """
+    Exportiert die Bewertungen eines Unternehmens als NDJSON (Standard) oder CSV (?format=csv).
+
+    Unterstützt dieselben Filter wie "Alle Bewertungen" (empfehlung, status) sowie since für
+    inkrementelle Abzüge: Dann kommen alle seitdem neuen oder geänderten Bewertungen, inklusive
+    gelöschter (is_deleted: true). Der Header X-Export-Stand enthält die höchste Änderungsnummer
+    (aenderung_nr) des exportierten Stands; sie wird beim nächsten Abzug als since übergeben und
+    verliert auch bei gleichzeitig schreibenden Scrapern keine Änderung. Ein ISO-Zeitpunkt als since
+    ist für den ersten Abzug gedacht. Die Zeilen werden direkt aus dem Datenbank-Cursor gestreamt,
+    der Speicherbedarf hängt daher nicht von der Anzahl der Bewertungen ab.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATE:
+        return jsonify({'fehler': f"Unbekanntes Format '{export_format}', erlaubt: {', '.join(EXPORT_FORMATE)}"}), 400
+    since = request.args.get('since')
+    since_nr = None
+    if since and since.isdigit():
+        since, since_nr = None, int(since)
+    elif since:
+        try:
+            since = _parse_since(since)
+        except ValueError:
+            return jsonify({'fehler': f"Ungültiger Wert für since: '{since}' (Änderungsnummer aus X-Export-Stand oder ISO 8601 erwartet)"}), 400
+    export_sql, params_after_id = build_bewertungen_export_query(
+        request.args.get('empfehlung', 'alle'), request.args.get('status', 'alle'), since, since_nr)
+
+    conn = get_db_connection()
+    try:
+        # Eine Lesetransaktion für den gesamten Export: alle Profile aus demselben Datenbank-Stand,
+        # und X-Export-Stand passt exakt dazu.
+        conn.execute("BEGIN")
+        if not conn.execute(UNTERNEHMEN_NAME_SQL, (unternehmen_id,)).fetchone():
+            conn.close()
+            return jsonify({'fehler': f"Unternehmen mit ID {unternehmen_id} nicht gefunden."}), 404
+        export_stand = conn.execute("SELECT IFNULL(MAX(aenderung_nr), 0) FROM bewertungen").fetchone()[0]
+        profile = conn.execute(EXPORT_PROFILE_SQL, (unternehmen_id,)).fetchall()
+    except sqlite3.Error as e:
+        conn.close()
+        return jsonify({'fehler': f"Datenbankfehler: {e}"}), 500
+
+    batches = _iter_export_batches(conn, profile, export_sql, params_after_id)
+    stream = _ndjson_stream(batches) if export_format == 'ndjson' else _csv_stream(batches)
+    response = Response(stream, mimetype=EXPORT_FORMATE[export_format])
+    response.headers['X-Export-Stand'] = str(export_stand)
+    if export_format == 'csv':
+        response.headers['Content-Disposition'] = f'attachment; filename="unternehmen_{unternehmen_id}_bewertungen.csv"'
+    # Verbindung erst nach dem Senden (oder Abbruch durch den Client) zurückgeben
+    response.call_on_close(conn.close)
+    return response
+
 @app.route('/data')
 def show_data():
     """Zeigt eine Übersicht der gesammelten Daten aus der profil_verlauf Tabelle."""
@@ -212,12 +374,7 @@ def show_data():
     unternehmen_liste = []
     try:
         # Hole alle Unternehmen, für die es Profile gibt
-        unternehmen_liste = conn.execute("""
-            SELECT DISTINCT u.id, u.name 
-            FROM unternehmen u
-            JOIN unternehmens_profile up ON u.id = up.unternehmen_id
-            ORDER BY u.name ASC
-        """).fetchall()
+        unternehmen_liste = conn.execute(UNTERNEHMEN_LISTE_SQL).fetchall()
     except sqlite3.Error as e:
         flash(f"Datenbankfehler beim Laden der Unternehmensliste: {e}", "error")
     finally:
@@ -230,7 +387,6 @@ def unternehmens_details(unternehmen_id):
     """Zeigt Detailinformationen für ein spezifisches Unternehmen."""
     conn = get_db_connection()
     unternehmen_name = None
-    profil_verlauf_list = []
     neueste_bewertungen_list = []
     gesamtzahl_bewertungen_unternehmen = 0 # Für den Link "Alle Bewertungen anzeigen"
     
@@ -241,10 +397,15 @@ def unternehmens_details(unternehmen_id):
 
     aktueller_trustpilot_schnitt = None
     aktuellste_trustpilot_anzahl_bewertungen = None
+
+    kununu_verlauf_data = []
+    trustpilot_verlauf_data = []
+    sterne_histogramm = []
+    faktor_durchschnitte = []
     try:
         # Unternehmensnamen holen
         cursor = conn.cursor()
-        cursor.execute("SELECT name FROM unternehmen WHERE id = ?", (unternehmen_id,))
+        cursor.execute(UNTERNEHMEN_NAME_SQL, (unternehmen_id,))
         unternehmen_row = cursor.fetchone()
         if unternehmen_row:
             unternehmen_name = unternehmen_row['name']
@@ -252,103 +413,40 @@ def unternehmens_details(unternehmen_id):
             flash(f"Unternehmen mit ID {unternehmen_id} nicht gefunden.", "error")
             return redirect(url_for('show_data'))
 
-        # Rohdaten des Profilverlaufs für dieses Unternehmen holen
-        raw_profil_verlauf_data = conn.execute("""
-            SELECT pv.gesamtdurchschnitt, pv.anzahl_bewertungen_gesamt, pv.scraping_datum, pv.recommendation_rate, up.url
-            FROM profil_verlauf pv
-            JOIN unternehmens_profile up ON pv.profil_id = up.id
-            WHERE up.unternehmen_id = ?
-            ORDER BY pv.scraping_datum DESC
-        """, (unternehmen_id,)).fetchall()
-
-        # Konvertiere die Datumsstrings im Profilverlauf in datetime-Objekte
-        profil_verlauf_list = []
-        for row in raw_profil_verlauf_data:
-            item = dict(row) # Konvertiere sqlite3.Row in ein Dictionary für einfachere Bearbeitung
-            datum_str = item.get('scraping_datum')
-            if datum_str:
-                try:
-                    item['scraping_datum'] = datetime.strptime(datum_str, '%Y-%m-%d %H:%M:%S.%f')
-                except ValueError:
-                    try:
-                        item['scraping_datum'] = datetime.strptime(datum_str, '%Y-%m-%d %H:%M:%S')
-                    except ValueError:
-                        print(f"Warnung: Konnte Datumsstring '{datum_str}' nicht parsen. Wird als None behandelt.")
-                        item['scraping_datum'] = None
-            else:
+        # Aktuelle Kennzahlen aus der materialisierten Unternehmensstatistik (eine Zeile, von Triggern gepflegt)
+        statistik_row = conn.execute(UNTERNEHMENS_STATISTIK_SQL, (unternehmen_id,)).fetchone()
+        if statistik_row:
+            aktueller_kununu_schnitt = statistik_row['kununu_schnitt']
+            aktuellste_kununu_anzahl_bewertungen = statistik_row['kununu_anzahl_bewertungen']
+            aktuelle_kununu_empfehlungsrate = statistik_row['kununu_empfehlungsrate']
+            aktueller_trustpilot_schnitt = statistik_row['trustpilot_schnitt']
+            aktuellste_trustpilot_anzahl_bewertungen = statistik_row['trustpilot_anzahl_bewertungen']
+            gesamtzahl_bewertungen_unternehmen = statistik_row['anzahl_bewertungen']
+            sterne_histogramm = [(stufe, statistik_row[f'sterne_{stufe}']) for stufe in range(5, 0, -1)]
+        faktor_durchschnitte = [dict(row) for row in conn.execute(UNTERNEHMENS_FAKTOREN_SQL, (unternehmen_id,))]
+
+        # Profilverlauf für die Diagramme (aufsteigend nach Datum, Plattform per Join statt URL-Vergleich)
+        for row in conn.execute(PROFIL_VERLAUF_SQL, (unternehmen_id,)):
+            item = dict(row)
+            try:
+                item['scraping_datum'] = datetime.fromisoformat(item['scraping_datum']) if item['scraping_datum'] else None
+            except ValueError:
+                logger.warning("Konnte Datumsstring '%s' nicht parsen. Wird als None behandelt.", item['scraping_datum'])
                 item['scraping_datum'] = None
-            profil_verlauf_list.append(item)
-        
-        # Erstelle eine Kopie der Liste für das Diagramm, sortiert nach Datum aufsteigend
-        # (oder verarbeite die Daten direkt für das Diagramm in der gewünschten Reihenfolge)
-        # Die aktuelle profil_verlauf_list ist DESC sortiert, was für die Tabelle gut ist.
-        # Für das Diagramm brauchen wir ASC.
-        chart_profil_verlauf_data = sorted(
-            [item for item in profil_verlauf_list if item.get('scraping_datum')],
-            key=lambda x: x['scraping_datum']
-        )
-
-        kununu_verlauf_data = []
-        trustpilot_verlauf_data = []
-        for item in chart_profil_verlauf_data: # chart_profil_verlauf_data ist bereits ASC sortiert
-            if "kununu.com" in item.get('url', '').lower():
+            if item['scraping_datum'] is None:
+                continue
+            if item['plattform_name'] == 'Kununu':
                 kununu_verlauf_data.append(item)
-            elif "trustpilot.com" in item.get('url', '').lower():
+            elif item['plattform_name'] == 'Trustpilot':
                 trustpilot_verlauf_data.append(item)
 
-        # Aktuellste Daten für Kununu und Trustpilot extrahieren
-        # profil_verlauf_list ist bereits nach scraping_datum DESC sortiert
-        for item in profil_verlauf_list:
-            url = item.get('url', '').lower()
-            if "kununu.com" in url:
-                if aktueller_kununu_schnitt is None: # Erster (neuester) Kununu-Eintrag
-                    aktueller_kununu_schnitt = item['gesamtdurchschnitt']
-                    aktuellste_kununu_anzahl_bewertungen = item['anzahl_bewertungen_gesamt']
-                    aktuelle_kununu_empfehlungsrate = item.get('recommendation_rate')
-            elif "trustpilot.com" in url:
-                if aktueller_trustpilot_schnitt is None: # Erster (neuester) Trustpilot-Eintrag
-                    aktueller_trustpilot_schnitt = item['gesamtdurchschnitt']
-                    aktuellste_trustpilot_anzahl_bewertungen = item['anzahl_bewertungen_gesamt']
-            # Wenn beide gefunden wurden, könnten wir theoretisch abbrechen, aber die Liste ist meist kurz.
-
-        # --- SQL-Vorbereitung für Bewertungen (wird auch von alle_bewertungen genutzt) ---
-        # Basis-SQL ohne Filter, Sortierung oder Limit
-        sql_base_select = """
-            SELECT
-                b.sterne, b.titel, b.text, b.datum, b.is_former_employee,
-                b.review_type, b.is_recommended, b.reviewer_position, b.reviewer_department,
-                p.name as plattform_name,
-                b.reviewed_entity_name, b.reviewer_city, b.reviewer_state,
-                b.apprenticeship_job_title,
-                b.consumer_display_name, b.date_of_experience, b.review_language, b.review_source, b.review_likes, b.is_verified_by_platform
-        """
-        sql_base_from_where = """
-            FROM bewertungen b
-            JOIN unternehmens_profile up ON b.profil_id = up.id
-            JOIN plattformen p ON up.plattform_id = p.id
-            WHERE up.unternehmen_id = ? AND b.is_deleted = 0 
-        """
-
-        # Gesamtzahl der Bewertungen für dieses Unternehmen ermitteln (für den Link "Alle anzeigen")
-        count_sql = f"SELECT COUNT(b.id) FROM bewertungen b JOIN unternehmens_profile up ON b.profil_id = up.id WHERE up.unternehmen_id = ? AND b.is_deleted = 0"
-        count_row = conn.execute(count_sql, (unternehmen_id,)).fetchone()
-        gesamtzahl_bewertungen_unternehmen = count_row[0] if count_row else 0
-
-        # Sortieroption für Bewertungen aus Query-Parametern holen (nur für die ersten 10 hier)
+        # Sortieroption für Bewertungen aus Query-Parametern holen (nur für die ersten Bewertungen hier)
         # Die "Alle Bewertungen"-Seite hat ihre eigene Sortierlogik im Request.
         # Für die Detailseite zeigen wir immer die neuesten, aber das Dropdown soll den URL-Parameter widerspiegeln.
-        order_by_clause_details = "ORDER BY b.datum DESC"
         sort_option = request.args.get('sort', 'neueste') # Definiere sort_option hier
 
-        # Die 10 neuesten Bewertungen für die Detailseite holen
-        limit_clause_sql_details = "LIMIT 8"
-        
-        # Explizite String-Konkatenation für die finale Query
-        final_sql_query_details = sql_base_select + " " + sql_base_from_where + " " + order_by_clause_details + " " + limit_clause_sql_details
-        
-        # Debug-Ausgabe für die finale SQL-Abfrage
-        print(f"--- DEBUG SQL Query für Detail-Bewertungen ---\n{final_sql_query_details}\n--- END DEBUG ---")
-
+        # Die neuesten Bewertungen für die Detailseite holen
+        final_sql_query_details = NEUESTE_BEWERTUNGEN_SQL
         raw_bewertungen_data = conn.execute(final_sql_query_details, (unternehmen_id,)).fetchall()
 
         # Konvertiere die Datumsstrings der Bewertungen in datetime-Objekte für die Anzeige
@@ -371,7 +469,7 @@ def unternehmens_details(unternehmen_id):
                     # oder parsen es, wenn es einheitlich ist. Für strftime brauchen wir datetime.
                     item['datum_obj'] = datetime.fromisoformat(datum_bewertung_str.replace('Z', '+00:00'))
                 except ValueError:
-                    print(f"Warnung: Konnte Bewertungs-Datumsstring '{datum_bewertung_str}' nicht parsen.")
+                    logger.warning("Konnte Bewertungs-Datumsstring '%s' nicht parsen.", datum_bewertung_str)
                     item['datum_obj'] = None # Oder den String direkt anzeigen lassen
             neueste_bewertungen_list.append(item)
 
@@ -379,15 +477,14 @@ def unternehmens_details(unternehmen_id):
         flash(f"Datenbankfehler beim Laden der Unternehmensdetails: {e}", "error")
         # Zusätzliche Debug-Info, falls der Fehler hier auftritt
         if 'final_sql_query_details' in locals(): # Prüft, ob die Variable existiert
-            print(f"Fehler bei SQL-Query: {final_sql_query_details}")
+            logger.error("Fehler bei SQL-Query: %s", final_sql_query_details)
         else:
-            print("Fehler trat vor der Erstellung der SQL-Query für Bewertungen auf.")
+            logger.error("Fehler trat vor der Erstellung der SQL-Query für Bewertungen auf.")
     finally:
         if conn:
             conn.close()
     return render_template('unternehmens_details.html',
                            unternehmen_name=unternehmen_name,
-                           profil_verlauf_list=profil_verlauf_list, # Für die Tabelle
                            kununu_verlauf_data=kununu_verlauf_data,
                            trustpilot_verlauf_data=trustpilot_verlauf_data,
                            aktueller_kununu_schnitt=aktueller_kununu_schnitt,
@@ -395,84 +492,115 @@ def unternehmens_details(unternehmen_id):
                            aktuelle_kununu_empfehlungsrate=aktuelle_kununu_empfehlungsrate,
                            aktueller_trustpilot_schnitt=aktueller_trustpilot_schnitt,
                            aktuellste_trustpilot_anzahl_bewertungen=aktuellste_trustpilot_anzahl_bewertungen,
+                           sterne_histogramm=sterne_histogramm,
+                           faktor_durchschnitte=faktor_durchschnitte,
                            neueste_bewertungen_list=neueste_bewertungen_list, # Sortierte Liste
                            current_sort_option=sort_option, # Für das Sortier-Dropdown
                            unternehmen_id=unternehmen_id,
                            gesamtzahl_bewertungen_unternehmen=gesamtzahl_bewertungen_unternehmen)
 
+# Gesamtzahlen für "Alle Bewertungen" werden kurz zwischengespeichert, damit das Blättern keine
+# erneute COUNT-Abfrage kostet: {(unternehmen_id, filter_empfehlung, filter_status): (zeitpunkt, anzahl)}.
+# Die Filter sind bereits auf gültige Werte normalisiert; die am längsten nicht genutzten Einträge
+# werden ab REVIEW_COUNT_CACHE_MAX_ENTRIES verdrängt. Die Anzahl dient nur der Anzeige, ob es weitere
+# Seiten gibt, entscheidet die Keyset-Abfrage.
+REVIEW_COUNT_CACHE_SECONDS = 300
+REVIEW_COUNT_CACHE_MAX_ENTRIES = 1000
+_review_count_cache = OrderedDict()
+_review_count_cache_lock = threading.Lock()
+
+def get_cached_review_count(conn, unternehmen_id, filter_empfehlung, filter_status):
+    """Gibt die Anzahl der gefilterten Bewertungen zurück (max. REVIEW_COUNT_CACHE_SECONDS alt)."""
+    cache_key = (unternehmen_id, filter_empfehlung, filter_status)
+    now = time.monotonic()
+    with _review_count_cache_lock:
+        cached = _review_count_cache.get(cache_key)
+        if cached and now - cached[0] < REVIEW_COUNT_CACHE_SECONDS:
+            _review_count_cache.move_to_end(cache_key)
+            return cached[1]
+    count_sql = build_alle_bewertungen_count_query(filter_empfehlung, filter_status)
+    total_reviews_count = conn.execute(count_sql, (unternehmen_id,)).fetchone()[0]
+    with _review_count_cache_lock:
+        _review_count_cache[cache_key] = (now, total_reviews_count)
+        _review_count_cache.move_to_end(cache_key)
+        while len(_review_count_cache) > REVIEW_COUNT_CACHE_MAX_ENTRIES:
+            _review_count_cache.popitem(last=False)
+    return total_reviews_count
+
 @app.route('/unternehmen/<int:unternehmen_id>/alle_bewertungen')
 def alle_bewertungen(unternehmen_id):
     conn = get_db_connection()
     unternehmen_name = None
     bewertungen_list = []
-    
-    page = request.args.get('page', 1, type=int)
     reviews_per_page = 25 # Anzahl der Bewertungen pro Seite
-    offset = (page - 1) * reviews_per_page
+    total_reviews_count = 0
+    total_pages = 0
+    next_cursor = None
+    prev_cursor = None
+    last_cursor = None
 
-    # Filter- und Sortierparameter aus der URL holen
+    # Filter- und Sortierparameter aus der URL holen; unbekannte Werte gelten als Standard
     sort_option = request.args.get('sort', 'neueste')
+    if sort_option not in ALLE_BEWERTUNGEN_SORT_KEYS:
+        sort_option = 'neueste'
     filter_empfehlung = request.args.get('empfehlung', 'alle')
+    if filter_empfehlung not in ALLE_BEWERTUNGEN_FILTER_EMPFEHLUNG:
+        filter_empfehlung = 'alle'
     filter_status = request.args.get('status', 'alle')
+    if filter_status not in ALLE_BEWERTUNGEN_FILTER_STATUS:
+        filter_status = 'alle'
+
+    # Keyset-Paginierung: Der Cursor enthält den Sortierschlüssel der Nachbarzeile, Seitenzahl und Richtung.
+    # Ohne (gültigen) Cursor wird die erste Seite angezeigt.
+    page_cursor = request.args.get('cursor')
+    page_cursor = decode_review_cursor(page_cursor, sort_option) if page_cursor else None
+    page = page_cursor['page'] if page_cursor else 1
 
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT name FROM unternehmen WHERE id = ?", (unternehmen_id,))
+        cursor.execute(UNTERNEHMEN_NAME_SQL, (unternehmen_id,))
         unternehmen_row = cursor.fetchone()
         if not unternehmen_row:
             flash(f"Unternehmen mit ID {unternehmen_id} nicht gefunden.", "error")
             return redirect(url_for('show_data'))
         unternehmen_name = unternehmen_row['name']
 
-        # Basis-SQL
-        sql_base_select = "SELECT b.sterne, b.titel, b.text, b.datum, b.is_former_employee, b.review_type, b.is_recommended, b.reviewer_position, b.reviewer_department, p.name as plattform_name, b.reviewed_entity_name, b.reviewer_city, b.reviewer_state, b.apprenticeship_job_title, b.consumer_display_name, b.date_of_experience, b.review_language, b.review_source, b.review_likes, b.is_verified_by_platform"
-        sql_base_from = "FROM bewertungen b JOIN unternehmens_profile up ON b.profil_id = up.id JOIN plattformen p ON up.plattform_id = p.id"
-        
-        # WHERE-Klauseln und Parameter dynamisch erstellen
-        where_clauses_list = ["up.unternehmen_id = ?", "b.is_deleted = 0"]
-        params_list = [unternehmen_id]
-
-        if filter_empfehlung != 'alle':
-            # Konvertiere 'true'/'false' (aus URL) zu 1/0 für DB-Abfrage
-            # oder handle 'None' wenn die DB NULLs speichert und Python Booleans verwendet
-            # In unserem Fall haben wir 'True'/'False'/'None' Strings in den data-Attributen,
-            # aber die DB speichert Booleans als 0/1 oder NULL.
-            # Die Konvertierung zu 'True'/'False' Strings passiert erst für die Template-Darstellung.
-            # Hier müssen wir mit den DB-Werten arbeiten.
-            if filter_empfehlung == 'true':
-                where_clauses_list.append("b.is_recommended = 1")
-            elif filter_empfehlung == 'false':
-                where_clauses_list.append("b.is_recommended = 0")
-            # 'None' wird nicht explizit gefiltert, es sei denn, man fügt eine Option hinzu
-
-        if filter_status != 'alle':
-            if filter_status == 'true': # Ehemalig
-                where_clauses_list.append("b.is_former_employee = 1")
-            elif filter_status == 'false': # Aktuell
-                where_clauses_list.append("b.is_former_employee = 0")
-
-        sql_where_clause = " WHERE " + " AND ".join(where_clauses_list)
-
-        # Gesamtzahl der gefilterten Bewertungen für Paginierung
-        count_sql = f"SELECT COUNT(b.id) {sql_base_from} {sql_where_clause}"
-        total_reviews_count = conn.execute(count_sql, tuple(params_list)).fetchone()[0]
+        # Gesamtzahl der gefilterten Bewertungen für die Seitenanzeige (aus dem Cache, evtl. veraltet)
+        total_reviews_count = get_cached_review_count(conn, unternehmen_id, filter_empfehlung, filter_status)
         total_pages = math.ceil(total_reviews_count / reviews_per_page)
 
-        # ORDER BY-Klausel
-        order_by_clause = "ORDER BY b.datum DESC" # Standard
-        if sort_option == 'sterne_asc':
-            order_by_clause = "ORDER BY b.sterne ASC, b.datum DESC"
-        elif sort_option == 'sterne_desc':
-            order_by_clause = "ORDER BY b.sterne DESC, b.datum DESC"
-
-        # Finale Query für die aktuelle Seite
-        limit_offset_clause = "LIMIT ? OFFSET ?"
-        final_query = f"{sql_base_select} {sql_base_from} {sql_where_clause} {order_by_clause} {limit_offset_clause}"
-        
-        params_list_with_pagination = params_list + [reviews_per_page, offset]
-        print(f"--- DEBUG SQL Alle Bewertungen ---\n{final_query}\nParams: {params_list_with_pagination}\n--- END DEBUG ---")
-        
-        raw_data = conn.execute(final_query, tuple(params_list_with_pagination)).fetchall()
+        cursor_keys = page_cursor['keys'] if page_cursor else None
+        backwards = page_cursor['backwards'] if page_cursor else False
+        if backwards and cursor_keys is None:
+            # Sprung auf die letzte Seite: die letzten reviews_per_page Bewertungen, rückwärts gelesen
+            page = max(total_pages, 1)
+
+        final_query, params_after_id = build_alle_bewertungen_page_query(
+            sort_option, filter_empfehlung, filter_status, cursor_keys, backwards)
+        # Eine Zeile mehr holen, um zu erkennen, ob es in Blätterrichtung weitergeht
+        raw_data = conn.execute(final_query, (unternehmen_id, *params_after_id, reviews_per_page + 1)).fetchall()
+        has_more = len(raw_data) > reviews_per_page
+        raw_data = raw_data[:reviews_per_page]
+        if backwards:
+            raw_data.reverse()
+            # Ein Rückwärts-Cursor stammt von der ersten Zeile der folgenden Seite
+            has_prev, has_next = has_more, cursor_keys is not None
+        else:
+            has_prev, has_next = page_cursor is not None and page > 1, has_more
+        # Seitenzahlen nur zur Anzeige: an das Ergebnis der Keyset-Abfrage anpassen, falls die Anzahl veraltet ist
+        if has_prev:
+            page = max(page, 2)
+        elif backwards:
+            page = 1
+        total_pages = max(total_pages, page + 1) if has_next else page
+
+        sort_key_names = [key for key in (raw_data[0].keys() if raw_data else []) if key.startswith('sort_key_')]
+        if raw_data and has_next:
+            next_cursor = encode_review_cursor(sort_option, [raw_data[-1][key] for key in sort_key_names], page + 1)
+        if raw_data and has_prev:
+            prev_cursor = encode_review_cursor(sort_option, [raw_data[0][key] for key in sort_key_names], page - 1, backwards=True)
+        if has_next:
+            last_cursor = encode_review_cursor(sort_option, None, total_pages, backwards=True)
 
         for row in raw_data:
             item = dict(row)
@@ -502,6 +630,9 @@ def alle_bewertungen(unternehmen_id):
                            bewertungen_list=bewertungen_list,
                            current_page=page,
                            total_pages=total_pages,
+                           next_cursor=next_cursor,
+                           prev_cursor=prev_cursor,
+                           last_cursor=last_cursor,
                            current_sort_option=sort_option,
                            current_filter_empfehlung=filter_empfehlung,
                            current_filter_status=filter_status,
@@ -509,9 +640,77 @@ def alle_bewertungen(unternehmen_id):
                            total_reviews_count_filtered=total_reviews_count
                            )
 
+@app.route('/suche')
+def suche():
+    """Volltextsuche über Titel und Text aller Bewertungen (FTS5), mit Filtern und Seiten."""
+    suchbegriff = request.args.get('q', '').strip()
+    sort_option = request.args.get('sort', 'relevanz')
+    if sort_option not in SUCHE_SORT_ORDER:
+        sort_option = 'relevanz'
+    filters = {
+        'plattform': request.args.get('plattform', ''),
+        'unternehmen_id': request.args.get('unternehmen', type=int),
+        'datum_von': request.args.get('von', ''),
+        'datum_bis': request.args.get('bis', ''),
+    }
+    for name in ('datum_von', 'datum_bis'):
+        if filters[name]:
+            try:
+                datetime.strptime(filters[name], '%Y-%m-%d')
+            except ValueError:
+                flash(f"Ungültiges Datum '{filters[name]}' wird ignoriert (Format: JJJJ-MM-TT).", "error")
+                filters[name] = ''
+    page = max(request.args.get('seite', 1, type=int), 1)
+    results_per_page = 25
+
+    conn = get_db_connection()
+    unternehmen_liste = []
+    plattformen = []
+    treffer_list = []
+    has_next = False
+    try:
+        unternehmen_liste = conn.execute(UNTERNEHMEN_LISTE_SQL).fetchall()
+        plattformen = [row['name'] for row in conn.execute(PLATTFORMEN_SQL).fetchall()]
+
+        match_query = build_fts_match_query(suchbegriff)
+        if match_query:
+            suche_sql, filter_params = build_suche_query(sort_option, filters)
+            # Eine Zeile mehr holen, um zu erkennen, ob es eine nächste Seite gibt (kein COUNT über alle Treffer)
+            raw_data = conn.execute(suche_sql, (match_query, *filter_params, results_per_page + 1,
+                                                (page - 1) * results_per_page)).fetchall()
+            has_next = len(raw_data) > results_per_page
+            for row in raw_data[:results_per_page]:
+                item = dict(row)
+                datum_bewertung_str = item.get('datum')
+                if datum_bewertung_str:
+                    try:
+                        item['datum_obj'] = datetime.fromisoformat(datum_bewertung_str.replace('Z', '+00:00'))
+                    except ValueError:
+                        item['datum_obj'] = None
+                treffer_list.append(item)
+    except sqlite3.Error as e:
+        flash(f"Datenbankfehler bei der Suche: {e}", "error")
+    finally:
+        if conn:
+            conn.close()
+
+    return render_template('suche.html',
+                           suchbegriff=suchbegriff,
+                           treffer_list=treffer_list,
+                           unternehmen_liste=unternehmen_liste,
+                           plattformen=plattformen,
+                           current_sort_option=sort_option,
+                           current_plattform=filters['plattform'],
+                           current_unternehmen_id=filters['unternehmen_id'],
+                           current_von=filters['datum_von'],
+                           current_bis=filters['datum_bis'],
+                           current_page=page,
+                           has_next=has_next,
+                           results_per_page=results_per_page)
+
 if __name__ == '__main__':
     # Stelle sicher, dass die Datenbank initialisiert wurde, bevor die App startet.
     # from database_setup import setup_database
     # setup_database() # Bei Bedarf einmalig ausführen
-    print(f"Web UI startet. Öffne http://127.0.0.1:5000 in deinem Browser.")
+    logger.info("Web UI startet. Öffne http://127.0.0.1:5000 in deinem Browser.")
     app.run(debug=True) # debug=True ist für die Entwicklung hilfreich
\ No newline at end of file